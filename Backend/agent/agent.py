@@ -1,10 +1,14 @@
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agent.context import get_relevant_context_from_vector_store
-from agent.intent import classify_intent
-from agent.llm import run_llm
+from agent.answer_cache import ANSWER_CACHE_ENABLED, get_answer_cache
+from agent.context import offline_retrieval, retrieve_contexts
+from agent.intent import split_commands
+from agent.llm import run_llm, stream_llm
 from agent.prompt import build_prompt
 from agent.cache import get_context_cache
 
@@ -13,7 +17,16 @@ from agent.handlers.weight import handle as handle_weight
 from agent.handlers.symptoms import handle as handle_symptoms
 from agent.handlers.guidelines import handle as handle_guidelines
 
-from agent.vector_store import register_vector_store_updater, update_guidelines_in_vector_store
+from db.db import open_db
+from monitoring.log import get_logger
+from monitoring.tracing import propagate, span
+
+from agent.vector_store import (
+    register_vector_store_updater, update_guidelines_in_vector_store, guidelines_need_update,
+    warm_up_vector_store, get_vector_store_status
+)
+
+log = get_logger("agent")
 
 dispatch_intent = {
     "appointments": handle_appointments,
@@ -22,43 +35,340 @@ dispatch_intent = {
     "guidelines": handle_guidelines,
 }
 
+# Handlers that write to the database, with the context cache data type each one changes
+WRITE_INTENTS = {
+    "appointments": "appointments",
+    "weight": "weight",
+    "symptoms": "symptoms",
+}
+
+# Per-stage deadlines (seconds). Retrieval that misses its deadline falls back to the offline context.
+CONTEXT_TIMEOUT = float(os.getenv("BABYNEST_CONTEXT_TIMEOUT", "10"))
+RETRIEVAL_TIMEOUT = float(os.getenv("BABYNEST_RETRIEVAL_TIMEOUT", "3"))
+# Commands one message may carry; a longer message is refused rather than run as one huge batch
+MAX_COMMANDS = int(os.getenv("BABYNEST_MAX_COMMANDS", "10"))
+
+# Shared pool for the independent pipeline stages (user context fetch, vector retrieval)
+_stage_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BABYNEST_STAGE_WORKERS", "4")),
+    thread_name_prefix="agent-stage"
+)
+
 class BabyNestAgent:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.context_cache = get_context_cache(db_path)
+        self.context_timeout = CONTEXT_TIMEOUT
+        self.retrieval_timeout = RETRIEVAL_TIMEOUT
+        self.max_commands = MAX_COMMANDS
+        self.answer_cache = get_answer_cache() if ANSWER_CACHE_ENABLED else None
         
         # Register embedding refresh
         register_vector_store_updater(update_guidelines_in_vector_store)
+        
+        # Load guidelines into the vector store from the precomputed embeddings pack when it
+        # matches guidelines.json. Without one the guidelines have to be embedded with the
+        # model, which runs in the background so startup is not blocked.
+        update_guidelines_in_vector_store(precomputed_only=True)
+        self.guidelines_thread = None
+        if guidelines_need_update():
+            self.guidelines_thread = threading.Thread(
+                target=update_guidelines_in_vector_store, name="agent-guidelines", daemon=True)
+            self.guidelines_thread.start()
+    
+    def warm_up(self, user_id: str = "default"):
+        """
+        Warm the context cache and the vector store (guidelines loaded, embedding model
+        loaded, dummy query).
+        """
+        self.get_user_context(user_id)
+        update_guidelines_in_vector_store()
+        warm_up_vector_store()
+    
+    def start_warmup(self, user_id: str = "default") -> threading.Thread:
+        """Run warm_up in a background thread so startup is not blocked."""
+        thread = threading.Thread(target=self.warm_up, args=(user_id,), name="agent-warmup", daemon=True)
+        thread.start()
+        return thread
+    
+    def get_readiness(self, user_id: str = "default") -> dict:
+        """Warm state of the context cache and the vector store."""
+        with self.context_cache.cache_lock:
+            context_cached = user_id in self.context_cache.memory_cache
+            users_in_memory = len(self.context_cache.memory_cache)
+        return {
+            "context_cache": {
+                "warm": context_cached,
+                "users_in_memory": users_in_memory,
+            },
+            "vector_store": get_vector_store_status(),
+        }
     
     def get_user_context(self, user_id: str = "default"):
         """Get user context from cache."""
         return self.context_cache.get_context(user_id)
     
     def run(self, query: str, user_id: str = "default"):
+        return self.run_commands(query, user_id)["response"]
+    
+    def run_commands(self, query: str, user_id: str = "default") -> dict:
+        """
+        Run every command in a message.
+
+        A message with several commands ("log weight 65kg and book ultrasound tomorrow")
+        is executed as one batch: one context read, one DB transaction for all writes
+        and one cache refresh afterwards.
+
+        The user context fetch and the vector retrieval for general questions do not
+        depend on each other and run concurrently on the shared stage pool, so the
+        latency is close to the slower of the two rather than their sum.
+
+        Returns:
+            dict with the combined "response" and per-command "results"
+            ({"command", "intent", "response"}).
+        """
+        try:
+            prepared = self._prepare(query, user_id)
+            if "error" in prepared:
+                return {"response": prepared["error"], "results": []}
+            return self._execute(prepared, user_id)
+            
+        except Exception as e:
+            return {"response": f"Error processing query: {e}", "results": []}
+    
+    def run_stream(self, query: str, user_id: str = "default"):
+        """
+        Stream the answer to a message.
+
+        Yields ("token", text) events followed by a final ("done", result) event, where
+        result has the same shape as run_commands' return value, or ("error", message).
+        A single general question streams the LLM output as it is generated; handler
+        commands and batches are sent as one chunk. Closing this generator (when the
+        client disconnects) closes the LLM stream, so generation stops with it.
+        """
+        try:
+            prepared = self._prepare(query, user_id)
+        except Exception as e:
+            yield "error", f"Error processing query: {e}"
+            return
+        if "error" in prepared:
+            yield "token", prepared["error"]
+            yield "done", {"response": prepared["error"], "results": []}
+            return
+        
+        commands, user_context, contexts = prepared["commands"], prepared["user_context"], prepared["contexts"]
+        if len(commands) > 1 or commands[0]["intent"] in dispatch_intent:
+            try:
+                result = self._execute(prepared, user_id)
+            except Exception as e:
+                yield "error", f"Error processing query: {e}"
+                return
+            yield "token", result["response"]
+            yield "done", result
+            return
+        
+        command = commands[0]
+        retrieval = contexts[command["text"]]
+        scope = self._answer_scope(user_context, user_id, retrieval)
+        if scope is not None:
+            cached = self.answer_cache.get(scope, command["text"], retrieval["embedding"])
+            if cached is not None:
+                yield "token", cached
+                yield "done", {"response": cached, "results": [self._result(command, cached)]}
+                return
+        
+        chunks = []
+        stream = None
+        try:
+            prompt = build_prompt(command["text"], retrieval["context"], user_context, user_id=user_id)
+            stream = stream_llm(prompt)
+            for chunk in stream:
+                chunks.append(chunk)
+                yield "token", chunk
+        except Exception as e:
+            yield "error", f"Error processing query: {e}"
+            return
+        finally:
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
+        
+        response = "".join(chunks)
+        if scope is not None:
+            self.answer_cache.put(scope, command["text"], retrieval["embedding"], response)
+        yield "done", {"response": response, "results": [self._result(command, response)]}
+    
+    def _prepare(self, query: str, user_id: str) -> dict:
+        """
+        Load the user context, split the message into commands and retrieve context
+        for the general ones.
+
+        Returns:
+            dict with commands, user_context and contexts (retrieval result per
+            general command text, see retrieve_contexts), or {"error": message} when the message can't be run.
+        """
         if not query or not isinstance(query, str):
-            return "Invalid query. Please provide a valid string."
+            return {"error": "Invalid query. Please provide a valid string."}
+        
+        # Step 1: Start loading the user context from cache (no DB hit if cache is valid)
+        context_future = _stage_pool.submit(propagate(self.get_user_context), user_id)
+        
+        # Step 2: Split the message into commands and classify each one
+        with span("split_commands") as s:
+            commands = split_commands(query)
+            s.set(commands=len(commands))
+        if not commands:
+            return {"error": "Invalid query. Please provide a valid string."}
+        if len(commands) > self.max_commands:
+            context_future.cancel()
+            log.warning("too_many_commands", commands=len(commands), max_commands=self.max_commands)
+            return {"error": f"Please send at most {self.max_commands} commands in one message."}
+        
+        # Step 3: Start retrieval for commands that go to the LLM while the context loads
+        general = [c["text"] for c in commands if c["intent"] not in dispatch_intent]
+        retrieval = self._start_retrieval(general)
         
         try:
-            # Step 1: Get user context from cache (no DB hit if cache is valid)
-            user_context = self.get_user_context(user_id)
-            if not user_context:
-                return "User profile not found. Please complete your profile setup first."
-            
-            # Step 2: Classify intent to see if a specialized handler should be used.
-            intent = classify_intent(query)
-            if intent in dispatch_intent:
-                # Pass user context to handlers
-                return dispatch_intent[intent](query, user_context)
-            
-            # Step 3: Retrieve relevant context from the vector store based on the query.
-            context = get_relevant_context_from_vector_store(query)
-            
-            # Step 4: Build the prompt with the retrieved context and user context, then run the LLM.
-            prompt = build_prompt(query, context, user_context)
-            return run_llm(prompt)
-            
+            user_context = context_future.result(timeout=self.context_timeout)
+        except FutureTimeoutError:
+            return {"error": "Your profile is still loading. Please try again in a moment."}
+        if not user_context:
+            return {"error": "User profile not found. Please complete your profile setup first."}
+        
+        return {"commands": commands, "user_context": user_context, "contexts": self._finish_retrieval(retrieval)}
+    
+    def _execute(self, prepared: dict, user_id: str) -> dict:
+        """Run prepared commands; several commands go through one batch."""
+        commands, user_context, contexts = prepared["commands"], prepared["user_context"], prepared["contexts"]
+        if len(commands) == 1:
+            changed = []
+            response = self._run_command(commands[0], user_context, contexts=contexts, user_id=user_id,
+                                         changed=changed)
+            self._refresh_after_writes(user_id, changed)
+            return {"response": response, "results": [self._result(commands[0], response)]}
+        
+        return self._run_batch(commands, user_context, user_id, contexts)
+    
+    def _start_retrieval(self, queries: list):
+        """Submit vector retrieval for `queries` to the stage pool; returns (queries, future, deadline)."""
+        if not queries:
+            return None
+        future = _stage_pool.submit(propagate(retrieve_contexts), queries)
+        return queries, future, time.monotonic() + self.retrieval_timeout
+    
+    def _finish_retrieval(self, retrieval) -> dict:
+        """Wait for retrieval until its deadline; late or failed queries get the offline context."""
+        if retrieval is None:
+            return {}
+        queries, future, deadline = retrieval
+        try:
+            contexts = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            log.warning("retrieval_deadline_missed", timeout_s=self.retrieval_timeout, queries=len(queries))
+            contexts = [offline_retrieval() for _ in queries]
         except Exception as e:
-            return f"Error processing query: {e}"
+            log.error("context_retrieval_failed", error=str(e))
+            contexts = [offline_retrieval() for _ in queries]
+        return dict(zip(queries, contexts))
+    
+    def _run_command(self, command: dict, user_context: dict, commit: bool = True, contexts: dict = None,
+                     user_id: str = None, changed: list = None) -> str:
+        """Run one command. The data type of a write handler that changed rows is appended to `changed`."""
+        intent = command["intent"]
+        if intent in dispatch_intent:
+            # Pass user context and the matched spans to handlers
+            with span(f"handler.{intent}"):
+                if intent not in WRITE_INTENTS:
+                    return dispatch_intent[intent](command["text"], user_context, command["analysis"])
+                db = open_db()
+                before = db.total_changes
+                response = dispatch_intent[intent](command["text"], user_context, command["analysis"], commit=commit)
+                if changed is not None and db.total_changes != before:
+                    changed.append(WRITE_INTENTS[intent])
+                return response
+        
+        # Context retrieved from the vector store based on the query (started in run_commands)
+        retrieval = (contexts or {}).get(command["text"])
+        if retrieval is None:
+            retrieval = self._finish_retrieval(self._start_retrieval([command["text"]]))[command["text"]]
+        
+        # Repeated and paraphrased questions over the same data and documents skip the model
+        scope = self._answer_scope(user_context, user_id, retrieval)
+        if scope is not None:
+            with span("answer_cache") as s:
+                cached = self.answer_cache.get(scope, command["text"], retrieval["embedding"])
+                s.set(hit=cached is not None)
+            if cached is not None:
+                return cached
+        
+        # Build the prompt with the retrieved context and user context (its rendering is
+        # memoized per user and context version), then run the LLM.
+        with span("build_prompt") as s:
+            prompt = build_prompt(command["text"], retrieval["context"], user_context, user_id=user_id)
+            s.set(chars=len(prompt))
+        with span("run_llm") as s:
+            response = run_llm(prompt)
+            s.set(chars=len(response))
+        if scope is not None:
+            self.answer_cache.put(scope, command["text"], retrieval["embedding"], response)
+        return response
+    
+    def _answer_scope(self, user_context: dict, user_id: str, retrieval: dict):
+        """(user_id, context version, retrieved doc ids) for the answer cache, or None if the answer can't be cached."""
+        if self.answer_cache is None or user_id is None or retrieval.get("embedding") is None:
+            return None
+        version = (user_context or {}).get("version")
+        if version is None:
+            return None
+        return user_id, version, retrieval["doc_ids"]
+    
+    def _run_batch(self, commands: list, user_context: dict, user_id: str, contexts: dict = None) -> dict:
+        """
+        Run several commands with their writes in one transaction, then refresh the cache once.
+        A failed write rolls back the writes of every command in the batch. General questions
+        are answered after the commit, so the transaction is not held open during LLM calls;
+        results stay in message order.
+        """
+        db = open_db()
+        results, changed = [], []
+        for command in commands:
+            if command["intent"] not in dispatch_intent:
+                results.append(None)
+                continue
+            try:
+                response = self._run_command(command, user_context, commit=False, contexts=contexts,
+                                             user_id=user_id, changed=changed)
+            except Exception as e:
+                db.rollback()
+                log.error("batch_rolled_back", command=command["text"], commands=len(commands), error=str(e))
+                response = f"❌ Could not run '{command['text']}', so none of the {len(commands)} commands were saved. Please try again."
+                done = [r for r in results if r is not None]
+                return {"response": response, "results": done + [self._result(command, response)]}
+            results.append(self._result(command, response))
+        db.commit()
+        
+        self._refresh_after_writes(user_id, changed)
+        if changed and None in results:
+            # Questions see what the commands before them just logged
+            user_context = self.get_user_context(user_id) or user_context
+        for i, command in enumerate(commands):
+            if results[i] is None:
+                response = self._run_command(command, user_context, contexts=contexts, user_id=user_id)
+                results[i] = self._result(command, response)
+        return {
+            "response": "\n\n".join(r["response"] for r in results),
+            "results": results,
+        }
+    
+    def _refresh_after_writes(self, user_id: str, changed: list):
+        """Refresh the user's cached context once for the data types written by chat commands."""
+        changed = list(dict.fromkeys(changed))
+        if changed:
+            with span("update_cache", data_types=changed):
+                self.update_cache(user_id, data_type=changed, operation="create")
+    
+    @staticmethod
+    def _result(command: dict, response: str) -> dict:
+        return {"command": command["text"], "intent": command["intent"], "response": response}
     
     def update_cache(self, user_id: str = "default", data_type: str = None, operation: str = "update"):
         """
@@ -77,7 +387,7 @@ class BabyNestAgent:
     
     def refresh_cache_and_embeddings(self):
         """Manually refresh cache and regenerate embeddings after database changes."""
-        print("🔄 Manually refreshing cache and regenerating embeddings...")
+        log.info("manual_refresh")
         self.context_cache.invalidate_cache()
         update_guidelines_in_vector_store()
     
@@ -85,11 +395,17 @@ class BabyNestAgent:
         """Get cache statistics for monitoring."""
         return self.context_cache.get_cache_stats()
     
+    def get_answer_cache_stats(self):
+        """Answer cache hit rate and size ({"enabled": False} when disabled)."""
+        if self.answer_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.answer_cache.get_stats()}
+    
     def cleanup_cache(self):
         """Manually trigger cache cleanup."""
         self.context_cache._cleanup_old_cache_files()
         self.context_cache._cleanup_memory_cache()
-        print("🧹 Cache cleanup completed")
+        log.info("cache_cleanup_completed")
 
 # Global agent instance
 _agent_instance = None
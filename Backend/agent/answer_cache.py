@@ -0,0 +1,176 @@
+"""
+Semantic answer cache for general (LLM) queries.
+
+An answer is stored under the user's context version, the ids of the retrieved
+documents and the query embedding. A later query is a hit when the version and
+document ids match exactly and the embeddings are close enough (cosine
+similarity at or above the threshold), so repeated and paraphrased questions
+are answered without running the model. A change to the user's data bumps the
+context version, and reloading the guidelines collection clears the cache, so
+answers built from old data or old guidelines are never served.
+
+Numbers in the query must match as well: "week 20" and "week 21" embed almost
+identically but need different answers.
+
+Configuration (environment):
+    BABYNEST_ANSWER_CACHE            set to 0 to disable (default 1)
+    BABYNEST_ANSWER_CACHE_SIZE       maximum cached answers (default 512)
+    BABYNEST_ANSWER_CACHE_TTL        seconds an answer stays valid (default 3600)
+    BABYNEST_ANSWER_CACHE_THRESHOLD  minimum cosine similarity for a hit (default 0.92)
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from monitoring.memory import register_structure
+
+ANSWER_CACHE_ENABLED = os.getenv("BABYNEST_ANSWER_CACHE", "1") != "0"
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+class AnswerCache:
+    """Thread-safe LRU of answers with a TTL, looked up by embedding similarity."""
+
+    def __init__(self, max_entries: int = None, ttl: float = None, threshold: float = None):
+        self.max_entries = max_entries or int(os.getenv("BABYNEST_ANSWER_CACHE_SIZE", "512"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("BABYNEST_ANSWER_CACHE_TTL", "3600"))
+        self.threshold = threshold if threshold is not None else float(
+            os.getenv("BABYNEST_ANSWER_CACHE_THRESHOLD", "0.92"))
+
+        # (bucket, normalised query) -> entry, least recently used first
+        self._entries = OrderedDict()
+        # bucket -> keys of its entries; a bucket is (user_id, version, doc ids)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _bucket(scope: tuple) -> tuple:
+        user_id, version, doc_ids = scope
+        return user_id, version, tuple(sorted(doc_ids))
+
+    @staticmethod
+    def _normalise(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def get(self, scope: tuple, query: str, embedding):
+        """
+        Cached answer for the query, or None.
+
+        Args:
+            scope: (user_id, context version, retrieved doc ids); must match exactly
+            query: The query text (an exact repeat is found without the embedding)
+            embedding: The query embedding
+        """
+        bucket = self._bucket(scope)
+        key = (bucket, self._normalise(query))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(key, entry, now):
+                entry = None
+            if entry is None and embedding is not None:
+                entry = self._nearest(bucket, query, self._unit(embedding), now)
+
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(entry["key"])
+            self._stats["hits"] += 1
+            if entry["key"] != key:
+                self._stats["semantic_hits"] += 1
+            return entry["answer"]
+
+    def put(self, scope: tuple, query: str, embedding, answer: str):
+        bucket = self._bucket(scope)
+        key = (bucket, self._normalise(query))
+        entry = {
+            "key": key,
+            "embedding": self._unit(embedding) if embedding is not None else None,
+            "numbers": _NUMBER_RE.findall(query),
+            "answer": answer,
+            "created": time.monotonic(),
+        }
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._buckets.setdefault(bucket, {})[key] = None
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._unlink(old_key)
+                self._stats["evictions"] += 1
+
+    def _nearest(self, bucket: tuple, query: str, embedding: np.ndarray, now: float):
+        """Most similar live entry in the bucket above the threshold (lock held)."""
+        numbers = _NUMBER_RE.findall(query)
+        best, best_score = None, self.threshold
+        for key in list(self._buckets.get(bucket, ())):
+            entry = self._entries[key]
+            if self._expired(key, entry, now):
+                continue
+            if entry["embedding"] is None or entry["numbers"] != numbers:
+                continue
+            score = float(np.dot(entry["embedding"], embedding))
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _expired(self, key, entry: dict, now: float) -> bool:
+        """Drop the entry if it outlived the TTL (lock held)."""
+        if now - entry["created"] <= self.ttl:
+            return False
+        del self._entries[key]
+        self._unlink(key)
+        self._stats["expired"] += 1
+        return True
+
+    def _unlink(self, key):
+        bucket = key[0]
+        keys = self._buckets.get(bucket)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self._buckets[bucket]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def get_stats(self) -> dict:
+        """Hit/miss counters and the hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats.update(max_entries=self.max_entries, ttl=self.ttl, threshold=self.threshold)
+        return stats
+
+# Global answer cache instance
+_answer_cache = None
+
+def get_answer_cache() -> AnswerCache:
+    """Get or create the global answer cache."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+    return _answer_cache
+
+register_structure("answer_cache", lambda: _answer_cache, capacity=lambda: _answer_cache.max_entries)
@@ -1,18 +1,38 @@
 import json
 import os
-import sqlite3
 import threading
 import time
 from datetime import datetime, date
 from typing import Dict, Optional, Any
 import hashlib
 
+from db.db import connect
+from monitoring.log import get_logger
+from monitoring.memory import register_structure
+from monitoring.metrics import REGISTRY
+from monitoring.tracing import span
+
+log = get_logger("agent.cache")
+
+# Directory of the global cache's context files
+CACHE_DIR = os.getenv("BABYNEST_CACHE_DIR", "cache")
+
+CACHE_HITS = REGISTRY.counter("babynest_context_cache_hits_total", "Context cache hits by source", ("source",))
+CACHE_MISSES = REGISTRY.counter("babynest_context_cache_misses_total", "Context cache misses (context built from the database)")
+CACHE_BUILD_SECONDS = REGISTRY.histogram("babynest_context_cache_build_seconds", "Time to build a context from the database")
+CACHE_UPDATES = REGISTRY.counter("babynest_context_cache_updates_total", "Context cache section refreshes", ("data_type",))
+CACHE_EVICTIONS = REGISTRY.counter("babynest_context_cache_evictions_total", "Users evicted from the memory cache")
+CACHE_USERS = REGISTRY.gauge("babynest_context_cache_users", "Users held in the memory cache")
+
 class ContextCache:
     def __init__(self, db_path: str, cache_dir: str = "cache"):
         self.db_path = db_path
         self.cache_dir = cache_dir
         self.memory_cache: Dict[str, Dict[str, Any]] = {}
         self.cache_lock = threading.Lock()
+        # Per-user context version, bumped on every change; never reset, so a
+        # version is not reused after the cache is invalidated
+        self._versions: Dict[str, int] = {}
         
         # Cache management settings
         self.max_cache_size_mb = 10  # Maximum cache file size in MB
@@ -43,10 +63,23 @@ class ContextCache:
                 try:
                     with open(file_path, 'r') as f:
                         cache_data = json.load(f)
-                        self.memory_cache[user_id] = cache_data
+                        self._set_memory_context(user_id, cache_data)
                 except (json.JSONDecodeError, FileNotFoundError):
                     continue
     
+    def _set_memory_context(self, user_id: str, context_data: Dict[str, Any]):
+        """Put context data in the memory cache, stamped with a new version."""
+        version = max(self._versions.get(user_id, 0), context_data.get("version", 0)) + 1
+        self._versions[user_id] = version
+        context_data["version"] = version
+        self.memory_cache[user_id] = context_data
+        CACHE_USERS.set(len(self.memory_cache))
+
+    def get_context_version(self, user_id: str = "default") -> int:
+        """Current version of the user's cached context (0 if it was never cached)."""
+        with self.cache_lock:
+            return self._versions.get(user_id, 0)
+
     def _save_cache(self, user_id:str, context_data: Dict[str, Any]):
         """Save context data to disk cache."""
         file_path = self._get_cache_file_path(user_id)
@@ -54,7 +87,7 @@ class ContextCache:
             with open(file_path, 'w') as f:
                 json.dump(context_data, f, indent=2, default=str)
         except Exception as e:
-            print(f"Error saving cache for user {user_id}: {e}")
+            log.error("cache_save_failed", user_id=user_id, error=str(e))
 
     def _cache_update_handler(self, datatype:str, current_cache:dict) -> bool:
         """Handle specific datatype cache update."""
@@ -64,23 +97,22 @@ class ContextCache:
         valid_types = ['profile', 'weight', 'medicine', 'symptoms', 'blood_pressure', 'discharge']
         if datatype not in valid_types:
             return False
-        print(f"   🔄 Updating {datatype} data...")
         data = self._get_specific_data(datatype)
         if data:
             if datatype == "profile":
                 current_cache.update(data)
-                print(f"   ✅ {datatype} data updated")
             else:
                 current_cache["tracking_data"][datatype] = data
-                print(f"   ✅ {datatype} data updated: {len(data)} entries")
+                log.debug("cache_section_refreshed", data_type=datatype, entries=len(data))
             return True
         return False
     
     def _build_context(self) -> Dict[str, Any]:
         """Build context from database."""
         conn = None
+        start = time.perf_counter()
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
 
             # Get profile data
@@ -166,12 +198,15 @@ class ContextCache:
         finally:
             if conn:
                 conn.close()
+            CACHE_BUILD_SECONDS.observe(time.perf_counter() - start)
     
     def get_context(self, user_id: str = "default") -> Optional[Dict[str, Any]]:
         """Get user context from cache only. If not found, return None."""
-        with self.cache_lock:
+        with span("get_context") as trace_span, self.cache_lock:
             # Check memory cache first
             if user_id in self.memory_cache:
+                trace_span.set(source="memory")
+                CACHE_HITS.inc(source="memory")
                 return self.memory_cache[user_id]
             
             # Check disk cache
@@ -180,16 +215,20 @@ class ContextCache:
                 try:
                     with open(cache_file, 'r') as f:
                         cache_data = json.load(f)
-                        self.memory_cache[user_id] = cache_data
+                        self._set_memory_context(user_id, cache_data)
+                        trace_span.set(source="disk")
+                        CACHE_HITS.inc(source="disk")
                         return cache_data
                 except (json.JSONDecodeError, FileNotFoundError):
                     pass
             
             # Build context from database
             context_data = self._build_context()
+            trace_span.set(source="database")
+            CACHE_MISSES.inc()
             if context_data:
                 # Save to both memory and disk cache
-                self.memory_cache[user_id] = context_data
+                self._set_memory_context(user_id, context_data)
                 self._save_cache(user_id, context_data)
                 return context_data
 
@@ -199,7 +238,7 @@ class ContextCache:
         """Get specific data from database based on type."""
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             
             if data_type == "profile":
@@ -293,7 +332,8 @@ class ContextCache:
         
         Args:
             user_id: User ID to update cache for
-            data_type: Type of data that changed ('profile', 'weight', 'medicine', 'symptoms', 'blood_pressure', 'discharge')
+            data_type: Type of data that changed ('profile', 'weight', 'medicine', 'symptoms', 'blood_pressure', 'discharge'),
+                or a list of types to refresh together with a single save
             operation: Type of operation ('create', 'update', 'delete')
 
             Note: The operation parameter is purely informational. The cache update logic is the same regardless of operation. 
@@ -312,30 +352,40 @@ class ContextCache:
                     try:
                         with open(cache_file, 'r') as f:
                             current_cache = json.load(f)
-                            self.memory_cache[user_id] = current_cache
+                            self._set_memory_context(user_id, current_cache)
                     except (json.JSONDecodeError, FileNotFoundError):
                         pass
             
             if not current_cache:
                 # If no cache exists, build full context
-                print("⚙️ No existing cache found, building full context...")
+                log.info("cache_build", user_id=user_id, reason="no_cache")
                 context_data = self._build_context()
                 if context_data:
-                    self.memory_cache[user_id] = context_data
+                    self._set_memory_context(user_id, context_data)
                     self._save_cache(user_id, context_data)
                     return
 
             if operation in ["update", "create", "delete"] :
-                res = self._cache_update_handler(data_type, current_cache)
+                data_types = data_type if isinstance(data_type, (list, tuple)) else [data_type]
+                updated = [t for t in data_types if self._cache_update_handler(t, current_cache)]
+                for t in updated:
+                    CACHE_UPDATES.inc(data_type=t)
                 # Update last updated timestamp
-                if res:
+                if updated:
                     current_cache["last_updated"] = datetime.now().isoformat()
                     # Save updated cache
-                    self.memory_cache[user_id] = current_cache
+                    self._set_memory_context(user_id, current_cache)
                     self._save_cache(user_id, current_cache)
-                    print(f"✅ Cache updated for user {user_id} - {data_type} data refreshed")
+                    log.info("cache_updated", user_id=user_id, data_types=updated, version=current_cache["version"])
                     # Check if cache needs cleanup after update
                     self._check_and_cleanup_cache(user_id)
+                else:
+                    # No cached section changed (appointments are not cached, or the data
+                    # is now empty), but the user's data did: a new version still keeps
+                    # answers built on the old data from being reused
+                    self._set_memory_context(user_id, current_cache)
+                    log.debug("cache_version_bumped", user_id=user_id, data_types=data_types,
+                              version=current_cache["version"])
 
     def _cleanup_old_cache_files(self):
         """Clean up old cache files based on age and size."""
@@ -354,14 +404,14 @@ class ContextCache:
                     file_age = current_time - os.path.getmtime(file_path)
                     if file_age > max_age_seconds:
                         os.remove(file_path)
-                        print(f"🗑️ Removed old cache file: {filename} (age: {file_age/86400:.1f} days)")
+                        log.info("cache_file_removed", file=filename, reason="age", age_days=round(file_age / 86400, 1))
                         continue
                     
                     # Check file size
                     file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
                     if file_size_mb > self.max_cache_size_mb:
                         os.remove(file_path)
-                        print(f"🗑️ Removed oversized cache file: {filename} (size: {file_size_mb:.1f}MB)")
+                        log.info("cache_file_removed", file=filename, reason="size", size_mb=round(file_size_mb, 1))
                         continue
                         
                 except (OSError, FileNotFoundError):
@@ -378,13 +428,13 @@ class ContextCache:
             # Check file size
             file_size_mb = os.path.getsize(cache_file) / (1024 * 1024)
             if file_size_mb > self.max_cache_size_mb:
-                print(f"⚠️ Cache file too large ({file_size_mb:.1f}MB), cleaning up...")
+                log.warning("cache_file_too_large", user_id=user_id, size_mb=round(file_size_mb, 1))
                 self._cleanup_large_cache_file(user_id)
                 return
             
             # Check memory cache size
             if len(self.memory_cache) > self.max_memory_cache_size:
-                print(f"⚠️ Memory cache too large ({len(self.memory_cache)} users), cleaning up...")
+                log.warning("memory_cache_too_large", users=len(self.memory_cache))
                 self._cleanup_memory_cache()
                 
         except (OSError, FileNotFoundError):
@@ -406,7 +456,7 @@ class ContextCache:
                         if len(entries) > self.max_tracking_entries:
                             # Keep only the most recent entries
                             cache_data['tracking_data'][data_type] = entries[:self.max_tracking_entries]
-                            print(f"✂️ Trimmed {data_type} entries to {self.max_tracking_entries}")
+                            log.debug("cache_entries_trimmed", data_type=data_type, kept=self.max_tracking_entries)
             
             # Save cleaned cache
             with open(cache_file, 'w') as f:
@@ -414,12 +464,12 @@ class ContextCache:
             
             # Update memory cache
             if user_id in self.memory_cache:
-                self.memory_cache[user_id] = cache_data
+                self._set_memory_context(user_id, cache_data)
                 
-            print(f"✅ Cleaned up cache file for user {user_id}")
+            log.info("cache_file_cleaned", user_id=user_id)
             
         except (json.JSONDecodeError, OSError, FileNotFoundError) as e:
-            print(f"❌ Error cleaning up cache file: {e}")
+            log.error("cache_file_cleanup_failed", user_id=user_id, error=str(e))
             # If cleanup fails, remove the corrupted file
             try:
                 os.remove(cache_file)
@@ -443,7 +493,8 @@ class ContextCache:
         users_to_remove = len(self.memory_cache) - self.max_memory_cache_size
         for user_id, _ in sorted_users[:users_to_remove]:
             del self.memory_cache[user_id]
-            print(f"🗑️ Removed user {user_id} from memory cache")
+            CACHE_EVICTIONS.inc()
+            log.debug("memory_cache_evicted", user_id=user_id)
 
     def _limit_tracking_data(self, data: list, data_type: str) -> list:
         """Limit tracking data to prevent excessive growth."""
@@ -452,7 +503,7 @@ class ContextCache:
         
         # Keep only the most recent entries
         limited_data = data[:self.max_tracking_entries]
-        print(f"✂️ Limited {data_type} data to {self.max_tracking_entries} entries")
+        log.debug("tracking_data_limited", data_type=data_type, kept=self.max_tracking_entries)
         return limited_data
 
     def get_cache_stats(self) -> Dict[str, Any]:
@@ -524,7 +575,10 @@ def get_context_cache(db_path: str) -> ContextCache:
     """Get or create the global context cache instance."""
     global _context_cache
     if _context_cache is None:
-        _context_cache = ContextCache(db_path)
+        _context_cache = ContextCache(db_path, cache_dir=CACHE_DIR)
         # Cleanup old files after initialization
         _context_cache._cleanup_old_cache_files()
-    return _context_cache
\ No newline at end of file
+    return _context_cache
+
+register_structure("context_cache", lambda: _context_cache.memory_cache if _context_cache else None,
+                   capacity=lambda: _context_cache.max_memory_cache_size)
\ No newline at end of file
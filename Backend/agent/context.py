@@ -1,5 +1,14 @@
 import sqlite3
-from agent.vector_store import update_guidelines_in_vector_store, query_vector_store, update_user_details_in_vector_store
+from agent.vector_store import (
+    update_guidelines_in_vector_store, query_vector_store,
+    query_vector_store_details, update_user_details_in_vector_store
+)
+from db.db import connect
+from monitoring.log import get_logger
+
+log = get_logger("agent.context")
+
+OFFLINE_CONTEXT = "Pregnancy-related health guidance snippets (offline)."
 
 def _format_data_for_embedding(db: sqlite3.Connection) -> tuple[list, list, list]:
     """
@@ -41,7 +50,7 @@ def update_structured_context_in_vector_store():
     db = None
     try:
         # Connect directly to the SQLite DB
-        db = sqlite3.connect("db/database.db")
+        db = connect()
         db.row_factory = sqlite3.Row
         
         docs, ids, metadatas = _format_data_for_embedding(db)
@@ -50,7 +59,7 @@ def update_structured_context_in_vector_store():
         update_user_details_in_vector_store(documents=docs, ids=ids, metadatas=metadatas)
         
     except Exception as e:
-        print(f"Error updating structured context in vector store: {e}")
+        log.error("structured_context_update_failed", error=str(e))
     finally:
         if db:
             db.close()
@@ -68,11 +77,40 @@ def get_relevant_context_from_vector_store(query: str) -> str:
             context = "\n\n".join(relevant_docs)
             return context
         else:
-            return "Pregnancy-related health guidance snippets (offline)."
+            return OFFLINE_CONTEXT
             
     except Exception as e:
-        print(f"Error retrieving context: {e}")
-        return "Pregnancy-related health guidance snippets (offline)."
+        log.error("context_retrieval_failed", error=str(e))
+        return OFFLINE_CONTEXT
+
+def retrieve_contexts(queries: list) -> list:
+    """
+    Retrieve relevant context for several queries, with the retrieved document ids
+    and the query embedding.
+
+    Returns:
+        list: One {"context", "doc_ids", "embedding"} dict per query, in the same
+        order as `queries`. When nothing is found the context is OFFLINE_CONTEXT
+        and embedding may be None.
+    """
+    try:
+        results = query_vector_store_details(queries, n_results=3)
+        return [
+            {
+                "context": "\n\n".join(r["documents"]) if r["documents"] else OFFLINE_CONTEXT,
+                "doc_ids": r["ids"],
+                "embedding": r["embedding"],
+            }
+            for r in results
+        ]
+
+    except Exception as e:
+        log.error("context_retrieval_failed", error=str(e))
+        return [offline_retrieval() for _ in queries]
+
+def offline_retrieval() -> dict:
+    """Retrieval result used when the vector store can't answer in time."""
+    return {"context": OFFLINE_CONTEXT, "doc_ids": [], "embedding": None}
 
 def initialize_knowledge_base():
     """
@@ -82,11 +120,11 @@ def initialize_knowledge_base():
     try:
         success = update_guidelines_in_vector_store()
         if success:
-            print("Knowledge base initialized successfully")
+            log.info("knowledge_base_initialized")
         else:
-            print("Failed to initialize knowledge base")
+            log.error("knowledge_base_init_failed")
         return success
     except Exception as e:
-        print(f"Error initializing knowledge base: {e}")
+        log.error("knowledge_base_init_failed", error=str(e))
         return False
 
@@ -0,0 +1,91 @@
+"""
+Embedding providers for the vector store.
+
+The provider is selected with the BABYNEST_EMBEDDING_PROVIDER environment variable:
+    default  - Chroma's DefaultEmbeddingFunction (ONNX MiniLM, needs the model files)
+    hashing  - Deterministic hashing-vectorizer embedding, pure NumPy, works offline
+
+In test mode (BABYNEST_TEST_MODE=1 or running under pytest) the hashing provider is
+used unless another provider is set explicitly, so tests and benchmarks are
+reproducible on machines without network access or a model cache.
+"""
+import os
+import re
+import sys
+import zlib
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils import embedding_functions
+from chromadb.utils.embedding_functions import register_embedding_function
+
+DEFAULT_PROVIDER = "default"
+HASHING_PROVIDER = "hashing"
+HASHING_DIMENSION = 384
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+@register_embedding_function
+class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Deterministic hashing-vectorizer embedding.
+
+    Word unigrams and bigrams are hashed (CRC32) into a fixed number of signed
+    buckets and the result is L2-normalised, so texts sharing words land close
+    together. The output only depends on the input text and the dimension.
+    """
+
+    def __init__(self, dimension: int = HASHING_DIMENSION):
+        self.dimension = dimension
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return [self._embed(text) for text in input]
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        tokens = _TOKEN_RE.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dimension] += sign
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    @staticmethod
+    def name() -> str:
+        return HASHING_PROVIDER
+
+    def default_space(self):
+        return "cosine"
+
+    def get_config(self) -> dict:
+        return {"dimension": self.dimension}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(dimension=config.get("dimension", HASHING_DIMENSION))
+
+def is_test_mode() -> bool:
+    """Whether the backend is running under tests."""
+    return os.getenv("BABYNEST_TEST_MODE") == "1" or "pytest" in sys.modules
+
+def get_embedding_provider() -> str:
+    """Name of the configured embedding provider."""
+    provider = os.getenv("BABYNEST_EMBEDDING_PROVIDER")
+    if provider:
+        return provider.lower()
+    return HASHING_PROVIDER if is_test_mode() else DEFAULT_PROVIDER
+
+def get_embedding_function(provider: str = None):
+    """Create the embedding function for `provider` (defaults to the configured one)."""
+    provider = provider or get_embedding_provider()
+    if provider == DEFAULT_PROVIDER:
+        return embedding_functions.DefaultEmbeddingFunction()
+    if provider == HASHING_PROVIDER:
+        return HashingEmbeddingFunction()
+    raise ValueError(f"Unknown embedding provider: {provider}")
@@ -0,0 +1,117 @@
+"""
+Precomputed guideline embeddings pack.
+
+The pack is produced at build time so that a fresh install can load the
+guideline vectors straight into ChromaDB without loading an embedding model.
+
+File layout (little-endian):
+    magic      4 bytes   b"BNEP"
+    version    uint16
+    header     uint32 length + UTF-8 JSON (ids, guidelines hash, model, dim)
+    vectors    count * dim float32
+
+Usage (from the Backend directory):
+    python -m agent.embeddings_pack
+"""
+import json
+import os
+import struct
+import sys
+from array import array
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring.log import get_logger
+
+log = get_logger("agent.embeddings_pack")
+
+PACK_MAGIC = b"BNEP"
+PACK_VERSION = 1
+PACK_PATH = os.path.join(os.path.dirname(__file__), "guidelines_embeddings.bin")
+
+def write_embeddings_pack(path: str, ids: list, embeddings: list, guidelines_hash: str, model: str):
+    """Write ids and vectors to a compact binary pack."""
+    dim = len(embeddings[0]) if embeddings else 0
+    header = json.dumps({
+        "ids": ids,
+        "guidelines_hash": guidelines_hash,
+        "model": model,
+        "dim": dim,
+        "count": len(ids),
+    }).encode("utf-8")
+
+    vectors = array("f")
+    for embedding in embeddings:
+        if len(embedding) != dim:
+            raise ValueError("All embeddings in a pack must have the same dimension")
+        vectors.extend(float(x) for x in embedding)
+    if sys.byteorder != "little":
+        vectors.byteswap()
+
+    with open(path, "wb") as f:
+        f.write(PACK_MAGIC)
+        f.write(struct.pack("<HI", PACK_VERSION, len(header)))
+        f.write(header)
+        f.write(vectors.tobytes())
+
+def load_embeddings_pack(path: str = PACK_PATH):
+    """
+    Load an embeddings pack.
+
+    Returns:
+        dict with ids, embeddings, guidelines_hash and model, or None if the
+        pack is missing, from another pack version or corrupted.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            if f.read(4) != PACK_MAGIC:
+                return None
+            version, header_len = struct.unpack("<HI", f.read(6))
+            if version != PACK_VERSION:
+                return None
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+            dim, count = header["dim"], header["count"]
+            vectors = array("f")
+            vectors.frombytes(f.read(dim * count * vectors.itemsize))
+            if sys.byteorder != "little":
+                vectors.byteswap()
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        log.warning("embeddings_pack_load_failed", error=str(e))
+        return None
+
+    if len(vectors) != dim * count or len(header["ids"]) != count:
+        return None
+
+    return {
+        "ids": header["ids"],
+        "embeddings": [vectors[i * dim:(i + 1) * dim].tolist() for i in range(count)],
+        "guidelines_hash": header["guidelines_hash"],
+        "model": header["model"],
+    }
+
+def build_embeddings_pack(path: str = PACK_PATH) -> int:
+    """Embed every guideline with the store's embedding function and write the pack."""
+    from agent.vector_store import (
+        GUIDELINES_FILE, build_guideline_records, get_file_hash, guidelines_embedding_function
+    )
+
+    with open(GUIDELINES_FILE, "r", encoding="utf-8") as f:
+        guidelines = json.load(f)
+
+    documents, ids, _ = build_guideline_records(guidelines)
+    embeddings = guidelines_embedding_function(documents)
+    write_embeddings_pack(
+        path,
+        ids,
+        [list(e) for e in embeddings],
+        get_file_hash(GUIDELINES_FILE),
+        guidelines_embedding_function.name(),
+    )
+    return len(ids)
+
+if __name__ == "__main__":
+    count = build_embeddings_pack()
+    print(f"Wrote {count} guideline embeddings to {PACK_PATH}")
@@ -1,6 +1,9 @@
 import json
 import os
 
+from monitoring.log import get_logger
+from monitoring.memory import register_structure
+
 try: 
     current_dir = os.path.dirname(os.path.abspath(__file__))
     guidelines_path = os.path.join(current_dir, "guidelines.json")
@@ -9,5 +12,7 @@ try:
         GUIDELINES = json.load(f)
         
 except (FileNotFoundError, json.JSONDecodeError, OSError) as e:
-    print(f"Warning: Could not load guidelines data: {e}")
+    get_logger("agent").warning("guidelines_load_failed", error=str(e))
     GUIDELINES = []
+
+register_structure("guidelines", lambda: GUIDELINES)
@@ -1,83 +1,59 @@
 from db.db import open_db
+from agent.intent import has_action
+from agent.handlers.parsing import find_word, parse_command, phrase_between
+from monitoring.log import get_logger
 import re
 from datetime import datetime, timedelta
 
-# Finds regex match
-def patterns_match(patterns, query_lower):
-    temp = None
-    for pattern in patterns:
-        match = re.search(pattern, query_lower)
-        if match:
-            temp = match.group(1).strip()
-            break
-    return temp
+log = get_logger("agent.handlers")
+
+# Words that start an appointment title: "appointment for <title>"
+TITLE_SUBJECT_WORDS = {'appointment', 'meeting', 'visit'}
+TITLE_STOP_WORDS = {'on', 'at', 'in'}
+CREATE_WORDS = {'make', 'book', 'schedule', 'create', 'set', 'arrange', 'fix'}
+APPOINTMENT_WORDS = {'appointment', 'appointments', 'meeting', 'visit', 'checkup', 'scan',
+                     'ultrasound', 'doctor', 'gynecologist', 'sonography'}
+APPOINTMENT_TYPES = ['ultrasound', 'checkup', 'doctor', 'prenatal', 'blood test', 'scan', 'sonography']
+
+_TIME_RE = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$')
+
+def _extract_title(parsed):
+    """Appointment title from the parsed query's tokens, or None."""
+    tokens = parsed['tokens']
+
+    # "appointment for blood test next week" -> "blood test"
+    i = find_word(parsed, TITLE_SUBJECT_WORDS)
+    while i is not None:
+        if i + 1 < len(tokens) and tokens[i + 1][1] in ('for', 'to'):
+            title = phrase_between(parsed, i + 2, TITLE_STOP_WORDS)
+            if title:
+                return title
+        i = find_word(parsed, TITLE_SUBJECT_WORDS, i + 1)
+
+    # "schedule a checkup today" -> "checkup"
+    create = find_word(parsed, CREATE_WORDS)
+    if create is not None:
+        i = find_word(parsed, APPOINTMENT_WORDS, create + 1)
+        if i is not None:
+            return tokens[i][1]
+
+    # Fall back to a known appointment type anywhere in the query
+    words = {value for _, value, _, _ in tokens}
+    words.update(f"{a[1]} {b[1]}" for a, b in zip(tokens, tokens[1:]))
+    for apt_type in APPOINTMENT_TYPES:
+        if apt_type in words:
+            return f"{apt_type.title()} Appointment"
+    return None
 
 def parse_appointment_command(query: str):
     """Parse appointment creation commands from natural language."""
-    query_lower = query.lower().strip()
-    
-    # Extract appointment type/title
-    title_patterns = [
-        r'(?:make|book|schedule|create|set|arrange|fix)\s+(?:\b(?:a|an|the)\b\s+)?(?:appointment\s+for\s+)?(.+?)\s+(?:\s+on\s+|\s+at\s+|\s+in\s+|$)',
-        r'(?:appointment|meeting|visit)\s+(?:for|to)?\s+(.+?)(?:\s+on\s+|\s+at\s+|\s+in\s+|$)',
-         r'(?:make|book|schedule|create|set|arrange|fix)\s+.*?(?:\b(?:a|an|the)\b\s+)?(appointment|meeting|visit|checkup|scan|ultrasound|doctor|gynecologist|sonography)'
-    ]
-    
-    #(?:(?:a|an|the)?\s+)
-    title = patterns_match(title_patterns, query_lower)
-    
-    if not title:
-        # Try to extract from common appointment types
-        appointment_types = ['ultrasound', 'checkup', 'doctor', 'prenatal', 'blood test', 'scan', 'sonography']
-        for apt_type in appointment_types:
-            if apt_type in query_lower:
-                title = f"{apt_type.title()} Appointment"
-                break
-    
-    # Extract date
-    date_patterns = [
-        r'(?:on\s+|for\s+|at\s+)(today|tomorrow|next\s+week|monday|tuesday|wednesday|thursday|friday|saturday|sunday|mon|tue|wed|thu|fri|sat|sun)',
-        r'(?:on\s+|for\s+|at\s+)(\d{1,2}/\d{1,2}|\d{4}-\d{2}-\d{2}|\d{4}/\d{2}/\d{2})',
-        r'(today|tomorrow|next\s+week|monday|tuesday|wednesday|thursday|friday|saturday|sunday|mon|tue|wed|thu|fri|sat|sun|\d{1,2}/\d{1,2}|\d{4}-\d{2}-\d{2}|\d{4}/\d{2}/\d{2})',
-    ]
-    
-    date_str = patterns_match(date_patterns, query_lower)
-    
-    # Extract time
-    time_patterns = [
-        r'(?:at\s+|for\s+)(\d{1,2}:\d{2}\s*(?:am|pm)?|\d{1,2}\s*(?:am|pm)|morning|afternoon|evening|night)',
-        r'(\d{1,2}:\d{2}\s*(?:am|pm)?|\d{1,2}\s*(?:am|pm)|morning|afternoon|evening|night)',
-    ]
-    
-    time_str = patterns_match(time_patterns, query_lower)
-    
-    # Extract location
-    location_patterns = [
-        r'(?:in\s+|at\s+|location\s+)(.+?)(?:\s+on\s+|\s+at\s+|\s+today|\s+tomorrow|\s+for\s+|$)',
-        r'(?:hospital|clinic|\boffice\b|center|chamber|facility|ward)\s+(.+?)(?:\s+on\s+|\s+at\s+|$)',
-    ]
-    
-    location = None
-    i=0 
-
-    while(i<len(location_patterns)):
-        pattern=location_patterns[i]
-        match = re.search(pattern, query_lower)
-        if match:
-            if any(keyword in match.group(1) for keyword in ['today', 'tomorrow', 'morning', 'afternoon', 'evening', 'night', 'next week', 'am', 'pm']):
-                query_lower = (query_lower[match.end(1):]).strip()
-                i=0
-                continue
-            else:
-                location = match.group(1).strip()
-                break
-        i+=1
+    parsed = parse_command(query)
     
     return {
-        'title': title,
-        'date': date_str,
-        'time': time_str,
-        'location': location
+        'title': _extract_title(parsed),
+        'date': parsed['date'],
+        'time': parsed['time'],
+        'location': parsed['location']
     }
 
 def parse_date(date_str):
@@ -160,33 +136,23 @@ def parse_time(time_str):
     if time_str_lower in time_map:
         return time_map[time_str_lower]
     
-    # Try to parse as HH:MM
-    try:
-        if ':' in time_str:
-            parts = time_str.split(':')
-            hours, minutes = int(parts[0]), int(parts[1])
+    # Try to parse as HH:MM, HH:MM AM/PM or HH AM/PM
+    match = _TIME_RE.match(time_str_lower.strip())
+    if match:
+        hours = int(match.group(1))
+        minutes = int(match.group(2) or 0)
+        ampm = match.group(3)
+        if ampm == 'pm' and hours != 12:
+            hours += 12
+        elif ampm == 'am' and hours == 12:
+            hours = 0
+        if (ampm or match.group(2)) and hours < 24 and minutes < 60:
             return f"{hours:02d}:{minutes:02d}"
-    except:
-        pass
-    
-    # Try to parse as HH AM/PM
-    try:
-        match = re.match(r'(\d{1,2})\s*(am|pm)', time_str_lower)
-        if match:
-            hours = int(match.group(1))
-            ampm = match.group(2)
-            if ampm == 'pm' and hours != 12:
-                hours += 12
-            elif ampm == 'am' and hours == 12:
-                hours = 0
-            return f"{hours:02d}:00"
-    except:
-        pass
     
     return '09:00'
 
-def create_appointment(appointment_data):
-    """Create a new appointment in the database."""
+def create_appointment(appointment_data, commit=True):
+    """Create a new appointment in the database. With commit=False the caller commits (or rolls back on the raised error)."""
     db = open_db()
     
     try:
@@ -197,21 +163,30 @@ def create_appointment(appointment_data):
                 f"Appointment created via chat: {appointment_data.get('content', '')}",
                 appointment_data['date'],
                 appointment_data['time'],
-                appointment_data.get('location', 'TBD'),
+                appointment_data.get('location') or 'TBD',
                 'pending'
             )
         )
-        db.commit()
+        if commit:
+            db.commit()
         return True
     except Exception as e:
-        print(f"Error creating appointment: {e}")
+        log.error("appointment_create_failed", error=str(e))
+        if not commit:
+            # Part of a batch: the caller rolls back every write in it
+            raise
         return False
 
-def handle(query: str, user_context=None):
+def handle(query: str, user_context=None, analysis=None, commit=True):
     query_lower = query.lower()
     
     # Check if this is an appointment creation command
-    if any(word in query_lower for word in ['make', 'schedule', 'book', 'create', 'appointment', 'set', 'arrange', 'fix']):
+    if analysis is not None:
+        is_create_command = has_action(analysis, "create")
+    else:
+        is_create_command = any(word in query_lower for word in ['make', 'schedule', 'book', 'create', 'appointment', 'set', 'arrange', 'fix'])
+
+    if is_create_command:
         parsed = parse_appointment_command(query)
         
         if parsed['title']:
@@ -223,7 +198,7 @@ def handle(query: str, user_context=None):
                 parsed['date'] = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
             
             # Create the appointment
-            if create_appointment(parsed):
+            if create_appointment(parsed, commit=commit):
                 return f"✅ Appointment '{parsed['title']}' has been scheduled for {parsed['date']} at {parsed['time']}"
             else:
                 return "❌ Failed to create appointment. Please try again."
@@ -1,28 +1,34 @@
-from agent.guidelines_data import GUIDELINES
+from agent.intent import analyze_query
+from agent.week_index import get_week_index
 
-def handle(query: str, user_context=None):
+def _target_week(analysis: dict, user_context=None):
+    """Week asked about ("guidelines for week 20"), else the user's current week, else None."""
+    week = analysis.get("week")
+    if week is None and user_context:
+        week = user_context.get('current_week')
+    try:
+        return int(week) if week is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def handle(query: str, user_context=None, analysis=None):
     if not query or not isinstance(query, str):
         return "Invalid query. Please provide a valid string."
-    
+
     try:
-        if not GUIDELINES:
-            return "No guidelines data available."
-        
-        response_parts = []
-        
-        if user_context:
-            current_week = user_context.get('current_week', 'Unknown')
-            location = user_context.get('location', 'India')
-            response_parts.append(f"🩺 Pregnancy Guidelines for {location} (Week {current_week}):\n")
-        else:
-            response_parts.append("🩺 Pregnancy Guidelines (India):\n")
-        
-        for g in GUIDELINES:
-            response_parts.append(f"- {g['title']} (Weeks: {g['week_range']})")
-            response_parts.append(f"  Priority: {g['priority'].capitalize()} | Org: {', '.join(g['organization'])}")
-            response_parts.append(f"  ➤ {g['purpose']}\n")
-        
-        return "\n".join(response_parts)
-    
+        # The agent passes the analysis it routed on; direct callers get one here
+        week = _target_week(analysis if analysis is not None else analyze_query(query), user_context)
+        location = user_context.get('location', 'India') if user_context else 'India'
+
+        # Guidelines for the week come pre-rendered from the week index
+        body = get_week_index().render_guidelines(week)
+        if week is None:
+            if not body:
+                return "No guidelines data available."
+            return f"🩺 Pregnancy Guidelines ({location}):\n\n{body}"
+        if not body:
+            return f"🩺 No specific pregnancy guidelines for week {week}."
+        return f"🩺 Pregnancy Guidelines for {location} (Week {week}):\n\n{body}"
+
     except (KeyError, TypeError) as e:
         return f"Error processing guidelines data: {e}"
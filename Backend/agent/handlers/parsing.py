@@ -0,0 +1,213 @@
+# agent/handlers/parsing.py
+"""
+Shared command parser for the chat handlers.
+
+A query is lowercased and tokenised in one pass by a single compiled pattern
+whose alternatives only look a bounded number of characters ahead, then one
+left-to-right scan over the tokens extracts dates, times, weights, weeks,
+locations and notes together. Every token is looked at a constant number of
+times (the scan only peeks one token ahead and two behind), so parsing work
+is linear in the length of the query and no input can make it backtrack.
+"""
+import re
+
+_TOKEN_RE = re.compile(r"""
+    (?P<date>\d{4}[-/]\d{2}[-/]\d{2}|\d{1,2}/\d{1,2}(?:/\d{4})?)
+  | (?P<time>\d{1,2}(?::\d{2})?\ ?(?:am|pm)\b|\d{1,2}:\d{2})
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<word>[a-z]+(?:'[a-z]+)?)
+""", re.VERBOSE)
+
+DATE_WORDS = {
+    "today", "tomorrow", "monday", "tuesday", "wednesday", "thursday", "friday",
+    "saturday", "sunday", "mon", "tue", "wed", "thu", "fri", "sat", "sun",
+}
+# "next week" / "next month"
+RELATIVE_DATE_UNITS = {"week", "month"}
+TIME_WORDS = {"morning", "afternoon", "evening", "night"}
+WEIGHT_UNITS = {"kg", "kgs", "kilo", "kilos", "lb", "lbs", "pound", "pounds"}
+WEIGHT_TRIGGERS = {"log", "record", "add", "weight", "weigh"}
+
+# A date/time preceded by one of these is preferred over one without
+DATE_PREPOSITIONS = {"on", "for", "at"}
+TIME_PREPOSITIONS = {"at", "for"}
+
+# Locations start after a preposition and run up to the next stop word
+LOCATION_PREPOSITIONS = {"in", "at", "location"}
+LOCATION_STOP_WORDS = {"on", "at", "for", "today", "tomorrow"}
+FACILITY_WORDS = {"hospital", "clinic", "office", "center", "chamber", "facility", "ward"}
+
+NOTE_KEYWORDS = {"note", "comment"}
+FEELING_KEYWORDS = {"felt", "feel", "feeling"}
+
+def tokenize(text: str) -> list:
+    """
+    Split lowercased text into (kind, value, start, end) tuples.
+
+    kind is one of "date", "time", "number" or "word". Possessives are folded
+    into the word value ("tomorrow's" -> "tomorrow") while the span keeps the
+    original text.
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "word" and "'" in value:
+            value = value.split("'", 1)[0]
+        tokens.append((kind, value, match.start(), match.end()))
+    return tokens
+
+def parse_command(query: str) -> dict:
+    """
+    Extract every command field from a query in one pass.
+
+    Returns:
+        dict with:
+            text     - lowercased query the spans refer to
+            tokens   - token list from tokenize()
+            roles    - per-token "date" / "time" / None
+            date     - raw date phrase ("tomorrow", "next week", "10/15", ...) or None
+            time     - raw time phrase ("2pm", "10:30 am", "morning", ...) or None
+            weight   - weight value as float or None
+            week     - pregnancy week as int or None
+            location - location phrase or None
+            note     - text after "note"/"comment" or None
+            feeling  - text after the first note or feeling word ("felt", "feel", ...) or None
+    """
+    text = (query or "").lower().strip()
+    tokens = tokenize(text)
+    n = len(tokens)
+    roles = [None] * n
+
+    date = date_any = time = time_any = None
+    weight = week = None
+    note_index = feeling_index = None
+    location = None
+    location_start = None       # token index where the current location candidate starts
+    location_has_datetime = False
+    facility_index = None
+
+    def word(i):
+        return tokens[i][1] if 0 <= i < n and tokens[i][0] == "word" else None
+
+    def close_location(end):
+        """Accept the candidate tokens[location_start:end] unless it names a date or time."""
+        nonlocal location
+        if location is None and location_start is not None and location_start < end and not location_has_datetime:
+            location = text[tokens[location_start][2]:tokens[end - 1][3]]
+
+    i = 0
+    while i < n:
+        kind, value, start, end = tokens[i]
+        previous = word(i - 1)
+        step = 1
+
+        # Dates
+        if kind == "date" or (kind == "word" and value in DATE_WORDS):
+            roles[i] = "date"
+            phrase = value if kind == "word" else text[start:end]
+        elif value == "next" and word(i + 1) in RELATIVE_DATE_UNITS:
+            roles[i] = roles[i + 1] = "date"
+            phrase = f"next {tokens[i + 1][1]}"
+            step = 2
+        else:
+            phrase = None
+        if phrase:
+            date_any = date_any or phrase
+            if previous in DATE_PREPOSITIONS and date is None:
+                date = phrase
+
+        # Times
+        if kind == "time" or (kind == "word" and value in TIME_WORDS):
+            roles[i] = "time"
+            phrase = text[start:end]
+            time_any = time_any or phrase
+            if previous in TIME_PREPOSITIONS and time is None:
+                time = phrase
+
+        # Weights and weeks
+        if kind == "number":
+            if previous == "week":
+                if week is None:
+                    week = int(float(value))
+            elif weight is None and (
+                word(i + 1) in WEIGHT_UNITS
+                or previous in WEIGHT_TRIGGERS
+                or (previous in {"is", "as"} and word(i - 2) == "weight")
+            ):
+                weight = float(value)
+
+        # Notes
+        if kind == "word":
+            if value in NOTE_KEYWORDS and note_index is None:
+                note_index = i
+            if (value in NOTE_KEYWORDS or value in FEELING_KEYWORDS) and feeling_index is None:
+                feeling_index = i
+            if value in FACILITY_WORDS and facility_index is None:
+                facility_index = i
+
+        # Locations: a stop word closes the current candidate; a preposition opens a new one
+        if location is None and kind == "word":
+            if location_start is not None and value in LOCATION_STOP_WORDS:
+                close_location(i)
+                location_start = None
+            if value in LOCATION_PREPOSITIONS and location_start is None:
+                location_start, location_has_datetime = i + 1, False
+            elif location_start is not None and roles[i]:
+                location_has_datetime = True
+        elif location_start is not None and roles[i]:
+            location_has_datetime = True
+
+        i += step
+
+    close_location(n)
+    if location is None and facility_index is not None:
+        # "clinic downtown on monday" -> "downtown"
+        location_start, location_has_datetime = facility_index + 1, False
+        for j in range(facility_index + 1, n):
+            if word(j) in {"on", "at"}:
+                close_location(j)
+                break
+            location_has_datetime = location_has_datetime or roles[j] is not None
+        else:
+            close_location(n)
+
+    return {
+        "text": text,
+        "tokens": tokens,
+        "roles": roles,
+        "date": date or date_any,
+        "time": time or time_any,
+        "weight": weight,
+        "week": week,
+        "location": location,
+        "note": _text_after(text, tokens, note_index),
+        "feeling": _text_after(text, tokens, feeling_index),
+    }
+
+def _text_after(text: str, tokens: list, index) -> str:
+    """Text following token `index` to the end of the query, or None."""
+    if index is None or index + 1 >= len(tokens):
+        return None
+    return text[tokens[index + 1][2]:].strip() or None
+
+def find_word(parsed: dict, words: set, start: int = 0):
+    """Index of the first word token from `start` whose value is in `words`, or None."""
+    for i in range(start, len(parsed["tokens"])):
+        kind, value, _, _ = parsed["tokens"][i]
+        if kind == "word" and value in words:
+            return i
+    return None
+
+def phrase_between(parsed: dict, start: int, stop_words: set) -> str:
+    """
+    Text from token `start` up to (not including) the first stop word or
+    date/time token, or None when that span is empty.
+    """
+    tokens, roles = parsed["tokens"], parsed["roles"]
+    end = start
+    while end < len(tokens) and not roles[end] and tokens[end][1] not in stop_words:
+        end += 1
+    if end == start:
+        return None
+    return parsed["text"][tokens[start][2]:tokens[end - 1][3]]
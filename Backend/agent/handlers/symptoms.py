@@ -1,50 +1,39 @@
 from db.db import open_db
-import re
+from agent.intent import has_action, matched_phrases
+from agent.handlers.parsing import find_word, parse_command, phrase_between
+from monitoring.log import get_logger
+
+log = get_logger("agent.handlers")
+
+# Words that introduce a symptom ("I have nausea", "log symptom back pain")
+SYMPTOM_TRIGGERS = {'log', 'record', 'add', 'symptom', 'symptoms', 'suffering', 'from', 'had', 'have',
+                    'has', 'having', 'felt', 'feel', 'feeling', 'experiencing'}
+SYMPTOM_FILLERS = {'a', 'an', 'my', 'some', 'of'}
+SYMPTOM_STOP_WORDS = {'for', 'since', 'on', 'at', 'with', 'note', 'comment', 'week',
+                      'yesterday', 'this', 'last'}
+
+def _extract_symptom(parsed):
+    """Symptom description following the first trigger word, or None."""
+    start = find_word(parsed, SYMPTOM_TRIGGERS)
+    if start is None:
+        return None
+    tokens = parsed['tokens']
+    while start < len(tokens) and (tokens[start][1] in SYMPTOM_TRIGGERS or tokens[start][1] in SYMPTOM_FILLERS):
+        start += 1
+    return phrase_between(parsed, start, SYMPTOM_STOP_WORDS)
 
 def parse_symptom_command(query: str):
     """Parse symptom logging commands from natural language."""
-    query_lower = query.lower()
-    
-    # Extract symptom description
-    symptom_patterns = [
-        r'(?:log|record|add|symptom|symptoms?|suffering|from|had|have|felt|feel|feeling)\s+(.+?)(?:\s+for\s+week\s+(\d+)|\s+since\s+|\s+on\s+|\s+for\s+)?(?:\s+note\s+(.+))?$',
-        r'(?:symptom|symptoms?)\s+(.+?)(?:\s+week\s+(\d+))?(?:\s+note\s+(.+))?$',
-    ]
-    
-    symptom = None
-    week = None
-    note = None
-    
-    for pattern in symptom_patterns:
-        match = re.search(pattern, query_lower)
-        if match:
-            symptom = match.group(1).strip()
-            if len(match.groups()) > 1 and match.group(2):
-                week = int(match.group(2))
-            if len(match.groups()) > 2 and match.group(3):
-                note = match.group(3).strip()
-            break
-    
-    # Extract week if not found above
-    if not week:
-        week_match = re.search(r'(?:week|for\s+week)\s+(\d+)', query_lower)
-        if week_match:
-            week = int(week_match.group(1))
-    
-    # Extract note if not found above
-    if not note:
-        note_match = re.search(r'(?:note|comment)\s+(.+)', query_lower)
-        if note_match:
-            note = note_match.group(1).strip()
+    parsed = parse_command(query)
     
     return {
-        'symptom': symptom,
-        'week': week,
-        'note': note
+        'symptom': _extract_symptom(parsed),
+        'week': parsed['week'],
+        'note': parsed['note']
     }
 
-def create_symptom_entry(symptom_data, user_context):
-    """Create a new symptom entry in the database."""
+def create_symptom_entry(symptom_data, user_context, commit=True):
+    """Create a new symptom entry in the database. With commit=False the caller commits (or rolls back on the raised error)."""
     db = open_db()
     
     try:
@@ -55,24 +44,33 @@ def create_symptom_entry(symptom_data, user_context):
             'INSERT INTO weekly_symptoms (week_number, symptom, note) VALUES (?, ?, ?)',
             (week, symptom_data['symptom'], symptom_data['note'] or 'Logged via chat')
         )
-        db.commit()
+        if commit:
+            db.commit()
         return True
     except Exception as e:
-        print(f"Error creating symptom entry: {e}")
+        log.error("symptom_create_failed", error=str(e))
+        if not commit:
+            # Part of a batch: the caller rolls back every write in it
+            raise
         return False
 
-def handle(query: str, user_context=None):
+def handle(query: str, user_context=None, analysis=None, commit=True):
     if not query or not isinstance(query, str):
         return "Invalid query. Please provide a valid string."
     
     query_lower = query.lower()
     
     # Check if this is a symptom logging command
-    if any(word in query_lower for word in ['log', 'record', 'add', 'symptom']):
+    if analysis is not None:
+        is_log_command = has_action(analysis, "log") or "symptom" in matched_phrases(analysis, "symptoms")
+    else:
+        is_log_command = any(word in query_lower for word in ['log', 'record', 'add', 'symptom'])
+
+    if is_log_command:
         parsed = parse_symptom_command(query)
         
         if parsed['symptom']:
-            if create_symptom_entry(parsed, user_context):
+            if create_symptom_entry(parsed, user_context, commit=commit):
                 week = parsed['week'] or user_context.get('current_week', 'current')
                 return f"✅ Symptom '{parsed['symptom']}' has been logged for week {week}"
             else:
@@ -1,45 +1,22 @@
 from db.db import open_db
-import re
+from agent.intent import has_action, matched_phrases
+from agent.handlers.parsing import parse_command
+from monitoring.log import get_logger
+
+log = get_logger("agent.handlers")
 
 def parse_weight_command(query: str):
     """Parse weight logging commands from natural language."""
-    query_lower = query.lower()
-    
-    # Extract weight value
-    weight_patterns = [
-        r'(?:log|record|add|my\s+weight\s+as|weight\s+is|weight\s+)\s*(\d+(?:\.\d+)?)\s*(?:kg|kilos|kgs|lb|lbs|pound|pounds)?',
-        r'(\d+(?:\.\d+)?)\s*(?:kg|kilos?)(?:\s+for\s+week\s+(\d+))?',
-    ]
-    
-    weight = None
-    week = None
-    
-    for pattern in weight_patterns:
-        match = re.search(pattern, query_lower)
-        if match:
-            weight = float(match.group(1))
-            if len(match.groups()) > 1 and match.group(2):
-                week = int(match.group(2))
-            break
-    
-    # Extract week if not found above
-    if not week:
-        week_match = re.search(r'(?:week|for\s+week)\s+(\d+)', query_lower)
-        if week_match:
-            week = int(week_match.group(1))
-    
-    # Extract note
-    note_match = re.search(r'\b(?:note|comment|felt|feel|feeling)\b\s+(.+)', query_lower)
-    note = note_match.group(1).strip() if note_match else None
+    parsed = parse_command(query)
     
     return {
-        'weight': weight,
-        'week': week,
-        'note': note
+        'weight': parsed['weight'],
+        'week': parsed['week'],
+        'note': parsed['feeling']
     }
 
-def create_weight_entry(weight_data, user_context):
-    """Create a new weight entry in the database."""
+def create_weight_entry(weight_data, user_context, commit=True):
+    """Create a new weight entry in the database. With commit=False the caller commits (or rolls back on the raised error)."""
     db = open_db()
     
     try:
@@ -50,24 +27,33 @@ def create_weight_entry(weight_data, user_context):
             'INSERT INTO weekly_weight (week_number, weight, note) VALUES (?, ?, ?)',
             (week, weight_data['weight'], weight_data['note'] or 'Logged via chat')
         )
-        db.commit()
+        if commit:
+            db.commit()
         return True
     except Exception as e:
-        print(f"Error creating weight entry: {e}")
+        log.error("weight_create_failed", error=str(e))
+        if not commit:
+            # Part of a batch: the caller rolls back every write in it
+            raise
         return False
 
-def handle(query: str, user_context=None):
+def handle(query: str, user_context=None, analysis=None, commit=True):
     if not query or not isinstance(query, str):
         return "Invalid query. Please provide a valid string."
     
     query_lower = query.lower()
     
     # Check if this is a weight logging command
-    if any(word in query_lower for word in ['log', 'record', 'add', 'weight']) and any(char.isdigit() for char in query):
+    if analysis is not None:
+        is_log_command = has_action(analysis, "log") or bool(matched_phrases(analysis, "weight"))
+    else:
+        is_log_command = any(word in query_lower for word in ['log', 'record', 'add', 'weight'])
+
+    if is_log_command and any(char.isdigit() for char in query):
         parsed = parse_weight_command(query)
         
         if parsed['weight']:
-            if create_weight_entry(parsed, user_context):
+            if create_weight_entry(parsed, user_context, commit=commit):
                 week = parsed['week'] or user_context.get('current_week', 'current')
                 return f"✅ Weight of {parsed['weight']}kg has been logged for week {week}"
             else:
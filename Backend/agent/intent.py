@@ -1,15 +1,294 @@
 # agent/intent.py
+"""
+Keyword and phrase intent classifier.
+
+All keywords are compiled once into a token trie. A query is tokenised in a
+single pass and matched leftmost-longest against the trie, so every token is
+visited at most MAX_PHRASE_TOKENS times. Each intent is scored by the summed
+weight of its matched phrases; the result carries the ranked intents with
+confidence scores and the matched spans so handlers don't have to re-scan the
+query with their own keyword lists.
+"""
+import re
+
+# Minimum score for a query to be routed to a specialised handler
+MIN_INTENT_SCORE = 1.5
+
+# Topic phrases per intent with their weights. Phrases are matched on normalised
+# tokens, so plurals ("appointments", "vaccines") match their singular form.
+INTENT_KEYWORDS = {
+    # Visit nouns alone are questions too ("should I visit a doctor if I have cramps?");
+    # they route here after an imperative create verb ("schedule ultrasound tomorrow").
+    "appointments": [
+        ("appointment", 3.0), ("reschedule", 2.0), ("checkup", 0.5), ("check up", 0.5),
+        ("ultrasound", 0.5), ("sonography", 0.5), ("gynecologist", 0.5), ("consultation", 0.5),
+        ("doctor", 0.5), ("meeting", 0.5), ("visit", 0.5), ("blood test", 0.5),
+        ("clinic", 0.5), ("hospital", 0.5),
+    ],
+    # Units and symptom words alone stay below the threshold: "how many kg should I
+    # gain?" or "is it normal to feel tired?" are questions for the general path.
+    # They route to the tracking handlers with the explicit noun or a command verb.
+    "weight": [
+        ("weight", 2.5), ("weigh", 2.5), ("weight gain", 2.5),
+        ("kg", 0.5), ("kgs", 0.5), ("kilo", 0.5), ("lbs", 0.5), ("pound", 0.5),
+    ],
+    "symptoms": [
+        ("symptom", 3.0), ("morning sickness", 0.5), ("nausea", 0.5), ("nauseous", 0.5),
+        ("dizzy", 0.5), ("dizziness", 0.5), ("headache", 0.5), ("back pain", 0.5), ("pain", 0.5),
+        ("cramp", 0.5), ("vomiting", 0.5), ("fatigue", 0.5), ("swelling", 0.5),
+        ("heartburn", 0.5), ("sick", 0.5), ("tired", 0.5),
+    ],
+    "guidelines": [
+        ("vaccine", 3.0), ("vaccination", 3.0), ("guideline", 3.0), ("what test", 3.0),
+        ("recommend", 2.5), ("recommendation", 2.5), ("screening", 1.5),
+    ],
+}
+
+# Action phrases shared by the handlers (create vs. log commands)
+ACTION_KEYWORDS = {
+    "create": ["make", "book", "schedule", "create", "set", "arrange", "fix"],
+    "log": ["log", "record", "add"],
+}
+
+# Intents whose topic words only count as a command together with a command verb
+# ("log headache", "record 65 kg")
+ACTION_GATED_INTENTS = ("weight", "symptoms")
+ACTION_BONUS = 1.0
+
+# A create verb opening the message and directly followed by an appointment noun
+# ("book an ultrasound for tomorrow") makes it an appointment command
+IMPERATIVE_BONUS = 1.5
+_IMPERATIVE_PREFIXES = {"please"}
+_DETERMINERS = {"a", "an", "the", "my"}
+
+# Messages opening with these words (or ending in "?") are questions, not commands:
+# "when should I book an ultrasound?". Requests to the assistant ("can you book an
+# ultrasound?") are commands.
+QUESTION_WORDS = {"when", "should", "how", "can", "could", "would", "will", "shall", "what", "why",
+                  "where", "which", "who", "is", "are", "do", "does", "did"}
+_REQUEST_OPENERS = {"can", "could", "would", "will"}
+
+_TOKEN_RE = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+_ENTRIES = "$"
+
+def _normalize(token: str) -> str:
+    """Fold simple plurals so 'appointments' matches 'appointment'."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> list:
+    """Lowercase word/number tokens as (normalised token, start, end) tuples."""
+    return [(_normalize(m.group()), m.start(), m.end()) for m in _TOKEN_RE.finditer(text.lower())]
+
+def _compile(intent_keywords: dict, action_keywords: dict) -> tuple[dict, int]:
+    """
+    Build the token trie. Terminal nodes hold (kind, label, weight, phrase) entries.
+    Phrases of one label that normalise to the same tokens ("pound", "pounds") are
+    kept once, at the highest weight, so a single word is never scored twice.
+    """
+    trie, max_len = {}, 0
+    phrases = [("intent", intent, phrase, weight)
+               for intent, keywords in intent_keywords.items() for phrase, weight in keywords]
+    phrases += [("action", action, phrase, 0.0)
+                for action, keywords in action_keywords.items() for phrase in keywords]
+
+    unique = {}
+    for kind, label, phrase, weight in phrases:
+        key = (kind, label, tuple(token for token, _, _ in tokenize(phrase)))
+        if key not in unique or weight > unique[key][1]:
+            unique[key] = (phrase, weight)
+
+    for (kind, label, tokens), (phrase, weight) in unique.items():
+        node = trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_ENTRIES, []).append((kind, label, weight, phrase))
+        max_len = max(max_len, len(tokens))
+    return trie, max_len
+
+_TRIE, MAX_PHRASE_TOKENS = _compile(INTENT_KEYWORDS, ACTION_KEYWORDS)
+
+def _match_spans(tokens: list) -> list:
+    """Leftmost-longest, non-overlapping phrase matches over the token stream."""
+    matches, i = [], 0
+    while i < len(tokens):
+        node, best = _TRIE, None
+        for j in range(i, min(i + MAX_PHRASE_TOKENS, len(tokens))):
+            node = node.get(tokens[j][0])
+            if node is None:
+                break
+            if _ENTRIES in node:
+                best = (j, node[_ENTRIES])
+        if best is None:
+            i += 1
+            continue
+        end_index, entries = best
+        start, end = tokens[i][1], tokens[end_index][2]
+        for kind, label, weight, phrase in entries:
+            matches.append({"kind": kind, "label": label, "weight": weight,
+                            "phrase": phrase, "start": start, "end": end})
+        i = end_index + 1
+    return matches
+
+def analyze_query(query: str) -> dict:
+    """
+    Classify a query.
+
+    Returns:
+        dict with:
+            intent  - best intent, or "general" when no intent scores MIN_INTENT_SCORE
+            ranked  - [{"intent", "score", "confidence", "matches"}] best first
+            actions - [{"action", "phrase", "start", "end"}] command verbs found; empty
+                      for questions, whose verbs are not commands
+            week    - pregnancy week named as "week N", or None
+            question - whether the query is phrased as a question
+    """
+    if not query or not isinstance(query, str):
+        return {"intent": "general", "ranked": [], "actions": [], "week": None, "question": False}
+
+    tokens = tokenize(query)
+    scores, spans, first_seen, actions = {}, {}, {}, []
+    for position, match in enumerate(_match_spans(tokens)):
+        span = {"phrase": match["phrase"], "start": match["start"], "end": match["end"]}
+        if match["kind"] == "action":
+            actions.append({"action": match["label"], **span})
+            continue
+        intent = match["label"]
+        scores[intent] = scores.get(intent, 0.0) + match["weight"]
+        spans.setdefault(intent, []).append(span)
+        first_seen.setdefault(intent, position)
+
+    question = _is_question(query, tokens)
+    if question:
+        # Asking about booking something is a question for the general path
+        if any(a["action"] == "create" for a in actions):
+            scores.pop("appointments", None)
+        actions = []
+    elif "appointments" in scores and _opens_with_create(tokens, actions, spans["appointments"]):
+        scores["appointments"] += IMPERATIVE_BONUS
+
+    if actions:
+        for intent in ACTION_GATED_INTENTS:
+            if intent in scores:
+                scores[intent] += ACTION_BONUS
+
+    total = sum(scores.values())
+    ranked = sorted(
+        ({"intent": intent, "score": score, "confidence": round(score / total, 3), "matches": spans[intent]}
+         for intent, score in scores.items()),
+        # Ties go to the intent mentioned first
+        key=lambda r: (-r["score"], first_seen[r["intent"]])
+    )
+    intent = ranked[0]["intent"] if ranked and ranked[0]["score"] >= MIN_INTENT_SCORE else "general"
+    return {"intent": intent, "ranked": ranked, "actions": actions, "week": _week_mentioned(tokens),
+            "question": question}
+
+def _request_prefix(tokens: list) -> int:
+    """Number of leading tokens that address the assistant ("can you", "please")."""
+    i = 2 if len(tokens) > 1 and tokens[0][0] in _REQUEST_OPENERS and tokens[1][0] == "you" else 0
+    while i < len(tokens) and tokens[i][0] in _IMPERATIVE_PREFIXES:
+        i += 1
+    return i
+
+def _is_question(query: str, tokens: list) -> bool:
+    if _request_prefix(tokens):
+        return False
+    return query.rstrip().endswith("?") or bool(tokens) and tokens[0][0] in QUESTION_WORDS
+
+def _opens_with_create(tokens: list, actions: list, noun_spans: list) -> bool:
+    """Whether the message opens with a create verb directly followed by one of `noun_spans`."""
+    i = _request_prefix(tokens)
+    verb = next((a for a in actions if a["action"] == "create" and i < len(tokens)
+                 and a["start"] == tokens[i][1]), None)
+    if verb is None:
+        return False
+    i += 1
+    while i < len(tokens) and tokens[i][1] < verb["end"]:
+        i += 1
+    while i < len(tokens) and tokens[i][0] in _DETERMINERS:
+        i += 1
+    return i < len(tokens) and any(span["start"] == tokens[i][1] for span in noun_spans)
+
+def _week_mentioned(tokens: list):
+    """The number after the first "week" token ("guidelines for week 20"), else None."""
+    for (token, _, _), (value, _, _) in zip(tokens, tokens[1:]):
+        if token == "week" and value[0].isdigit():
+            return int(float(value))
+    return None
+
 def classify_intent(query: str) -> str:
+    return analyze_query(query)["intent"]
+
+def has_action(analysis: dict, action: str) -> bool:
+    """Whether the analysed query contains a command verb of the given action type."""
+    return any(a["action"] == action for a in (analysis or {}).get("actions", []))
+
+def matched_phrases(analysis: dict, intent: str) -> list:
+    """Phrases matched for `intent` in the analysed query."""
+    for ranked in (analysis or {}).get("ranked", []):
+        if ranked["intent"] == intent:
+            return [m["phrase"] for m in ranked["matches"]]
+    return []
+
+# Separators between commands in one message ("... and ...", "...; ...", "... then ...")
+_COMMAND_SEPARATOR_RE = re.compile(r"\s*(?:[;,]|\s(?:and\s+then|and|then|also)\s)\s*", re.IGNORECASE)
+
+def split_commands(query: str) -> list:
+    """
+    Split a message into the commands it contains.
+
+    The message is cut at separators, and a piece only starts a new command when
+    it routes to a handler and either names a different intent than the command
+    before it or has its own action verb ("log weight 65kg and symptom nausea"),
+    or when it is a question following a handler command ("log weight 65kg and
+    what should I eat this week?"), which is answered as a general command.
+    Anything else stays attached to the previous command, so "feeling nauseous
+    and tired" remains a single command. A handler command without a verb
+    inherits the previous handler command's actions. Leading text that routes
+    nowhere and is not a question is folded into the first command.
+
+    Returns:
+        list of {"text", "intent", "analysis"} in message order; a single
+        element for ordinary one-command messages.
+    """
     if not query or not isinstance(query, str):
-        return "general"
-    
-    query = query.lower()
-    if "appointment" in query:
-        return "appointments"
-    elif "weight" in query:
-        return "weight"
-    elif "symptom" in query:
-        return "symptoms"
-    elif "vaccine" in query or "guideline" in query or "what tests" in query or "recommend" in query:
-        return "guidelines"
-    return "general"
+        return []
+
+    pieces, start = [], 0
+    for separator in _COMMAND_SEPARATOR_RE.finditer(query):
+        pieces.append((start, separator.start(), separator.end()))
+        start = separator.end()
+    pieces.append((start, len(query), len(query)))
+
+    commands = []
+    for piece_start, piece_end, separator_end in pieces:
+        text = query[piece_start:piece_end]
+        if not text.strip():
+            continue
+        analysis = analyze_query(text)
+        previous = commands[-1] if commands else None
+        if analysis["intent"] == "general":
+            starts_command = previous is None or (analysis["question"] and previous["intent"] != "general")
+        else:
+            starts_command = previous is None or analysis["intent"] != previous["intent"] or bool(analysis["actions"])
+        if (starts_command and previous is not None and previous["intent"] == "general"
+                and not previous["analysis"]["question"]):
+            # Leading small talk ("hi and log weight 65kg") belongs to the first real command
+            previous.update(end=piece_end, intent=analysis["intent"], merged=True)
+        elif starts_command:
+            commands.append({"start": piece_start, "end": piece_end, "intent": analysis["intent"], "analysis": analysis})
+        else:
+            previous["end"] = piece_end
+            previous["merged"] = True
+
+    result, inherited_actions = [], []
+    for command in commands:
+        text = query[command["start"]:command["end"]].strip()
+        analysis = analyze_query(text) if command.get("merged") else command["analysis"]
+        if analysis["intent"] != "general":
+            if not analysis["actions"] and inherited_actions:
+                analysis = {**analysis, "actions": inherited_actions}
+            inherited_actions = analysis["actions"]
+        result.append({"text": text, "intent": analysis["intent"], "analysis": analysis})
+    return result
@@ -1,55 +1,169 @@
-def run_llm(prompt: str) -> str:
+"""
+LLM backends.
+
+A backend turns a prompt into text, either all at once (`generate`) or as a
+generator of text chunks (`stream`). Streams are lazy: a chunk is only produced
+when the consumer asks for the next one, and closing the generator stops
+generation, so nothing is generated for a client that has gone away.
+
+The backend is selected with the BABYNEST_LLM_BACKEND environment variable:
+    keyword - canned responses picked by keyword (default; the real model runs
+              in the frontend with Llama.rn)
+    fake    - deterministic streaming backend for tests
+    http    - local llama.cpp-style inference server, see agent/llm_http.py
+"""
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+DEFAULT_MAX_TOKENS = 500
+DEFAULT_TEMPERATURE = 0.7
+SYSTEM_MESSAGE = "You are BabyNest, an empathetic pregnancy companion providing personalized, evidence-based guidance."
+
+_CHUNK_RE = re.compile(r"\S+\s*|\s+")
+
+class LLMBackend(ABC):
     """
-    Run LLM inference. 
-    
-    For the offline BabyNest app:
-    - This will be called from the frontend using Llama.rn
-    - The frontend will handle the actual LLM inference
-    - This function prepares the prompt for frontend processing
-    
-    Args:
-        prompt: The formatted prompt with user context and query
-        
-    Returns:
-        str: LLM response (will be replaced by frontend Llama.rn call)
+    Interface every backend implements. A backend missing either method can't be
+    instantiated, so it fails when it is built rather than partway through a request.
     """
-    # TODO: Replace with frontend Llama.rn integration
-    # For now, return a structured response based on the prompt content
-    
-    if "weight" in prompt.lower():
-        return """Based on your weight tracking data, you're showing a healthy pattern. 
+
+    name = "base"
+
+    @abstractmethod
+    def stream(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+               temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+        """Yield the response as text chunks; closing the generator stops generation."""
+
+    @abstractmethod
+    def generate(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 temperature: float = DEFAULT_TEMPERATURE) -> str:
+        """Return the whole response."""
+
+class KeywordBackend(LLMBackend):
+    """
+    Canned responses chosen by keyword.
+
+    For the offline BabyNest app the actual inference happens in the frontend
+    with Llama.rn; this backend keeps the server-side flow working until then.
+    """
+
+    name = "keyword"
+
+    def respond(self, prompt: str) -> str:
+        if "weight" in prompt.lower():
+            return """Based on your weight tracking data, you're showing a healthy pattern. 
         Your weight gain is within normal ranges for pregnancy. Continue monitoring weekly 
         and consult your healthcare provider if you notice any sudden changes."""
     
-    elif "appointment" in prompt.lower():
-        return """I can help you manage your appointments. Based on your current week, 
+        elif "appointment" in prompt.lower():
+            return """I can help you manage your appointments. Based on your current week, 
         you should focus on regular prenatal checkups. Would you like me to suggest 
         optimal scheduling times or help reschedule any missed appointments?"""
     
-    elif "symptoms" in prompt.lower():
-        return """I see you're tracking various symptoms. This is normal during pregnancy. 
+        elif "symptoms" in prompt.lower():
+            return """I see you're tracking various symptoms. This is normal during pregnancy. 
         Continue monitoring and report any concerning symptoms to your healthcare provider. 
         Your tracking data helps identify patterns that may need attention."""
     
-    else:
-        return """I'm here to support your pregnancy journey! Based on your current week 
+        else:
+            return """I'm here to support your pregnancy journey! Based on your current week 
         and tracking data, you're doing well. Remember to stay hydrated, get adequate rest, 
         and maintain regular prenatal care. Is there anything specific you'd like to know 
         about your current pregnancy week?"""
 
+    def generate(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 temperature: float = DEFAULT_TEMPERATURE) -> str:
+        return self.respond(prompt)
+
+    def stream(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+               temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+        for chunk in _CHUNK_RE.findall(self.respond(prompt))[:max_tokens]:
+            yield chunk
+
+class FakeStreamingBackend(LLMBackend):
+    """
+    Deterministic streaming backend for tests.
+
+    Emits `n_tokens` tokens ("token0 ", "token1 ", ...) with `delay` seconds
+    before each one and counts how many were actually generated.
+    """
+
+    name = "fake"
+
+    def __init__(self, n_tokens: int = 50, delay: float = 0.0):
+        self.n_tokens = n_tokens
+        self.delay = delay
+        self.generated = 0
+
+    def stream(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+               temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+        for i in range(min(self.n_tokens, max_tokens)):
+            if self.delay:
+                time.sleep(self.delay)
+            self.generated += 1
+            yield f"token{i} "
+
+    def generate(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 temperature: float = DEFAULT_TEMPERATURE) -> str:
+        return "".join(self.stream(prompt, max_tokens=max_tokens, temperature=temperature))
+
+_backends = {
+    KeywordBackend.name: KeywordBackend,
+    FakeStreamingBackend.name: FakeStreamingBackend,
+}
+_backend = None
+
+def get_llm_backend() -> LLMBackend:
+    """The configured backend (created on first use)."""
+    global _backend
+    if _backend is None:
+        name = os.getenv("BABYNEST_LLM_BACKEND", KeywordBackend.name).lower()
+        if name == "http":
+            from agent.llm_http import HTTPBackend
+            _backends[name] = HTTPBackend
+        if name not in _backends:
+            raise ValueError(f"Unknown LLM backend: {name}")
+        _backend = _backends[name]()
+    return _backend
+
+def set_llm_backend(backend: LLMBackend) -> LLMBackend:
+    """Replace the backend (used by tests); returns the previous one."""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+def run_llm(prompt: str) -> str:
+    """
+    Run LLM inference.
+
+    Args:
+        prompt: The formatted prompt with user context and query
+
+    Returns:
+        str: Full LLM response
+    """
+    return get_llm_backend().generate(prompt)
+
+def stream_llm(prompt: str) -> Iterator[str]:
+    """Run LLM inference, yielding text chunks as they are generated."""
+    return get_llm_backend().stream(prompt)
+
 def prepare_prompt_for_frontend(prompt: str) -> dict:
     """
     Prepare prompt for frontend Llama.rn processing.
-    
+
     Args:
         prompt: The formatted prompt
-        
+
     Returns:
         dict: Structured data for frontend LLM processing
     """
     return {
         "prompt": prompt,
-        "max_tokens": 500,
-        "temperature": 0.7,
-        "system_message": "You are BabyNest, an empathetic pregnancy companion providing personalized, evidence-based guidance."
+        "max_tokens": DEFAULT_MAX_TOKENS,
+        "temperature": DEFAULT_TEMPERATURE,
+        "system_message": SYSTEM_MESSAGE
     }
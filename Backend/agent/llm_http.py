@@ -0,0 +1,282 @@
+"""
+HTTP LLM backend for a local inference server (llama.cpp-style `/completion`).
+
+Three pieces keep a single local model server busy without overloading it:
+
+- ConnectionPool: persistent keep-alive connections, so requests don't pay for a
+  new TCP connection each time.
+- MicroBatcher: prompts that arrive within a short window (and share sampling
+  parameters) are sent to the server as one batched request.
+- A concurrency limit on in-flight server requests (batches and streams), with a
+  queue timeout: a prompt that can't be dispatched in time fails with
+  LLMQueueTimeout instead of waiting forever.
+
+Configuration (environment):
+    BABYNEST_LLM_URL              server base URL (default http://127.0.0.1:8080)
+    BABYNEST_LLM_MAX_CONCURRENCY  in-flight requests to the server (default 4)
+    BABYNEST_LLM_MAX_BATCH        prompts per batched request (default 8)
+    BABYNEST_LLM_BATCH_WINDOW_MS  how long to wait for more prompts (default 10)
+    BABYNEST_LLM_QUEUE_TIMEOUT    seconds a prompt may wait for dispatch (default 30)
+    BABYNEST_LLM_REQUEST_TIMEOUT  socket timeout per request (default 120)
+"""
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterator
+from urllib.parse import urlparse
+
+from agent.llm import DEFAULT_MAX_TOKENS, DEFAULT_TEMPERATURE, LLMBackend
+
+COMPLETION_PATH = "/completion"
+
+class LLMQueueTimeout(Exception):
+    """A prompt waited longer than the queue timeout for a free server slot."""
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive HTTP connections to one server."""
+
+    # Errors that mean a kept-alive connection was closed by the server
+    STALE_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    BrokenPipeError, ConnectionResetError)
+
+    def __init__(self, url: str, size: int = 4, timeout: float = 120.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.https = parsed.scheme == "https"
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self.created = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        self.created += 1
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool = True):
+        if not reusable:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method: str, path: str, body: dict) -> http.client.HTTPResponse:
+        """
+        Send a JSON request and return the response with its connection attached
+        (`response.pool_connection`). The caller must read the response and then
+        call release(). A stale kept-alive connection is replaced once, by a new
+        connection: the other idle ones may have been closed by the server too.
+        """
+        payload = json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        conn = self.acquire()
+        for attempt in range(2):
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.pool_connection = conn
+                return response
+            except self.STALE_ERRORS:
+                conn.close()
+                if attempt == 1:
+                    raise
+                conn = self._connect()
+            except Exception:
+                conn.close()
+                raise
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+class MicroBatcher:
+    """
+    Groups concurrent submissions into batches.
+
+    Submissions are collected for up to `window` seconds (or until `max_batch`
+    items), split by their parameters, and each group is handed to
+    `process_batch(items, params) -> results` on a worker thread. At most
+    `max_concurrency` batches run at once (the slots are shared with `slot()`
+    users such as streams); an item that has not started within `queue_timeout`
+    seconds fails with LLMQueueTimeout.
+    """
+
+    def __init__(self, process_batch: Callable[[list, tuple], list], max_batch: int = 8,
+                 window: float = 0.01, max_concurrency: int = 4, queue_timeout: float = 30.0):
+        self.process_batch = process_batch
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        self.stats = {"submitted": 0, "batches": 0, "queue_timeouts": 0}
+        self._queue = queue.Queue()
+        self._workers = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-batch")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="llm-batcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, item, params: tuple = ()) -> Future:
+        future = Future()
+        self._count("submitted")
+        self._queue.put((item, params, future, time.monotonic()))
+        return future
+
+    def _count(self, stat: str, n: int = 1):
+        # Updated from callers, batch workers and stream threads
+        with self._stats_lock:
+            self.stats[stat] += n
+
+    def slot(self, timeout: float = None):
+        """Context manager holding one concurrency slot (raises LLMQueueTimeout)."""
+        return _Slot(self, self.queue_timeout if timeout is None else timeout)
+
+    def _dispatch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            groups = {}
+            for entry in batch:
+                groups.setdefault(entry[1], []).append(entry)
+            for params, entries in groups.items():
+                self._workers.submit(self._run_batch, entries, params)
+
+    def _run_batch(self, entries: list, params: tuple):
+        oldest = min(enqueued for _, _, _, enqueued in entries)
+        wait = oldest + self.queue_timeout - time.monotonic()
+        if wait <= 0 or not self._slots.acquire(timeout=wait):
+            self._count("queue_timeouts", len(entries))
+            for _, _, future, _ in entries:
+                future.set_exception(LLMQueueTimeout(f"No LLM slot free within {self.queue_timeout}s"))
+            return
+        try:
+            self._count("batches")
+            results = self.process_batch([item for item, _, _, _ in entries], params)
+            for (_, _, future, _), result in zip(entries, results):
+                future.set_result(result)
+        except Exception as e:
+            for _, _, future, _ in entries:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+class _Slot:
+    def __init__(self, batcher: MicroBatcher, timeout: float):
+        self.batcher = batcher
+        self.timeout = timeout
+
+    def __enter__(self):
+        if not self.batcher._slots.acquire(timeout=self.timeout):
+            self.batcher._count("queue_timeouts")
+            raise LLMQueueTimeout(f"No LLM slot free within {self.timeout}s")
+        return self
+
+    def __exit__(self, *exc):
+        self.batcher._slots.release()
+        return False
+
+class HTTPBackend(LLMBackend):
+    """LLM backend talking to a local llama.cpp-style server."""
+
+    name = "http"
+
+    def __init__(self, url: str = None, max_concurrency: int = None, max_batch: int = None,
+                 batch_window_ms: float = None, queue_timeout: float = None, request_timeout: float = None):
+        self.url = url or os.getenv("BABYNEST_LLM_URL", "http://127.0.0.1:8080")
+        max_concurrency = max_concurrency or int(os.getenv("BABYNEST_LLM_MAX_CONCURRENCY", "4"))
+        max_batch = max_batch or int(os.getenv("BABYNEST_LLM_MAX_BATCH", "8"))
+        if batch_window_ms is None:
+            batch_window_ms = float(os.getenv("BABYNEST_LLM_BATCH_WINDOW_MS", "10"))
+        self.queue_timeout = queue_timeout or float(os.getenv("BABYNEST_LLM_QUEUE_TIMEOUT", "30"))
+        self.request_timeout = request_timeout or float(os.getenv("BABYNEST_LLM_REQUEST_TIMEOUT", "120"))
+
+        self.pool = ConnectionPool(self.url, size=max_concurrency, timeout=self.request_timeout)
+        self.batcher = MicroBatcher(
+            self._complete_batch,
+            max_batch=max_batch,
+            window=batch_window_ms / 1000,
+            max_concurrency=max_concurrency,
+            queue_timeout=self.queue_timeout,
+        )
+
+    def generate(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 temperature: float = DEFAULT_TEMPERATURE) -> str:
+        future = self.batcher.submit(prompt, (max_tokens, temperature))
+        return future.result(timeout=self.queue_timeout + self.request_timeout)
+
+    def _complete_batch(self, prompts: list, params: tuple) -> list:
+        """One /completion request for all prompts (a list prompt returns a list of results)."""
+        max_tokens, temperature = params
+        body = {
+            "prompt": prompts[0] if len(prompts) == 1 else prompts,
+            "n_predict": max_tokens,
+            "temperature": temperature,
+        }
+        response = self.pool.request("POST", COMPLETION_PATH, body)
+        try:
+            data = json.loads(response.read().decode("utf-8"))
+        finally:
+            self.pool.release(response.pool_connection, reusable=not response.will_close)
+        if response.status != 200:
+            raise RuntimeError(f"LLM server returned {response.status}: {data}")
+
+        results = data if isinstance(data, list) else [data]
+        if len(results) != len(prompts):
+            raise RuntimeError(f"LLM server returned {len(results)} results for {len(prompts)} prompts")
+        return [r.get("content", "") for r in results]
+
+    def stream(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+               temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+        """
+        Stream tokens from the server. Streams hold a concurrency slot but are not
+        batched. Closing the generator early drops the connection, which tells the
+        server to stop generating.
+        """
+        with self.batcher.slot():
+            response = self.pool.request("POST", COMPLETION_PATH, {
+                "prompt": prompt,
+                "n_predict": max_tokens,
+                "temperature": temperature,
+                "stream": True,
+            })
+            finished = False
+            try:
+                if response.status != 200:
+                    raise RuntimeError(f"LLM server returned {response.status}")
+                for line in response:
+                    line = line.strip()
+                    if not line.startswith(b"data:"):
+                        continue
+                    event = json.loads(line[5:])
+                    if event.get("content"):
+                        yield event["content"]
+                    if event.get("stop"):
+                        break
+                response.read()
+                finished = True
+            finally:
+                self.pool.release(response.pool_connection, reusable=finished and not response.will_close)
@@ -1,44 +1,38 @@
-def build_prompt(query, context, user_context=None):
-    """
-    Build a comprehensive prompt with user context and retrieved knowledge.
-    
-    Args:
-        query: User's question
-        context: Retrieved knowledge from vector store
-        user_context: User's profile and tracking data from cache
-    """
-    
-    # Build user context section
-    user_context_section = ""
-    if user_context:
-        user_context_section = f"""
-User Profile & Current Status:
-- Pregnancy Week: {user_context.get('current_week', 'Unknown')}
-- Location: {user_context.get('location', 'Unknown')}
-- Age: {user_context.get('age', 'Unknown')}
-- Current Weight: {user_context.get('weight', 'Unknown')} kg
-- Due Date: {user_context.get('due_date', 'Unknown')}
+"""
+Prompt builder.
 
-Recent Tracking Data:
-- Weight Tracking: {len(user_context.get('tracking_data', {}).get('weight', []))} recent entries
-- Medicine Taken: {len(user_context.get('tracking_data', {}).get('medicine', []))} recent entries
-- Symptoms: {len(user_context.get('tracking_data', {}).get('symptoms', []))} recent entries
-- Blood Pressure: {len(user_context.get('tracking_data', {}).get('blood_pressure', []))} recent entries
-- Discharge: {len(user_context.get('tracking_data', {}).get('discharge', []))} recent entries
-
-Detailed Tracking:
-{_format_tracking_data(user_context.get('tracking_data', {}))}
+The prompt is laid out from most to least stable so a local model can reuse
+its KV cache for the longest possible prefix:
+
+    1. STATIC_PREFIX - persona and instructions, byte-identical for every prompt
+    2. user section  - profile and tracking history, changes only with the user's data
+    3. retrieved knowledge base snippets
+    4. the user query
+
+Prompt length is kept within a token budget (BABYNEST_PROMPT_TOKEN_BUDGET) by
+dropping the least relevant retrieved snippets and the oldest tracking entries.
+Tokens are counted with a pluggable tokenizer (see set_tokenizer).
+
+The user section and its token counts are rendered once per context version
+(the context cache bumps it on every change) and memoized per user, so only
+the query and the retrieved snippets are formatted per request.
 """
-    
-    return f"""
-You are BabyNest, an inclusive, empathetic, and knowledgeable pregnancy companion. You provide personalized, evidence-based guidance while being culturally sensitive and supportive.
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from monitoring.memory import register_structure
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("BABYNEST_PROMPT_TOKEN_BUDGET", "1500"))
 
-{user_context_section}
+# Tracking entries shown per category, newest first
+MAX_TRACKING_ENTRIES = 3
 
-User Query: {query}
+# Users whose rendered section is kept in memory
+USER_SECTION_CACHE_SIZE = 256
 
-Relevant Knowledge Base Information:
-{context}
+STATIC_PREFIX = """You are BabyNest, an inclusive, empathetic, and knowledgeable pregnancy companion. You provide personalized, evidence-based guidance while being culturally sensitive and supportive.
 
 Instructions:
 1. Consider the user's current pregnancy week and location when providing advice
@@ -47,44 +41,245 @@ Instructions:
 4. If the user's tracking data shows concerning patterns, address them gently
 5. Always prioritize safety and recommend consulting healthcare providers when appropriate
 6. Use a warm, caring tone while being informative
+"""
+
+NO_TRACKING_DATA = "No recent tracking data available."
+NO_CONTEXT = "No relevant guidelines found."
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+def approximate_token_count(text: str) -> int:
+    """
+    Tokenizer-free estimate: one token per word or punctuation mark, plus one per
+    further 4 characters of long words (close to BPE counts for English text).
+    """
+    return sum(1 + (len(piece) - 1) // 4 for piece in _TOKEN_RE.findall(text))
+
+_count_tokens = approximate_token_count
+
+# user_id -> (context version, rendered user section), least recently used first
+_user_sections = OrderedDict()
+_user_sections_lock = threading.Lock()
+register_structure("prompt_user_sections", lambda: _user_sections, capacity=lambda: USER_SECTION_CACHE_SIZE)
+_static_tokens = None
+
+def set_tokenizer(tokenizer) -> None:
+    """
+    Use a real tokenizer for budgeting. Accepts a callable text -> token count, or
+    an object with an `encode(text)` method (e.g. a Hugging Face or tiktoken tokenizer).
+    Pass None to go back to the approximate count.
+    """
+    global _count_tokens, _static_tokens
+    if tokenizer is None:
+        _count_tokens = approximate_token_count
+    elif hasattr(tokenizer, "encode"):
+        _count_tokens = lambda text: len(tokenizer.encode(text))
+    else:
+        _count_tokens = tokenizer
+    # Memoized token counts belong to the old tokenizer
+    _static_tokens = None
+    clear_user_sections()
+
+def clear_user_sections() -> None:
+    """Drop all memoized user sections."""
+    with _user_sections_lock:
+        _user_sections.clear()
 
-Please provide a comprehensive, personalized response:
+def count_tokens(text: str) -> int:
+    return _count_tokens(text)
+
+def render_user_section(user_context):
+    """
+    Render the user profile block and the tracking history lines.
+
+    Returns:
+        (profile, tracking) where tracking is a list of (header, lines) per
+        category with at most MAX_TRACKING_ENTRIES lines, newest first.
+    """
+    if not user_context:
+        return "", []
+
+    tracking_data = user_context.get('tracking_data', {})
+    profile = f"""User Profile & Current Status:
+- Pregnancy Week: {user_context.get('current_week', 'Unknown')}
+- Location: {user_context.get('location', 'Unknown')}
+- Age: {user_context.get('age', 'Unknown')}
+- Current Weight: {user_context.get('weight', 'Unknown')} kg
+- Due Date: {user_context.get('due_date', 'Unknown')}
+
+Recent Tracking Data:
+- Weight Tracking: {len(tracking_data.get('weight', []))} recent entries
+- Medicine Taken: {len(tracking_data.get('medicine', []))} recent entries
+- Symptoms: {len(tracking_data.get('symptoms', []))} recent entries
+- Blood Pressure: {len(tracking_data.get('blood_pressure', []))} recent entries
+- Discharge: {len(tracking_data.get('discharge', []))} recent entries
 """
+    return profile, _format_tracking_lines(tracking_data)
 
-def _format_tracking_data(tracking_data):
-    """Format tracking data for the prompt."""
+def _format_tracking_lines(tracking_data):
+    """Tracking history as (header, lines) per category, newest entries first."""
     if not tracking_data:
-        return "No recent tracking data available."
-    
-    formatted = []
-    
-    # Weight data
-    weight_data = tracking_data.get('weight', [])
+        return []
+
+    sections = []
+
+    weight_data = tracking_data.get('weight', [])[:MAX_TRACKING_ENTRIES]
     if weight_data:
-        formatted.append("Weight Tracking:")
-        for entry in weight_data[-3:]:  # Last 3 entries
-            formatted.append(f"  Week {entry['week']}: {entry['weight']} kg - {entry['note']}")
-    
-    # Medicine data
-    medicine_data = tracking_data.get('medicine', [])
+        sections.append(("Weight Tracking:", [
+            f"  Week {entry['week']}: {entry['weight']} kg - {entry['note']}" for entry in weight_data
+        ]))
+
+    medicine_data = tracking_data.get('medicine', [])[:MAX_TRACKING_ENTRIES]
     if medicine_data:
-        formatted.append("Medicine Tracking:")
-        for entry in medicine_data[-3:]:  # Last 3 entries
-            status = "✓ Taken" if entry['taken'] else "✗ Missed"
-            formatted.append(f"  Week {entry['week']}: {entry['name']} ({entry['dose']}) at {entry['time']} - {status}")
-    
-    # Symptoms data
-    symptoms_data = tracking_data.get('symptoms', [])
+        sections.append(("Medicine Tracking:", [
+            f"  Week {entry['week']}: {entry['name']} ({entry['dose']}) at {entry['time']} - "
+            f"{'✓ Taken' if entry['taken'] else '✗ Missed'}"
+            for entry in medicine_data
+        ]))
+
+    symptoms_data = tracking_data.get('symptoms', [])[:MAX_TRACKING_ENTRIES]
     if symptoms_data:
-        formatted.append("Recent Symptoms:")
-        for entry in symptoms_data[-3:]:  # Last 3 entries
-            formatted.append(f"  Week {entry['week']}: {entry['symptom']} - {entry['note']}")
-    
-    # Blood pressure data
-    bp_data = tracking_data.get('blood_pressure', [])
+        sections.append(("Recent Symptoms:", [
+            f"  Week {entry['week']}: {entry['symptom']} - {entry['note']}" for entry in symptoms_data
+        ]))
+
+    bp_data = tracking_data.get('blood_pressure', [])[:MAX_TRACKING_ENTRIES]
     if bp_data:
-        formatted.append("Blood Pressure:")
-        for entry in bp_data[-3:]:  # Last 3 entries
-            formatted.append(f"  Week {entry['week']}: {entry['systolic']}/{entry['diastolic']} at {entry['time']} - {entry['note']}")
-    
-    return "\n".join(formatted) if formatted else "No recent tracking data available."
+        sections.append(("Blood Pressure:", [
+            f"  Week {entry['week']}: {entry['systolic']}/{entry['diastolic']} at {entry['time']} - {entry['note']}"
+            for entry in bp_data
+        ]))
+
+    return sections
+
+def _split_context(context) -> list:
+    """Retrieved snippets, most relevant first."""
+    if not context:
+        return []
+    if isinstance(context, (list, tuple)):
+        return [c for c in context if c]
+    return [c for c in context.split("\n\n") if c.strip()]
+
+def _truncate(text: str, budget: int) -> str:
+    """Cut `text` to roughly `budget` tokens at a word boundary."""
+    kept, used = [], 0
+    for word in text.split():
+        used += count_tokens(word)
+        if used > budget:
+            break
+        kept.append(word)
+    return " ".join(kept)
+
+def _render_user_section(user_context) -> dict:
+    """The user section with everything build_prompt needs precomputed, token costs included."""
+    profile, tracking = render_user_section(user_context)
+    costed = [
+        (header, lines, count_tokens(header), [count_tokens(line) for line in lines])
+        for header, lines in tracking
+    ]
+    tracking_text = "\n".join("\n".join([header] + lines) for header, lines in tracking) or NO_TRACKING_DATA
+    return {
+        "profile": profile,
+        "tracking": costed,
+        # Profile plus the "no tracking data" placeholder, always included
+        "fixed_tokens": count_tokens(profile + "\nDetailed Tracking:\n" + NO_TRACKING_DATA) if profile else 0,
+        # The section with the whole tracking history, used as is when it fits
+        "text": f"{profile}\nDetailed Tracking:\n{tracking_text}\n" if profile else "",
+        "tokens": sum(h + sum(costs) for _, _, h, costs in costed),
+    }
+
+def _get_user_section(user_context, user_id=None) -> dict:
+    """
+    Rendered user section, memoized by (user_id, version). The context cache
+    stamps a new version on every change, so an entry is reused until the
+    user's data changes.
+    """
+    version = user_context.get("version") if user_context else None
+    if user_id is None or version is None:
+        return _render_user_section(user_context)
+
+    with _user_sections_lock:
+        cached = _user_sections.get(user_id)
+        if cached is not None and cached[0] == version:
+            _user_sections.move_to_end(user_id)
+            return cached[1]
+
+    section = _render_user_section(user_context)
+    with _user_sections_lock:
+        _user_sections[user_id] = (version, section)
+        _user_sections.move_to_end(user_id)
+        while len(_user_sections) > USER_SECTION_CACHE_SIZE:
+            _user_sections.popitem(last=False)
+    return section
+
+def _static_token_count() -> int:
+    """Tokens of the static prefix and the knowledge base header."""
+    global _static_tokens
+    if _static_tokens is None:
+        _static_tokens = count_tokens(STATIC_PREFIX + "\n\nRelevant Knowledge Base Information:\n")
+    return _static_tokens
+
+def build_prompt(query, context, user_context=None, token_budget=None, user_id=None):
+    """
+    Build a comprehensive prompt with user context and retrieved knowledge.
+
+    Args:
+        query: User's question
+        context: Retrieved knowledge from vector store (snippets joined by blank lines, or a list)
+        user_context: User's profile and tracking data from cache
+        token_budget: Maximum prompt tokens (defaults to PROMPT_TOKEN_BUDGET)
+        user_id: Owner of user_context; with the context's version it keys the memoized user section
+    """
+    budget = PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    section = _get_user_section(user_context, user_id)
+    query_section = f"\nUser Query: {query}\n\nPlease provide a comprehensive, personalized response:\n"
+
+    # Fixed parts (and the placeholders used when nothing else fits) are always included;
+    # snippets and tracking history share what is left
+    remaining = (budget - _static_token_count() - section["fixed_tokens"]
+                 - count_tokens(query_section) - count_tokens(NO_CONTEXT))
+
+    # Keep room for the newest entry of each tracking category before adding snippets
+    tracking = section["tracking"]
+    reserve = sum(header_cost + line_costs[0] for _, _, header_cost, line_costs in tracking)
+    snippets = []
+    for snippet in _split_context(context):
+        cost = count_tokens(snippet) + 1
+        if cost > remaining - reserve:
+            if not snippets and remaining - reserve > 0:
+                snippets.append(_truncate(snippet, remaining - reserve))
+                remaining -= count_tokens(snippets[-1]) + 1
+            break
+        snippets.append(snippet)
+        remaining -= cost
+
+    if section["profile"]:
+        user_section = section["text"] if section["tokens"] <= remaining else _trim_tracking(section, remaining)
+    else:
+        user_section = ""
+
+    return (
+        STATIC_PREFIX
+        + "\n" + user_section
+        + "\nRelevant Knowledge Base Information:\n"
+        + ("\n\n".join(snippets) or NO_CONTEXT) + "\n"
+        + query_section
+    )
+
+def _trim_tracking(section, remaining: int) -> str:
+    """User section with the tracking history that fits in `remaining`, newest entries first across categories."""
+    tracking = section["tracking"]
+    kept = {header: [] for header, _, _, _ in tracking}
+    for depth in range(MAX_TRACKING_ENTRIES):
+        for header, lines, header_cost, line_costs in tracking:
+            if depth >= len(lines):
+                continue
+            cost = line_costs[depth] + (header_cost if depth == 0 else 0)
+            if cost <= remaining:
+                kept[header].append(lines[depth])
+                remaining -= cost
+
+    tracking_text = "\n".join(
+        "\n".join([header] + kept[header]) for header, _, _, _ in tracking if kept[header]
+    ) or NO_TRACKING_DATA
+    return f"{section['profile']}\nDetailed Tracking:\n{tracking_text}\n"
@@ -0,0 +1,162 @@
+"""
+Int8-quantized in-memory vector index.
+
+Each vector is stored as int8 codes plus a float32 scale and norm, which is
+roughly a quarter of the float32 footprint. Search scores every vector with
+int32-accumulated integer dot products, then re-scores the best candidates
+exactly against full-precision vectors fetched from the backing store.
+
+This is an experiment measured by benchmarks/bench_quantization.py and is not
+used by the app: Chroma stores and searches float32 vectors, so next to it this
+index would be an additional copy rather than a saving.
+"""
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+INT8_MAX = 127
+
+def quantize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 quantization. Returns (codes, scales)."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    scales = np.abs(vectors).max(axis=1) / INT8_MAX
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+class QuantizedVectorIndex:
+    """
+    Cosine-similarity index over int8 codes.
+
+    Args:
+        rescore_factor: How many candidates per requested result are re-scored exactly.
+    """
+
+    def __init__(self, rescore_factor: int = 4):
+        self.rescore_factor = max(1, rescore_factor)
+        self.ids: list = []
+        self._rows: dict = {}
+        self._codes: Optional[np.ndarray] = None
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return None if self._codes is None else self._codes.shape[1]
+
+    def upsert(self, ids: list, embeddings) -> None:
+        """Add or replace vectors."""
+        if not ids:
+            return
+        vectors = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        codes, scales = quantize(vectors)
+        norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+
+        with self._lock:
+            if self._codes is None:
+                self._codes = np.zeros((0, vectors.shape[1]), dtype=np.int8)
+            elif vectors.shape[1] != self._codes.shape[1]:
+                raise ValueError("Embedding dimension does not match the index")
+
+            new_rows = []
+            for i, vector_id in enumerate(ids):
+                row = self._rows.get(vector_id)
+                if row is None:
+                    new_rows.append(i)
+                else:
+                    self._codes[row] = codes[i]
+                    self._scales[row] = scales[i]
+                    self._norms[row] = norms[i]
+
+            if new_rows:
+                start = len(self.ids)
+                for offset, i in enumerate(new_rows):
+                    self.ids.append(ids[i])
+                    self._rows[ids[i]] = start + offset
+                self._codes = np.concatenate([self._codes, codes[new_rows]])
+                self._scales = np.concatenate([self._scales, scales[new_rows]])
+                self._norms = np.concatenate([self._norms, norms[new_rows]])
+
+    def remove(self, ids: list) -> None:
+        """Remove vectors by id (unknown ids are ignored)."""
+        with self._lock:
+            rows = sorted((self._rows[i] for i in ids if i in self._rows), reverse=True)
+            if not rows:
+                return
+            keep = np.ones(len(self.ids), dtype=bool)
+            keep[rows] = False
+            self._codes = self._codes[keep]
+            self._scales = self._scales[keep]
+            self._norms = self._norms[keep]
+            self.ids = [vector_id for vector_id, kept in zip(self.ids, keep) if kept]
+            self._rows = {vector_id: row for row, vector_id in enumerate(self.ids)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self.ids, self._rows, self._codes = [], {}, None
+            self._scales = np.zeros(0, dtype=np.float32)
+            self._norms = np.zeros(0, dtype=np.float32)
+
+    def approximate_scores(self, query_embedding) -> np.ndarray:
+        """Approximate cosine similarity of the query to every vector in the index."""
+        with self._lock:
+            return self._approximate_scores(query_embedding)
+
+    def _approximate_scores(self, query_embedding) -> np.ndarray:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if self._codes is None or not len(self.ids):
+            return np.zeros(0, dtype=np.float32)
+
+        query_codes, query_scale = quantize(query)
+        query_norm = float(np.linalg.norm(query)) or 1.0
+        dots = np.einsum("ij,j->i", self._codes, query_codes[0], dtype=np.int32)
+        norms = np.where(self._norms > 0, self._norms, 1.0)
+        return dots * (self._scales * query_scale[0]) / (norms * query_norm)
+
+    def search(self, query_embedding, k: int = 3,
+               fetch_embeddings: Callable[[list], list] = None) -> list:
+        """
+        Find the `k` nearest vectors.
+
+        Args:
+            query_embedding: Full-precision query vector.
+            k: Number of results.
+            fetch_embeddings: Optional callable returning full-precision vectors for a
+                list of ids; when given, the top `k * rescore_factor` candidates are
+                re-scored exactly.
+
+        Returns:
+            list of (id, cosine similarity) tuples, best first.
+        """
+        if k <= 0:
+            return []
+
+        with self._lock:
+            scores = self._approximate_scores(query_embedding)
+            if not len(scores):
+                return []
+            n_candidates = min(len(scores), k * self.rescore_factor if fetch_embeddings else k)
+            top = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+            candidates = [(self.ids[row], float(scores[row])) for row in top]
+
+        if fetch_embeddings:
+            candidate_ids = [vector_id for vector_id, _ in candidates]
+            exact = np.asarray(fetch_embeddings(candidate_ids), dtype=np.float32)
+            query = np.asarray(query_embedding, dtype=np.float32)
+            norms = np.linalg.norm(exact, axis=1) * (np.linalg.norm(query) or 1.0)
+            exact_scores = exact @ query / np.where(norms > 0, norms, 1.0)
+            candidates = list(zip(candidate_ids, exact_scores.tolist()))
+
+        candidates.sort(key=lambda item: item[1], reverse=True)
+        return candidates[:k]
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the quantized vectors (codes, scales and norms)."""
+        if self._codes is None:
+            return 0
+        return self._codes.nbytes + self._scales.nbytes + self._norms.nbytes
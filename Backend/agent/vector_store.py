@@ -1,28 +1,55 @@
 import chromadb
-from chromadb.utils import embedding_functions
 import json
 import os
 import hashlib
+import threading
+import time
+from agent.answer_cache import get_answer_cache
+from agent.embeddings import DEFAULT_PROVIDER, get_embedding_function, get_embedding_provider
+from monitoring.log import get_logger
+from monitoring.metrics import REGISTRY
+from monitoring.tracing import span
 
-os.makedirs("db/chromadb", exist_ok=True)
-client = chromadb.PersistentClient(path="db/chromadb")
+CHROMA_PATH = os.getenv("BABYNEST_CHROMA_PATH", "db/chromadb")
 
-# Use default embedding function instead of sentence transformers
+os.makedirs(CHROMA_PATH, exist_ok=True)
+client = chromadb.PersistentClient(path=CHROMA_PATH)
+
+# Embedding provider is configurable (see agent/embeddings.py); tests use the offline hashing provider
+embedding_provider = get_embedding_provider()
+guidelines_embedding_function = get_embedding_function(embedding_provider)
+
+# Collections embedded with a non-default provider get their own name so the vectors never mix
+_collection_suffix = "" if embedding_provider == DEFAULT_PROVIDER else f"_{embedding_provider}"
+
+GUIDELINES_FILE = os.path.join(os.path.dirname(__file__), "guidelines.json")
 
 # Collection for pregnancy guidelines embeddings
 guidelines_collection = client.get_or_create_collection(
-    "pregnancy_guidelines",
-    embedding_function=embedding_functions.DefaultEmbeddingFunction()
+    f"pregnancy_guidelines{_collection_suffix}",
+    embedding_function=guidelines_embedding_function
 )
 
 # Separate collection for user details embeddings
 user_details_collection = client.get_or_create_collection(
-    "user_details",
-    embedding_function=embedding_functions.DefaultEmbeddingFunction()
+    f"user_details{_collection_suffix}",
+    embedding_function=get_embedding_function(embedding_provider)
 )
 
 _update_vector_store_callback = None
 
+# Serialises guideline loads (startup pack load, background embedding, manual refresh)
+_guidelines_lock = threading.Lock()
+
+log = get_logger("agent.vector_store")
+
+VECTOR_QUERY_SECONDS = REGISTRY.histogram(
+    "babynest_vector_query_seconds", "Vector store search latency (embedding excluded)", ("index",))
+EMBEDDED_TEXTS = REGISTRY.counter("babynest_embedded_texts_total", "Texts embedded for vector queries")
+
+# Whether the embedding model has been loaded and a query has gone through the store
+_warm_state = {"warm": False, "warmup_ms": None, "error": None}
+
 
 def register_vector_store_updater(callback):
     global _update_vector_store_callback
@@ -37,74 +64,120 @@ def get_file_hash(path):
     with open(path, "rb") as f:
         return hashlib.md5(f.read()).hexdigest()
     
-def update_guidelines_in_vector_store():
-    """Update the vector store with pregnancy guidelines."""
+def build_guideline_records(guidelines: list) -> tuple[list, list, list]:
+    """Format guidelines into the documents, ids and metadatas stored in the collection."""
+    documents, ids, metadatas = [], [], []
+
+    for i, guideline in enumerate(guidelines):
+        content = f"Week Range {guideline.get('week_range', 'Unknown')}: {guideline.get('title', '')}"
+        metadata = {
+            "week_range": guideline.get('week_range', 'Unknown'),
+            "priority": guideline.get('priority', 'general'),
+            "organization": ", ".join(guideline.get('organization', ['government_guidelines'])),
+            "purpose" : guideline.get('purpose', 'general')
+        }
+
+        documents.append(content)
+        ids.append(f"guideline_{i}")
+        metadatas.append(metadata)
+
+    return documents, ids, metadatas
+
+def _load_precomputed_embeddings(ids: list, guidelines_hash: str):
+    """Return shipped embeddings for `ids` if the pack matches guidelines.json and the model."""
+    from agent.embeddings_pack import load_embeddings_pack
+
+    pack = load_embeddings_pack()
+    if not pack:
+        return None
+    if pack["guidelines_hash"] != guidelines_hash or pack["model"] != guidelines_embedding_function.name():
+        log.warning("embeddings_pack_stale")
+        return None
+    if pack["ids"] != ids:
+        return None
+    return pack["embeddings"]
+
+def _guidelines_hash_file() -> str:
+    return os.path.join(CHROMA_PATH, f"guidelines{_collection_suffix}.hash")
+
+def _loaded_guidelines_hash():
+    """Hash of the guidelines.json the collection was loaded from, or None."""
+    hash_file = _guidelines_hash_file()
+    if not os.path.exists(hash_file):
+        return None
+    with open(hash_file, "r") as f:
+        return f.read().strip()
+
+def guidelines_need_update() -> bool:
+    """Whether the collection does not hold the current guidelines.json yet."""
+    return get_file_hash(GUIDELINES_FILE) != _loaded_guidelines_hash()
+
+def update_guidelines_in_vector_store(precomputed_only: bool = False):
+    """
+    Update the vector store with pregnancy guidelines.
+
+    Args:
+        precomputed_only: Only load a matching embeddings pack. Guidelines that would
+            have to be embedded with the model are left for a later call.
+
+    Returns:
+        True if the collection was reloaded, False otherwise.
+    """
     try:
-        # Load guidelines from JSON file
-        guidelines_file = os.path.join(os.path.dirname(__file__), "guidelines.json")
-        os.makedirs("db/chromadb", exist_ok=True)
+        with _guidelines_lock:
+            # Compare file hash to avoid unnecessary updates
+            current_hash = get_file_hash(GUIDELINES_FILE)
+            if current_hash == _loaded_guidelines_hash():
+                log.debug("guidelines_unchanged")
+                return False
 
-        # Compare file hash to avoid unnecessary updates
-        hash_file = os.path.join("db/chromadb", "guidelines.hash")
-        current_hash = get_file_hash(guidelines_file)
-        previous_hash = None
+            with open(GUIDELINES_FILE, 'r', encoding='utf-8') as f:
+                guidelines = json.load(f)
+            documents, ids, metadatas = build_guideline_records(guidelines)
 
-        if os.path.exists(hash_file):
-            with open(hash_file, "r") as f:
-                previous_hash = f.read().strip()
+            # Bulk-load shipped vectors when they were built from this exact guidelines.json,
+            # otherwise let the collection embed the documents.
+            embeddings = _load_precomputed_embeddings(ids, current_hash)
+            if embeddings is None and precomputed_only:
+                log.info("guidelines_embedding_deferred")
+                return False
 
-        if current_hash == previous_hash:
-            print("🔄 No change in guidelines.json, skipping vector update.")
-            return False
-        
-        # Save new hash
-        with open(hash_file, "w") as f:
-            f.write(current_hash)
+            # Clear existing data (only if collection has data)
+            try:
+                existing_ids = guidelines_collection.get(include=[])["ids"]
+                if existing_ids:
+                    guidelines_collection.delete(ids=existing_ids)
+            except Exception as e:
+                log.warning("guidelines_clear_failed", error=str(e))
 
-        with open(guidelines_file, 'r', encoding='utf-8') as f:
-            guidelines = json.load(f)
-        
-        # Clear existing data (only if collection has data)
-        try:
-            count = guidelines_collection.count()
-            if count > 0:
-                guidelines_collection.delete(where={"source": {"$ne": "none"}})
-        except Exception:
-            print(f"Warning: Failed to clear guidelines collection: {e}")
-        
-        documents, ids, metadatas = [], [], []
-
-        # Add guidelines to vector store
-        for i, guideline in enumerate(guidelines):
-            content = f"Week Range {guideline.get('week_range', 'Unknown')}: {guideline.get('title', '')}"
-            metadata = {
-                "week_range": guideline.get('week_range', 'Unknown'),
-                "priority": guideline.get('priority', 'general'),
-                "organization": ", ".join(guideline.get('organization', ['government_guidelines'])),
-                "purpose" : guideline.get('purpose', 'general')
-            }
-
-            documents.append(content)
-            ids.append(f"guideline_{i}")
-            metadatas.append(metadata)
-            
-        guidelines_collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
-        
-        print(f"Vector store updated with {len(guidelines)} guidelines")
+            guidelines_collection.add(
+                documents=documents,
+                metadatas=metadatas,
+                ids=ids,
+                embeddings=embeddings
+            )
+
+            # Save new hash only once the collection holds the new guidelines
+            os.makedirs(CHROMA_PATH, exist_ok=True)
+            with open(_guidelines_hash_file(), "w") as f:
+                f.write(current_hash)
+
+            # Cached answers are keyed by guideline ids, which are positional, so they
+            # would outlive the text they were built from
+            get_answer_cache().clear()
+
+        source = "precomputed pack" if embeddings is not None else "embedding model"
+        log.info("guidelines_loaded", guidelines=len(guidelines), source=source)
         return True
-        
+
     except Exception as e:
-        print(f"Error updating vector store: {e}")
+        log.error("guidelines_update_failed", error=str(e))
         return False
-    
+
 def update_user_details_in_vector_store(documents: list = None, ids: list = None, metadatas: list = None):
     """Update user details in the vector store."""
     if not documents or not ids or not metadatas:
-        print("No user detail documents to update.")
+        log.debug("user_details_empty")
         return
     try:
         user_details_collection.upsert(
@@ -112,23 +185,100 @@ def update_user_details_in_vector_store(documents: list = None, ids: list = None
             metadatas=metadatas,
             ids=ids
         )
-        print(f"Vector store updated with {len(documents)} user detail documents")
+        log.info("user_details_updated", documents=len(documents))
     except Exception as e:
-        print(f"Error updating user details in vector store: {e}")
+        log.error("user_details_update_failed", error=str(e))
 
 def query_vector_store(query: str, n_results: int = 3):
     """Query the vector store for relevant guidelines."""
-    try:
-        results = guidelines_collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
-        
-        if results and results.get('documents'):
-            return results['documents'][0]
+    return query_vector_store_batch([query], n_results=n_results)[0]
+
+def query_vector_store_batch(queries: list, n_results: int = 3):
+    """
+    Query the vector store for relevant guidelines for several queries at once.
+
+    All queries are embedded in one model call and searched in one store call.
+    Duplicate queries are only embedded once.
+
+    Returns:
+        list: One list of documents per query, in the same order as `queries`.
+    """
+    return [result["documents"] for result in query_vector_store_details(queries, n_results=n_results)]
+
+def query_vector_store_details(queries: list, n_results: int = 3):
+    """
+    Like query_vector_store_batch, but also returns the ids of the retrieved
+    documents and the query embedding (used to key the answer cache).
+
+    Returns:
+        list: One {"documents", "ids", "embedding"} dict per query, in the same
+        order as `queries`. On error documents and ids are empty and embedding is None.
+    """
+    if not queries:
         return []
-        
+
+    unique_queries = list(dict.fromkeys(queries))
+    try:
+        with span("embed", texts=len(unique_queries)):
+            query_embeddings = guidelines_embedding_function(unique_queries)
+        EMBEDDED_TEXTS.inc(len(unique_queries))
+        search_start = time.perf_counter()
+        with span("query_vector_store", queries=len(unique_queries)) as s:
+            results = guidelines_collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results
+            )
+            documents = (results or {}).get('documents') or []
+            ids = (results or {}).get('ids') or []
+            s.set(results=sum(len(docs or []) for docs in documents))
+        VECTOR_QUERY_SECONDS.observe(time.perf_counter() - search_start, index="chroma")
+        # An empty collection answers too; only documents show the store is usable
+        if any(documents):
+            _warm_state["warm"] = True
+
+        by_query = {
+            query: {"documents": list(docs or []), "ids": list(doc_ids or []), "embedding": embedding}
+            for query, docs, doc_ids, embedding in zip(unique_queries, documents, ids, query_embeddings)
+        }
+        empty = {"documents": [], "ids": [], "embedding": None}
+        return [dict(by_query.get(query, empty)) for query in queries]
+
     except Exception as e:
-        print(f"Error querying vector store: {e}")
-        return []
+        log.error("vector_query_failed", queries=len(queries), error=str(e))
+        return [{"documents": [], "ids": [], "embedding": None} for _ in queries]
+
+def warm_up_vector_store() -> bool:
+    """
+    Load the embedding model and run a dummy query so the first user query
+    does not pay for lazy model loading. The store is only marked warm once that
+    query returns documents.
+    """
+    start = time.perf_counter()
+    try:
+        guidelines_embedding_function(["warm up"])
+        if guidelines_collection.count() == 0:
+            _warm_state.update(warm=False, error="guidelines collection is empty")
+            log.warning("vector_store_warmup_empty")
+            return False
+        if not query_vector_store("pregnancy checkup", n_results=1):
+            _warm_state.update(warm=False, error="warm-up query returned no documents")
+            log.warning("vector_store_warmup_no_results")
+            return False
+
+        _warm_state.update(warm=True, error=None)
+        return True
+    except Exception as e:
+        _warm_state["error"] = str(e)
+        log.error("vector_store_warmup_failed", error=str(e))
+        return False
+    finally:
+        _warm_state["warmup_ms"] = round((time.perf_counter() - start) * 1000, 2)
 
+def get_vector_store_status() -> dict:
+    """Warm state of the vector store for readiness checks."""
+    return {
+        "warm": _warm_state["warm"],
+        "warmup_ms": _warm_state["warmup_ms"],
+        "error": _warm_state["error"],
+        "embedding_provider": embedding_provider,
+    }
@@ -0,0 +1,187 @@
+"""
+Week interval index over the pregnancy guidelines and the tasks table.
+
+Each guideline ("week_range": "8-12") and task (starting_week..ending_week)
+covers an interval of weeks. The index keeps one bitmap per week (1-52) whose
+bit i is set when item i applies that week, so "what applies in week N" is a
+single lookup plus the k matching items. Rendered per-week responses are
+memoized on top of it.
+
+The index is built lazily and rebuilt when guidelines.json changes on disk or
+after mark_tasks_changed() is called (the task routes do this after every write).
+"""
+import json
+import os
+import sqlite3
+import threading
+
+from agent.guidelines_data import GUIDELINES
+from db.db import connect
+from monitoring.log import get_logger
+from monitoring.memory import register_structure
+
+log = get_logger("agent.week_index")
+
+MIN_WEEK = 1
+MAX_WEEK = 52
+
+GUIDELINES_FILE = os.path.join(os.path.dirname(__file__), "guidelines.json")
+
+def parse_week_range(week_range) -> tuple:
+    """ "8-12" -> (8, 12), "20" -> (20, 20); None when it can't be parsed."""
+    try:
+        parts = str(week_range).split("-")
+        start = int(parts[0])
+        end = int(parts[-1])
+    except (ValueError, IndexError):
+        return None
+    return (start, end) if start <= end else (end, start)
+
+class WeekBitmapIndex:
+    """Items indexed by the weeks they cover, one bitmap per week."""
+
+    def __init__(self, intervals: list):
+        """`intervals` is a list of (start_week, end_week, item); weeks are clamped to 1-52."""
+        self.items = [item for _, _, item in intervals]
+        self._bitmaps = [0] * (MAX_WEEK + 1)
+        for i, (start, end, _) in enumerate(intervals):
+            for week in range(max(start, MIN_WEEK), min(end, MAX_WEEK) + 1):
+                self._bitmaps[week] |= 1 << i
+
+    def lookup(self, week: int) -> list:
+        """Items covering `week`, in insertion order."""
+        if not MIN_WEEK <= week <= MAX_WEEK:
+            return []
+        bitmap, found = self._bitmaps[week], []
+        while bitmap:
+            low = bitmap & -bitmap
+            found.append(self.items[low.bit_length() - 1])
+            bitmap ^= low
+        return found
+
+class WeekIndex:
+    """Guidelines and tasks by week, with memoized per-week responses."""
+
+    def __init__(self, db_path: str = None, guidelines_path: str = GUIDELINES_FILE):
+        """`db_path` None reads db.db.DATABASE on every load, like the routes' connections."""
+        self.db_path = db_path
+        self.guidelines_path = guidelines_path
+        self._lock = threading.Lock()
+        self._guidelines = None
+        self._guidelines_mtime = None
+        self._tasks = None
+        self._rendered = {}
+        self.builds = {"guidelines": 0, "tasks": 0}
+
+    def mark_tasks_changed(self):
+        """Rebuild the tasks index (and drop rendered task responses) on next use."""
+        with self._lock:
+            self._tasks = None
+            self._rendered = {k: v for k, v in self._rendered.items() if k[0] != "tasks"}
+
+    def guidelines_for_week(self, week: int) -> list:
+        mtime = self._guidelines_file_mtime()
+        with self._lock:
+            return self._guidelines_index(mtime).lookup(week)
+
+    def tasks_for_week(self, week: int) -> list:
+        with self._lock:
+            return self._tasks_index().lookup(week)
+
+    def render_guidelines(self, week: int = None) -> str:
+        """Guideline lines for `week` (all guidelines when week is None), rendered once per index build."""
+        if week is not None and not MIN_WEEK <= week <= MAX_WEEK:
+            return ""
+        mtime = self._guidelines_file_mtime()
+        key = ("guidelines", week)
+        # The index is fetched and the result stored under one lock hold, so a rebuild
+        # in between can't leave a response rendered from the old index memoized
+        with self._lock:
+            index = self._guidelines_index(mtime)
+            if key not in self._rendered:
+                guidelines = index.items if week is None else index.lookup(week)
+                self._rendered[key] = "\n".join(_render_guideline(g) for g in guidelines)
+            return self._rendered[key]
+
+    def render_tasks_json(self, week: int) -> str:
+        """JSON array of the tasks covering `week`, rendered once per index build."""
+        key = ("tasks", week)
+        # Same as render_guidelines: a mark_tasks_changed() waits for the store, then drops it
+        with self._lock:
+            index = self._tasks_index()
+            if key not in self._rendered:
+                self._rendered[key] = json.dumps(index.lookup(week))
+            return self._rendered[key]
+
+    def _guidelines_file_mtime(self):
+        try:
+            return os.path.getmtime(self.guidelines_path)
+        except OSError:
+            return None
+
+    def _guidelines_index(self, mtime) -> WeekBitmapIndex:
+        """The guidelines index, rebuilt if the file's mtime changed. Call with the lock held."""
+        if self._guidelines is None or mtime != self._guidelines_mtime:
+            self._guidelines = WeekBitmapIndex(_guideline_intervals(self._load_guidelines()))
+            self._guidelines_mtime = mtime
+            self._rendered = {k: v for k, v in self._rendered.items() if k[0] != "guidelines"}
+            self.builds["guidelines"] += 1
+        return self._guidelines
+
+    def _load_guidelines(self) -> list:
+        if self.guidelines_path == GUIDELINES_FILE and self._guidelines is None:
+            return GUIDELINES
+        try:
+            with open(self.guidelines_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, OSError) as e:
+            log.warning("guidelines_load_failed", path=self.guidelines_path, error=str(e))
+            return []
+
+    def _tasks_index(self) -> WeekBitmapIndex:
+        """The tasks index, built if needed. Call with the lock held."""
+        if self._tasks is None:
+            self._tasks = WeekBitmapIndex(self._load_task_intervals())
+            self.builds["tasks"] += 1
+        return self._tasks
+
+    def _load_task_intervals(self) -> list:
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM tasks ORDER BY starting_week, id").fetchall()
+            return [(row["starting_week"], row["ending_week"], dict(row)) for row in rows]
+        except sqlite3.Error as e:
+            log.error("tasks_load_failed", error=str(e))
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+def _guideline_intervals(guidelines: list) -> list:
+    intervals = []
+    for g in guidelines:
+        weeks = parse_week_range(g.get("week_range"))
+        if weeks:
+            intervals.append((weeks[0], weeks[1], g))
+    return intervals
+
+def _render_guideline(g: dict) -> str:
+    return (
+        f"- {g['title']} (Weeks: {g['week_range']})\n"
+        f"  Priority: {g['priority'].capitalize()} | Org: {', '.join(g['organization'])}\n"
+        f"  ➤ {g['purpose']}\n"
+    )
+
+# Global week index instance
+_week_index = None
+
+def get_week_index(db_path: str = None) -> WeekIndex:
+    """Get or create the global week index."""
+    global _week_index
+    if _week_index is None:
+        _week_index = WeekIndex(db_path)
+    return _week_index
+
+register_structure("week_index", lambda: _week_index)
@@ -1,6 +1,8 @@
-from db.db import open_db,close_db,first_time_setup
+from db.db import open_db,close_db,first_time_setup,DATABASE
 import os
-from flask import Flask, request, jsonify
+import json
+import sqlite3
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from werkzeug.exceptions import BadRequest, UnsupportedMediaType
 from routes.appointments import appointments_bp
@@ -11,16 +13,23 @@ from routes.symptoms import symptoms_bp
 from routes.weight import weight_bp
 from routes.blood_pressure import bp_bp
 from routes.discharge import discharge_bp
+from routes.monitoring import monitoring_bp
 from error_handling.handlers import handle_missing_field_error, handle_not_found_error
 from error_handling.error_classes import MissingFieldError, NotFoundError
 from agent.agent import get_agent
+from agent.week_index import get_week_index
+from monitoring import middleware as metrics_middleware
+from monitoring import profiling
+from monitoring.memory import memory_report
+from monitoring.sql_trace import get_sql_stats
+from monitoring.tracing import stage_histograms, start_trace
 import argparse
 
 
 # To enable context-aware error handling
 parser = argparse.ArgumentParser(description="Run the Flask backend server.")
 parser.add_argument("--env", type=str, default="development", choices=["development", "production"])
-args = parser.parse_args()
+args, _ = parser.parse_known_args()
 
 
 app = Flask(__name__)
@@ -36,6 +45,10 @@ app.register_blueprint(symptoms_bp)
 app.register_blueprint(weight_bp)
 app.register_blueprint(bp_bp)
 app.register_blueprint(discharge_bp)
+app.register_blueprint(monitoring_bp)
+
+# Request latency, status and payload size metrics (served at /metrics)
+metrics_middleware.init_app(app)
 
 # Register error handlers
 
@@ -74,15 +87,33 @@ def handle_unsupported_media(e):
     }), 415
 
 
+def debug_enabled() -> bool:
+    """
+    Debug output (traces, internal stats, profiles) is only served with BABYNEST_DEBUG_ENDPOINTS=1.
+    Development mode is the default, so it does not turn them on by itself.
+    """
+    return os.getenv("BABYNEST_DEBUG_ENDPOINTS", "0") == "1"
+
+def trace_requested() -> bool:
+    """Whether the client asked for the request trace (?trace=1 or an X-BabyNest-Trace: 1 header)."""
+    wanted = request.args.get("trace") == "1" or request.headers.get("X-BabyNest-Trace") == "1"
+    return wanted and debug_enabled()
+
 @app.teardown_appcontext
 def teardown_db(exception):
     close_db(exception)
 
 # Initialize agent with database path
-db_path = os.path.join(os.path.dirname(__file__), "db", "database.db")
+db_path = os.path.join(os.path.dirname(__file__), DATABASE)
 first_time_setup() # This needs to be called before initializing the agent
 
 agent = get_agent(db_path)
+get_week_index()
+
+# Optionally load the embedding model and build the default context in the background
+WARMUP_ENABLED = os.getenv("BABYNEST_WARMUP", "0") == "1"
+if WARMUP_ENABLED:
+    agent.start_warmup()
 
 @app.route("/agent", methods=["POST"])
 def run_agent():
@@ -99,13 +130,131 @@ def run_agent():
     
     user_id = data.get("user_id", "default") 
     try:
-        response = agent.run(query, user_id)
-        return jsonify({"response": response})
+        with start_trace("agent") as trace:
+            result = agent.run_commands(query, user_id)
+        if not trace_requested():
+            return jsonify(result)
+        # Per-stage timings, in the body and as a compact header
+        trace_data = trace.to_dict()
+        response = jsonify({**result, "trace": trace_data})
+        response.headers["X-BabyNest-Trace"] = json.dumps(trace_data, separators=(",", ":"))
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/agent/trace/stats", methods=["GET"])
+def trace_statistics():
+    """Per-stage latency histograms of the agent pipeline (debug only)."""
+    if not debug_enabled():
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"stages": stage_histograms.snapshot()})
+
+@app.route("/db/sql/stats", methods=["GET"])
+def sql_statistics():
+    """Per-statement SQL timings and query plans, slowest first (debug only; needs BABYNEST_SQL_TRACE=1)."""
+    if not debug_enabled():
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(get_sql_stats())
+
+@app.route("/debug/memory", methods=["GET"])
+def memory_statistics():
+    """Deep sizes of caches and indexes and, with PYTHONTRACEMALLOC set, the top allocation sites (debug only)."""
+    if not debug_enabled():
+        return jsonify({"error": "Not found"}), 404
+    try:
+        top = int(request.args.get("top", 10))
+    except ValueError:
+        return jsonify({"error": "top must be an integer"}), 400
+    return jsonify(memory_report(top=max(1, top)))
+
+@app.route("/debug/profiles", methods=["GET"])
+def list_profiles():
+    """Profiled requests, newest first (debug only; see monitoring/profiling.py)."""
+    if not debug_enabled():
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"profiles": profiling.profile_buffer.list()})
+
+@app.route("/debug/profiles/<int:profile_id>", methods=["GET"])
+def download_profile(profile_id):
+    """One profile as a pstats file or collapsed stacks, for offline flame graphs (debug only)."""
+    if not debug_enabled():
+        return jsonify({"error": "Not found"}), 404
+    entry = profiling.profile_buffer.get(profile_id)
+    if entry is None:
+        return jsonify({"error": "Profile not found"}), 404
+    if entry["format"] == "pstats":
+        mimetype, filename = "application/octet-stream", f"profile-{profile_id}.pstats"
+    else:
+        mimetype, filename = "text/plain", f"profile-{profile_id}.collapsed"
+    return Response(entry["data"], mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
 
 
+@app.route("/agent/stream", methods=["POST"])
+def stream_agent():
+    """
+    Stream the agent response as Server-Sent Events.
+
+    Events: "token" ({"text"}) for each generated chunk, then "done" with the
+    same body /agent returns, or "error" ({"error"}).
+    """
+    if not request.is_json:
+        return jsonify({"error": "Invalid JSON format"}), 400
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+    
+    query = data.get("query")
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+    
+    user_id = data.get("user_id", "default")
+    
+    def events():
+        stream = agent.run_stream(query, user_id)
+        try:
+            for event, payload in stream:
+                if event == "token":
+                    payload = {"text": payload}
+                elif event == "error":
+                    payload = {"error": payload}
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            # Runs when the client disconnects too, which stops LLM generation
+            stream.close()
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/ready", methods=["GET"])
+def readiness():
+    """Report whether the DB, the context cache and the vector store are warm."""
+    user_id = request.args.get("user_id", "default")
+    components = agent.get_readiness(user_id)
+
+    try:
+        open_db().execute("SELECT 1").fetchone()
+        components["database"] = {"ready": True}
+    except sqlite3.Error as e:
+        components["database"] = {"ready": False, "error": str(e)}
+
+    # Cache and vector store only gate readiness when warm-up is enabled,
+    # otherwise they warm lazily on the first query.
+    ready = components["database"]["ready"] and (
+        not WARMUP_ENABLED
+        or (components["context_cache"]["warm"] and components["vector_store"]["warm"])
+    )
+    return jsonify({
+        "ready": ready,
+        "warmup_enabled": WARMUP_ENABLED,
+        "components": components
+    }), 200 if ready else 503
+
 @app.route("/agent/cache/status", methods=["GET"])
 def get_cache_status():
     """Get cache status information."""
@@ -205,7 +354,8 @@ def get_cache_statistics():
                 "memory_cache_size": stats["memory_cache_size"],
                 "cache_files": stats["cache_files"],
                 "total_cache_size_mb": round(stats["total_cache_size_mb"], 2)
-            }
+            },
+            "answer_cache": agent.get_answer_cache_stats()
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -232,6 +382,9 @@ def index():
     task_db = get_tasks()
     return appointment_db
 
+# Wraps the views registered above, so this stays after the last route
+profiling.init_app(app, allow_header=debug_enabled)
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Run the Flask backend server.")
     parser.add_argument("--env", type=str, default="development", choices=["development", "production"])
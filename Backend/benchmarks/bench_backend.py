@@ -0,0 +1,232 @@
+"""
+Latency benchmark for the backend's hot paths at several data scales.
+
+For each scale (rows per tracking table, a tenth of that in appointments and
+tasks) a seeded database is generated with generate_dataset.py, and the
+benchmark measures:
+
+- ContextCache.get_context from memory, from disk, on a miss (built from the
+  database and saved) and the database rebuild alone
+- ContextCache.update_cache for each data type
+- query_vector_store with the offline hashing embedding, against the
+  guidelines plus `scale` synthetic documents
+- Flask route latency through the test client
+
+Scale-independent paths (build_prompt with and without the user-section memo,
+each handler's parse function, classify_intent) are measured once, on the
+labelled phrases in tests/fixtures/intent_phrases.json.
+
+`growth` is each scale-dependent p50 at the largest scale divided by the p50
+at the smallest; a lookup that should be indexed shows up as growing with the
+data. Everything is seeded, and ChromaDB and the context cache live in a
+temporary directory.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_backend.py --scales 100 1000 10000 --output backend.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, os.path.join(backend_dir, "benchmarks"))
+
+# Before the agent is imported: offline embedding and a throwaway vector store
+_workdir = tempfile.mkdtemp(prefix="babynest_bench_")
+os.environ.setdefault("BABYNEST_EMBEDDING_PROVIDER", "hashing")
+os.environ.setdefault("BABYNEST_CHROMA_PATH", os.path.join(_workdir, "chromadb"))
+os.environ.setdefault("BABYNEST_LOG_LEVEL", "WARNING")
+
+from agent.cache import ContextCache
+from agent.handlers.appointment import parse_appointment_command
+from agent.handlers.symptoms import parse_symptom_command
+from agent.handlers.weight import parse_weight_command
+from agent.intent import classify_intent
+from agent.prompt import build_prompt, clear_user_sections
+from db import db as db_module
+from generate_dataset import create_database
+
+FIXTURE = os.path.join(backend_dir, "tests", "fixtures", "intent_phrases.json")
+
+DATA_TYPES = ("profile", "weight", "medicine", "symptoms", "blood_pressure", "discharge")
+
+ROUTES = (
+    "/weight",
+    "/weight/week/20",
+    "/get_medicine",
+    "/symptoms",
+    "/symptoms/week/20",
+    "/blood_pressure",
+    "/blood_pressure/week/20",
+    "/get_discharge_logs/20",
+    "/get_tasks",
+    "/tasks/week/20",
+    "/get_appointments",
+    "/get_profile",
+)
+
+def summarize(samples: list) -> dict:
+    """Mean/p50/p95 in microseconds of per-call durations in seconds."""
+    ordered = sorted(samples)
+    return {
+        "mean_us": round(statistics.fmean(ordered) * 1e6, 1),
+        "p50_us": round(ordered[len(ordered) // 2] * 1e6, 1),
+        "p95_us": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e6, 1),
+        "calls": len(ordered),
+    }
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    """Time `fn` `repeat` times; `setup` runs untimed before each call."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def build_database(path: str, rows: int, seed: int):
+    """A generated database with `rows` rows in each tracking table (see generate_dataset.py)."""
+    volumes = {table: rows for table in ("weight", "medicine", "symptoms", "blood_pressure", "discharge")}
+    volumes.update(appointments=max(1, rows // 10), tasks=max(1, rows // 10))
+    create_database(path, volumes, seed=seed)
+
+def bench_context_cache(db_path: str, cache_dir: str, repeat: int) -> dict:
+    cache = ContextCache(db_path, cache_dir=cache_dir)
+    user_id = "bench"
+    results = {
+        "context.miss": measure(lambda: cache.get_context(user_id), repeat,
+                                setup=lambda: cache.invalidate_cache(user_id)),
+        "context.rebuild": measure(cache._build_context, repeat),
+    }
+    cache.get_context(user_id)
+    results["context.hit_memory"] = measure(lambda: cache.get_context(user_id), repeat)
+    results["context.hit_disk"] = measure(lambda: cache.get_context(user_id), repeat,
+                                          setup=lambda: cache.memory_cache.pop(user_id, None))
+    for data_type in DATA_TYPES:
+        results[f"update_cache.{data_type}"] = measure(lambda: cache.update_cache(user_id, data_type), repeat)
+    return results
+
+def bench_vector_store(documents: int, queries: list, repeat: int, seed: int) -> dict:
+    from agent.vector_store import guidelines_collection, query_vector_store, update_guidelines_in_vector_store
+
+    update_guidelines_in_vector_store()
+    # Grow the collection to guidelines + `documents` synthetic entries (scales only increase)
+    rng = random.Random(seed)
+    words = " ".join(q["query"] for q in queries).split()
+    existing = len(guidelines_collection.get(where={"source": "benchmark"}, include=[])["ids"])
+    for start in range(existing, documents, 1000):
+        batch = range(start, min(documents, start + 1000))
+        guidelines_collection.upsert(
+            ids=[f"bench_{i}" for i in batch],
+            documents=[" ".join(rng.choices(words, k=20)) for _ in batch],
+            metadatas=[{"source": "benchmark"} for _ in batch])
+
+    texts = itertools.cycle(q["query"] for q in queries)
+    return {"query_vector_store": measure(lambda: query_vector_store(next(texts)), repeat)}
+
+def bench_routes(client, repeat: int) -> dict:
+    results = {}
+    for route in ROUTES:
+        response = client.get(route)
+        assert response.status_code in (200, 404), (route, response.status_code)
+        results[f"route GET {route}"] = measure(lambda: client.get(route), repeat)
+    return results
+
+def bench_fixed(queries: list, user_context: dict, repeat: int) -> dict:
+    texts = [q["query"] for q in queries]
+    context = "\n".join(f"Guideline {i}: eat well, rest and stay hydrated in week {i}." for i in range(3))
+
+    def per_query(fn):
+        return lambda: [fn(text) for text in texts]
+
+    paths = {
+        "classify_intent": per_query(classify_intent),
+        "parse.appointment": per_query(parse_appointment_command),
+        "parse.weight": per_query(parse_weight_command),
+        "parse.symptom": per_query(parse_symptom_command),
+        "build_prompt.memo": per_query(lambda text: build_prompt(text, context, user_context, user_id="bench")),
+        "build_prompt.cold": per_query(lambda text: build_prompt(text, context, user_context)),
+    }
+    clear_user_sections()
+    report = {}
+    for name, fn in paths.items():
+        stats = measure(fn, repeat)
+        # Per query rather than per pass over the phrases
+        report[name] = {key: round(value / len(texts), 2) if key.endswith("_us") else value
+                        for key, value in stats.items()}
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the backend's hot paths at several data scales.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Rows per tracking table")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-routes", action="store_true", help="Skip the Flask route benchmarks")
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+    scales = sorted(args.scales)
+
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        queries = json.load(f)["cases"]
+
+    client = None
+    if not args.no_routes:
+        from app import app
+        client = app.test_client()
+
+    original_database = db_module.DATABASE
+    by_scale = {}
+    user_context = None
+    try:
+        for scale in scales:
+            scale_dir = os.path.join(_workdir, f"scale_{scale}")
+            os.makedirs(scale_dir, exist_ok=True)
+            db_path = os.path.join(scale_dir, "database.db")
+            build_database(db_path, scale, args.seed)
+
+            results = bench_context_cache(db_path, os.path.join(scale_dir, "cache"), args.repeat)
+            results.update(bench_vector_store(scale, queries, args.repeat, args.seed))
+            if client is not None:
+                db_module.DATABASE = db_path
+                results.update(bench_routes(client, args.repeat))
+            by_scale[str(scale)] = results
+            if user_context is None:
+                user_context = ContextCache(db_path, cache_dir=os.path.join(scale_dir, "cache")).get_context("bench")
+    finally:
+        db_module.DATABASE = original_database
+
+    smallest, largest = by_scale[str(scales[0])], by_scale[str(scales[-1])]
+    report = {
+        "benchmark": "backend",
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "scales": scales,
+        "fixed": bench_fixed(queries, user_context, args.repeat),
+        "by_scale": by_scale,
+        # p50 at the largest scale / p50 at the smallest (~1.0 = independent of data size)
+        "growth": {name: round(largest[name]["p50_us"] / max(smallest[name]["p50_us"], 0.1), 2)
+                   for name in smallest},
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    shutil.rmtree(_workdir, ignore_errors=True)
+    return report
+
+if __name__ == "__main__":
+    main()
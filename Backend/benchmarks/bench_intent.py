@@ -0,0 +1,73 @@
+"""
+Accuracy and latency benchmark for the intent classifier.
+
+Compares the compiled trie classifier with the previous substring if-chain on
+the labelled phrases in tests/fixtures/intent_phrases.json.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_intent.py --repeat 200 --output intent.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.intent import classify_intent
+
+FIXTURE = os.path.join(backend_dir, "tests", "fixtures", "intent_phrases.json")
+
+def legacy_classify_intent(query: str) -> str:
+    """The substring if-chain the compiled classifier replaced, kept as a baseline."""
+    query = query.lower()
+    if "appointment" in query:
+        return "appointments"
+    elif "weight" in query:
+        return "weight"
+    elif "symptom" in query:
+        return "symptoms"
+    elif "vaccine" in query or "guideline" in query or "what tests" in query or "recommend" in query:
+        return "guidelines"
+    return "general"
+
+def measure(classifier, cases: list, repeat: int) -> dict:
+    correct = sum(classifier(c["query"]) == c["intent"] for c in cases)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for c in cases:
+            classifier(c["query"])
+    elapsed = time.perf_counter() - start
+    return {
+        "accuracy": round(correct / len(cases), 4),
+        "mean_us": round(elapsed / (repeat * len(cases)) * 1e6, 3),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the intent classifier.")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+
+    report = {
+        "benchmark": "intent",
+        "phrases": len(cases),
+        "compiled": measure(classify_intent, cases, args.repeat),
+        "legacy": measure(legacy_classify_intent, cases, args.repeat),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    return report
+
+if __name__ == "__main__":
+    main()
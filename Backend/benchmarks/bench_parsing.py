@@ -0,0 +1,112 @@
+"""
+Latency and fuzz benchmark for the chat command parsers.
+
+Runs the appointment, weight and symptom parsers on adversarial inputs that
+made the previous regex-per-field parsers backtrack or rescan (long runs of
+spaces, digits, repeated prepositions and date words) at several sizes, plus
+seeded random token soup. Latency per character should stay flat as inputs
+grow; any exception is reported as a fuzz failure.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_parsing.py --sizes 1000 5000 10000 --output parsing.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.handlers.appointment import parse_appointment_command
+from agent.handlers.symptoms import parse_symptom_command
+from agent.handlers.weight import parse_weight_command
+
+PARSERS = {
+    "appointment": parse_appointment_command,
+    "weight": parse_weight_command,
+    "symptom": parse_symptom_command,
+}
+
+def _repeat(unit: str, size: int) -> str:
+    return (unit * (size // len(unit) + 1))[:size]
+
+# Input families, each building a query of roughly `size` characters
+ADVERSARIAL = {
+    "location_rewind": lambda size: "book appointment " + _repeat("at today ", size),
+    "prepositions": lambda size: _repeat("at am ", size),
+    "title_articles": lambda size: "make " + _repeat("a ", size),
+    "symptom_spaces": lambda size: "log x" + " " * size + "y",
+    "symptom_for": lambda size: "log" + _repeat(" for", size),
+    "digit_run": lambda size: "weight " + "9" * size + "am",
+    "dates_and_times": lambda size: _repeat("on 10/15 at 10:30 pm tomorrow ", size),
+    "punctuation": lambda size: _repeat("!?.,;:-/ ", size),
+}
+
+FUZZ_VOCABULARY = [
+    "log", "book", "appointment", "for", "at", "in", "on", "note", "week", "kg", "next",
+    "tomorrow", "monday", "2pm", "10:30", "am", "12/31", "2026-01-01", "65.5", "feeling",
+    "clinic", "hospital", "symptom", "nausea", "weight", "is", "the", "'s", "/", ":", " ",
+]
+
+def time_parser(parser, query: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parser(query)
+    return (time.perf_counter() - start) / repeat
+
+def fuzz(n_queries: int, seed: int) -> dict:
+    """Parse seeded random token soup; returns the number of failures per parser."""
+    rng = random.Random(seed)
+    failures = {name: 0 for name in PARSERS}
+    for _ in range(n_queries):
+        query = " ".join(rng.choice(FUZZ_VOCABULARY) for _ in range(rng.randint(0, 60)))
+        for name, parser in PARSERS.items():
+            try:
+                parser(query)
+            except Exception:
+                failures[name] += 1
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the chat command parsers.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fuzz", type=int, default=2000, help="Number of random queries")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for family, build in ADVERSARIAL.items():
+        for name, parse in PARSERS.items():
+            per_char = {}
+            for size in args.sizes:
+                query = build(size)
+                per_char[size] = time_parser(parse, query, args.repeat) / len(query) * 1e9
+            results[f"{family}/{name}"] = {
+                "ns_per_char": {str(size): round(ns, 1) for size, ns in per_char.items()},
+                # Ratio of per-character cost at the largest vs. smallest size (~1.0 = linear)
+                "growth": round(per_char[max(args.sizes)] / per_char[min(args.sizes)], 2),
+            }
+
+    report = {
+        "benchmark": "parsing",
+        "sizes": args.sizes,
+        "max_growth": max(r["growth"] for r in results.values()),
+        "adversarial": results,
+        "fuzz_failures": fuzz(args.fuzz, args.seed),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Recall/latency benchmark for the experimental int8-quantized vector index.
+
+Compares exact float32 brute-force search with int8 search plus exact re-scoring
+on a seeded synthetic corpus of clustered unit vectors. The float32 vectors are
+kept for re-scoring (as Chroma keeps them in the app), so the index size is
+reported as added memory.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_quantization.py --sizes 1000 10000 --output quantization.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.quantized_index import QuantizedVectorIndex
+
+def make_corpus(size: int, dim: int, n_queries: int, seed: int):
+    """Clustered unit vectors and queries drawn near corpus points."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, size // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), size)] + 0.5 * rng.normal(size=(size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    queries = vectors[rng.integers(0, size, n_queries)] + 0.3 * rng.normal(size=(n_queries, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return vectors, queries
+
+def run(size: int, dim: int = 384, k: int = 3, n_queries: int = 200, seed: int = 42) -> dict:
+    vectors, queries = make_corpus(size, dim, n_queries, seed)
+    ids = [f"doc_{i}" for i in range(size)]
+    rows = {vector_id: i for i, vector_id in enumerate(ids)}
+
+    index = QuantizedVectorIndex()
+    index.upsert(ids, vectors)
+
+    def fetch_embeddings(candidate_ids):
+        return vectors[[rows[i] for i in candidate_ids]]
+
+    exact_times, quantized_times, hits = [], [], 0
+    for query in queries:
+        start = time.perf_counter()
+        exact = np.argsort(-(vectors @ query))[:k]
+        exact_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result = index.search(query, k=k, fetch_embeddings=fetch_embeddings)
+        quantized_times.append(time.perf_counter() - start)
+
+        hits += len({ids[i] for i in exact} & {vector_id for vector_id, _ in result})
+
+    return {
+        "size": size,
+        "dim": dim,
+        "k": k,
+        "queries": n_queries,
+        f"recall_at_{k}": hits / (k * n_queries),
+        "float32_bytes": vectors.nbytes,
+        "int8_index_bytes": index.memory_bytes(),
+        "exact_p50_ms": float(np.percentile(exact_times, 50) * 1000),
+        "int8_p50_ms": float(np.percentile(quantized_times, 50) * 1000),
+        "int8_p95_ms": float(np.percentile(quantized_times, 95) * 1000),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the int8-quantized vector index.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = {
+        "benchmark": "quantization",
+        "seed": args.seed,
+        "results": [run(size, args.dim, args.k, args.queries, args.seed) for size in args.sizes],
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Synthetic dataset generator for scale testing.
+
+Builds a database from schema.sql and the db/db.py migrations, then adds a
+long-lived install's worth of seeded data to every table: a profile, and
+appointments, tasks, weight, medicine, symptom, blood pressure and discharge
+logs spread over `--years` of repeating 40-week pregnancies.
+
+- weight follows the profile weight plus a typical gestational gain curve
+- blood pressure is normal around 112/72 with a configurable share of
+  hypertensive readings, rising slightly in the third trimester
+- symptoms are weighted by trimester, appointments before `--end-date` are
+  completed and later ones pending
+
+Rows are inserted with executemany in a single transaction with syncing off.
+The same seed, volumes and end date always produce the same database.
+
+With --users N it writes N user shards (one database per user, each with its
+own seed and volumes jittered by up to ±50%) instead of a single database,
+and with --cache-dir also each shard's context cache file
+(context_user_0000.json, ...), built from the shard by ContextCache.
+
+Usage (from the Backend directory):
+    python benchmarks/generate_dataset.py --db /tmp/babynest.db --preset large
+    python benchmarks/generate_dataset.py --db /tmp/babynest.db --blood-pressure 50000 --symptoms 5000
+    python benchmarks/generate_dataset.py --users 200 --shard-dir /tmp/shards --cache-dir /tmp/cache
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from db.db import migrate
+
+SCHEMA = os.path.join(backend_dir, "schema.sql")
+
+TABLES = ("appointments", "tasks", "weight", "medicine", "symptoms", "blood_pressure", "discharge")
+
+# Rows per table
+PRESETS = {
+    "small": {"appointments": 20, "tasks": 20, "weight": 40, "medicine": 100, "symptoms": 60,
+              "blood_pressure": 100, "discharge": 30},
+    "medium": {"appointments": 100, "tasks": 100, "weight": 300, "medicine": 1000, "symptoms": 1000,
+               "blood_pressure": 2000, "discharge": 300},
+    "large": {"appointments": 500, "tasks": 300, "weight": 1500, "medicine": 5000, "symptoms": 5000,
+              "blood_pressure": 20000, "discharge": 2000},
+}
+
+DEFAULT_END_DATE = "2025-06-30"
+
+LOCATIONS = ["City Hospital", "Wellness Clinic", "OB-GYN Office", "Prenatal Lab", "Care Center", "Radiology Dept."]
+CITIES = ["Pune", "Delhi", "Mumbai", "Bengaluru", "Chennai", "Kolkata"]
+APPOINTMENTS = [
+    ("Routine Check-up", "Weekly monitoring and vitals."),
+    ("Ultrasound", "Growth and position scan."),
+    ("Blood Work", "Routine prenatal blood tests."),
+    ("Glucose Screening", "Gestational diabetes test."),
+    ("Vaccination", "Tdap / flu vaccine."),
+    ("Nutritional Counseling", "Discuss diet and supplements."),
+    ("Follow-up Visit", "Review test results and progress."),
+]
+TASKS = ["Book scan", "Pack hospital bag", "Prenatal class", "Take supplements", "Kick count",
+         "Birth plan review", "Dental check", "Blood test", "Rest and hydrate", "Pelvic floor exercises"]
+MEDICINES = [("Folic acid", "400 mcg", "08:00"), ("Iron", "60 mg", "13:00"), ("Calcium", "500 mg", "20:00"),
+             ("Vitamin D", "1000 IU", "08:00"), ("Prenatal multivitamin", "1 tablet", "09:00")]
+# (symptom, relative weight) per trimester
+SYMPTOMS = {
+    1: [("nausea", 6), ("fatigue", 5), ("breast tenderness", 3), ("headache", 2), ("bloating", 2)],
+    2: [("back pain", 4), ("heartburn", 4), ("leg cramps", 3), ("headache", 2), ("nasal congestion", 2)],
+    3: [("back pain", 6), ("swelling", 5), ("insomnia", 4), ("heartburn", 4), ("shortness of breath", 3)],
+}
+DISCHARGE = {"type": (["normal", "watery", "thick", "sticky"], [6, 2, 1, 1]),
+             "color": (["white", "clear", "yellow", "pink"], [5, 4, 1, 0.3]),
+             "bleeding": (["none", "spotting", "light"], [20, 2, 0.3])}
+NOTES = ["", "", "", "", "after breakfast", "felt fine", "doctor advised", "a bit tired", "evening reading"]
+
+def trimester(week: int) -> int:
+    return 1 if week <= 13 else 2 if week <= 27 else 3
+
+class _Timeline:
+    """Evenly spread, jittered timestamps over `years` ending at `end`, with the pregnancy week of each."""
+
+    def __init__(self, rng: random.Random, end: date, years: float):
+        self.rng = rng
+        self.end = datetime.combine(end, datetime.min.time()) + timedelta(hours=23)
+        self.start = self.end - timedelta(days=365 * years)
+
+    def points(self, count: int) -> list:
+        span = (self.end - self.start).total_seconds()
+        step = span / max(count, 1)
+        points = []
+        for i in range(count):
+            moment = self.start + timedelta(seconds=min(span, i * step + self.rng.uniform(0, step)))
+            points.append((self.week(moment), moment.strftime("%Y-%m-%d %H:%M:%S")))
+        return points
+
+    def week(self, moment: datetime) -> int:
+        return (moment - self.start).days // 7 % 40 + 1
+
+def _weighted(rng: random.Random, choices: list) -> str:
+    names, weights = zip(*choices)
+    return rng.choices(names, weights)[0]
+
+def generate(conn: sqlite3.Connection, volumes: dict, seed: int = 42, end_date: str = DEFAULT_END_DATE,
+             years: float = 2.0, hypertension_rate: float = 0.05) -> dict:
+    """Insert seeded rows into every table; returns the number of rows added per table."""
+    rng = random.Random(seed)
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    timeline = _Timeline(rng, end, years)
+
+    current_week = timeline.week(timeline.end)
+    lmp = end - timedelta(weeks=current_week)
+    base_weight = round(rng.uniform(48, 85), 1)
+    conn.execute(
+        "INSERT INTO profile (lmp, cycleLength, periodLength, age, weight, user_location, dueDate) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (lmp.isoformat(), max(21, min(35, round(rng.gauss(28, 2)))), rng.randint(3, 7), rng.randint(19, 42),
+         round(base_weight), rng.choice(CITIES), (lmp + timedelta(days=280)).isoformat()))
+
+    def gain(week):
+        return 0.12 * min(week, 13) + 0.45 * max(0, week - 13)
+
+    def note():
+        return rng.choice(NOTES) or None
+
+    rows = {
+        "weight": (
+            "INSERT INTO weekly_weight (week_number, weight, note, created_at) VALUES (?, ?, ?, ?)",
+            [(week, round(base_weight + gain(week) + rng.gauss(0, 0.4), 1), note(), created)
+             for week, created in timeline.points(volumes.get("weight", 0))]),
+        "medicine": (
+            "INSERT INTO weekly_medicine (week_number, name, dose, time, taken, note, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(week, *rng.choice(MEDICINES), rng.random() < 0.9, note(), created)
+             for week, created in timeline.points(volumes.get("medicine", 0))]),
+        "symptoms": (
+            "INSERT INTO weekly_symptoms (week_number, symptom, note, created_at) VALUES (?, ?, ?, ?)",
+            [(week, _weighted(rng, SYMPTOMS[trimester(week)]), note(), created)
+             for week, created in timeline.points(volumes.get("symptoms", 0))]),
+        "blood_pressure": (
+            "INSERT INTO blood_pressure_logs (week_number, systolic, diastolic, time, note, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [_blood_pressure(rng, week, created, hypertension_rate, note())
+             for week, created in timeline.points(volumes.get("blood_pressure", 0))]),
+        "discharge": (
+            "INSERT INTO discharge_logs (week_number, type, color, bleeding, note, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(week, *(rng.choices(*DISCHARGE[field])[0] for field in ("type", "color", "bleeding")), note(), created)
+             for week, created in timeline.points(volumes.get("discharge", 0))]),
+        "appointments": (
+            "INSERT INTO appointments (title, content, appointment_date, appointment_time, appointment_location, appointment_status) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [_appointment(rng, end, created) for _, created in timeline.points(volumes.get("appointments", 0))]),
+        "tasks": (
+            "INSERT INTO tasks (title, content, starting_week, ending_week, task_priority, isOptional, isAppointmentMade, task_status) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [_task(rng) for _ in range(volumes.get("tasks", 0))]),
+    }
+    for sql, values in rows.values():
+        conn.executemany(sql, values)
+    conn.commit()
+    return {table: len(values) for table, (_, values) in rows.items()}
+
+def _blood_pressure(rng, week, created, hypertension_rate, note):
+    systolic, diastolic = rng.gauss(112, 8), rng.gauss(72, 6)
+    if week > 27:
+        systolic, diastolic = systolic + 4, diastolic + 3
+    if rng.random() < hypertension_rate:
+        systolic, diastolic = systolic + 28, diastolic + 18
+    return (week, round(systolic), round(diastolic), rng.choice(["08:00", "13:00", "20:30"]), note, created)
+
+def _appointment(rng, end, created):
+    # Spread a little past the end date, so some appointments are upcoming
+    day = datetime.strptime(created[:10], "%Y-%m-%d").date() + timedelta(days=rng.randint(0, 30))
+    title, content = rng.choice(APPOINTMENTS)
+    hour, minute = rng.randint(8, 17), rng.choice([0, 30])
+    return (title, content, day.isoformat(), f"{(hour - 1) % 12 + 1:02d}:{minute:02d} {'AM' if hour < 12 else 'PM'}",
+            rng.choice(LOCATIONS), "completed" if day < end else "pending")
+
+def _task(rng):
+    start = rng.randint(1, 40)
+    return (rng.choice(TASKS), "", start, min(40, start + rng.choice([0, 0, 1, 2, 4])),
+            rng.choices(["low", "medium", "high"], [5, 3, 2])[0], rng.random() < 0.3, False,
+            rng.choices(["pending", "completed"], [3, 2])[0])
+
+def create_database(path: str, volumes: dict, seed: int = 42, **options) -> dict:
+    """(Re)create `path` from schema.sql and the migrations and fill it; returns the rows added per table."""
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        # Bulk load: nothing to recover if it crashes halfway
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA synchronous = OFF")
+        with open(SCHEMA) as f:
+            conn.executescript(f.read())
+        migrate(conn)
+        return generate(conn, volumes, seed=seed, **options)
+    finally:
+        conn.close()
+
+def create_shards(shard_dir: str, users: int, volumes: dict, seed: int = 42, cache_dir: str = None,
+                  **options) -> list:
+    """One database per user (user_0000.db, ...), optionally with its context cache file in `cache_dir`."""
+    os.makedirs(shard_dir, exist_ok=True)
+    cache = None
+    if cache_dir:
+        from agent.cache import ContextCache
+        cache = ContextCache(os.path.join(shard_dir, "user_0000.db"), cache_dir=cache_dir)
+
+    shards = []
+    for i in range(users):
+        user_id = f"user_{i:04d}"
+        rng = random.Random(seed + i)
+        shard_volumes = {table: round(count * rng.uniform(0.5, 1.5)) for table, count in volumes.items()}
+        path = os.path.join(shard_dir, f"{user_id}.db")
+        counts = create_database(path, shard_volumes, seed=seed + i, **options)
+        if cache is not None:
+            # Build the user's context from their shard and save it to disk
+            cache.db_path = path
+            cache.invalidate_cache(user_id)
+            cache.get_context(user_id)
+            cache.memory_cache.pop(user_id, None)
+        shards.append({"user_id": user_id, "path": path, "rows": counts})
+    return shards
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic BabyNest dataset.")
+    parser.add_argument("--db", type=str, default="db/synthetic.db", help="Database to (re)create")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium")
+    for table in TABLES:
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, dest=table,
+                            help=f"Rows in {table} (overrides the preset)")
+    parser.add_argument("--years", type=float, default=2.0, help="Time span the logs cover")
+    parser.add_argument("--end-date", type=str, default=DEFAULT_END_DATE, help="Date of the newest log (YYYY-MM-DD)")
+    parser.add_argument("--hypertension-rate", type=float, default=0.05, help="Share of high blood pressure readings")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, help="Write this many user shards instead of one database")
+    parser.add_argument("--shard-dir", type=str, default="db/shards")
+    parser.add_argument("--cache-dir", type=str, help="Also write each shard's context cache file here")
+    args = parser.parse_args(argv)
+
+    volumes = dict(PRESETS[args.preset])
+    volumes.update({table: getattr(args, table) for table in TABLES if getattr(args, table) is not None})
+    options = {"end_date": args.end_date, "years": args.years, "hypertension_rate": args.hypertension_rate}
+
+    start = time.perf_counter()
+    if args.users:
+        shards = create_shards(args.shard_dir, args.users, volumes, seed=args.seed, cache_dir=args.cache_dir, **options)
+        report = {"shards": len(shards), "shard_dir": args.shard_dir, "cache_dir": args.cache_dir,
+                  "rows": {table: sum(s["rows"][table] for s in shards) for table in shards[0]["rows"]}}
+    else:
+        report = {"db": args.db, "rows": create_database(args.db, volumes, seed=args.seed, **options)}
+    report["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Local HTTP load test with latency SLOs.
+
+Starts the Flask app in a subprocess on a generated database (see
+generate_dataset.py), with the offline embedding and the local keyword LLM
+backend, so no external service is needed. Then it replays a seeded mixed
+workload from concurrent clients:
+
+    agent    POST /agent with phrases from tests/fixtures/intent_phrases.json
+             (taken from Frontend/RAG_COMMANDS.md)
+    track    POST /weight, /symptoms, /blood_pressure
+    list     GET /weight, /symptoms, /blood_pressure, /get_tasks,
+             /get_appointments, /tasks/week/<week>
+    profile  GET /get_profile
+
+The report has throughput and p50/p95/p99 latency per endpoint and per class.
+The exit status is 1 when a class exceeds its SLO budget (p95/p99 in ms), the
+error rate is above --max-error-rate or throughput is below --min-rps.
+
+Usage (from the Backend directory):
+    python benchmarks/load_test.py --duration 30 --concurrency 8
+    python benchmarks/load_test.py --mix agent=1,list=5 --slo slo.json --output load.json
+    python benchmarks/load_test.py --url http://127.0.0.1:5000   # an already running server
+
+An SLO file maps classes to budgets, e.g. {"agent": {"p95_ms": 800}, "list": {"p99_ms": 250}}.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, os.path.join(backend_dir, "benchmarks"))
+
+FIXTURE = os.path.join(backend_dir, "tests", "fixtures", "intent_phrases.json")
+
+DEFAULT_MIX = {"agent": 2, "track": 2, "list": 5, "profile": 1}
+
+# Per-class latency budgets in ms, for the Flask development server on a laptop
+DEFAULT_SLOS = {
+    "agent": {"p95_ms": 1000, "p99_ms": 2000},
+    "track": {"p95_ms": 200, "p99_ms": 500},
+    "list": {"p95_ms": 300, "p99_ms": 600},
+    "profile": {"p95_ms": 100, "p99_ms": 250},
+}
+
+SYMPTOMS = ["nausea", "back pain", "fatigue", "heartburn", "headache", "swelling"]
+LIST_ROUTES = ["/weight", "/symptoms", "/blood_pressure", "/get_tasks", "/get_appointments"]
+
+class Workload:
+    """Seeded stream of (class, endpoint, method, path, body) requests."""
+
+    def __init__(self, mix: dict, phrases: list, seed: int):
+        self.rng = random.Random(seed)
+        self.classes, self.weights = zip(*mix.items())
+        self.phrases = phrases
+        self.lock = threading.Lock()
+
+    def next(self) -> tuple:
+        with self.lock:
+            kind = self.rng.choices(self.classes, self.weights)[0]
+            return (kind, *getattr(self, f"_{kind}")(self.rng))
+
+    def _agent(self, rng):
+        return "POST /agent", "POST", "/agent", {"query": rng.choice(self.phrases)}
+
+    def _track(self, rng):
+        week = rng.randint(1, 40)
+        target = rng.choice(["weight", "symptoms", "blood_pressure"])
+        if target == "weight":
+            body = {"week_number": week, "weight": round(rng.uniform(50, 90), 1)}
+        elif target == "symptoms":
+            body = {"week_number": week, "symptom": rng.choice(SYMPTOMS)}
+        else:
+            body = {"week_number": week, "systolic": rng.randint(100, 140), "diastolic": rng.randint(60, 90),
+                    "time": "09:00"}
+        return f"POST /{target}", "POST", f"/{target}", body
+
+    def _list(self, rng):
+        if rng.random() < 0.2:
+            return "GET /tasks/week/<week>", "GET", f"/tasks/week/{rng.randint(1, 40)}", None
+        route = rng.choice(LIST_ROUTES)
+        return f"GET {route}", "GET", route, None
+
+    def _profile(self, rng):
+        return "GET /get_profile", "GET", "/get_profile", None
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+def summarize(samples: list, errors: int, seconds: float) -> dict:
+    ordered = sorted(samples)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / seconds, 1),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+def send(host: str, port: int, method: str, path: str, body) -> int:
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        payload = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, body=payload, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+def run_load(url: str, workload: Workload, duration: float, warmup: float, concurrency: int) -> dict:
+    """Run the workload; returns the samples per (class, endpoint) recorded after the warm-up."""
+    parsed = urlparse(url)
+    results = {}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from, stop_at = start + warmup, start + warmup + duration
+
+    def client():
+        while True:
+            kind, endpoint, method, path, body = workload.next()
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                return
+            try:
+                status = send(parsed.hostname, parsed.port, method, path, body)
+            except OSError:
+                status = None
+            elapsed = time.perf_counter() - sent
+            if sent < measure_from:
+                continue
+            with lock:
+                entry = results.setdefault((kind, endpoint), {"samples": [], "errors": 0})
+                entry["samples"].append(elapsed)
+                entry["errors"] += status is None or status >= 500
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def check_slos(by_class: dict, overall: dict, slos: dict, max_error_rate: float, min_rps: float) -> list:
+    violations = []
+    for kind, budget in slos.items():
+        stats = by_class.get(kind)
+        if stats is None:
+            continue
+        for metric, limit in budget.items():
+            if stats[metric] > limit:
+                violations.append(f"{kind} {metric} {stats[metric]} > {limit}")
+    error_rate = overall["errors"] / max(overall["requests"], 1)
+    if error_rate > max_error_rate:
+        violations.append(f"error rate {error_rate:.4f} > {max_error_rate}")
+    if min_rps and overall["rps"] < min_rps:
+        violations.append(f"throughput {overall['rps']} rps < {min_rps}")
+    return violations
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workdir: str, preset: str, seed: int, env_name: str) -> tuple:
+    """Generate a database and start the app on it in a subprocess; returns (process, url)."""
+    from generate_dataset import PRESETS, create_database
+
+    db_path = os.path.join(workdir, "database.db")
+    create_database(db_path, PRESETS[preset], seed=seed)
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "BABYNEST_DATABASE": db_path,
+        "BABYNEST_CHROMA_PATH": os.path.join(workdir, "chromadb"),
+        "BABYNEST_CACHE_DIR": os.path.join(workdir, "cache"),
+        "BABYNEST_EMBEDDING_PROVIDER": env.get("BABYNEST_EMBEDDING_PROVIDER", "hashing"),
+        "BABYNEST_LOG_LEVEL": env.get("BABYNEST_LOG_LEVEL", "WARNING"),
+    })
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port), "--env", env_name],
+        cwd=backend_dir, env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            send("127.0.0.1", port, "GET", "/get_profile", None)
+            return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not start within 120s")
+
+def serve(port: int, env_name: str):
+    """Serve the app with a threaded WSGI server (the child process of start_server)."""
+    from werkzeug.serving import make_server
+    from app import app
+
+    app.config["ENV"] = env_name
+    # One access-log line per request would slow the server under test
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, weight = part.split("=", 1)
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown request class: {name}")
+        mix[name] = float(weight)
+    return mix
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the backend against latency SLOs.")
+    parser.add_argument("--url", type=str, help="Target a running server instead of starting one")
+    parser.add_argument("--duration", type=float, default=20, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured seconds before measuring")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. agent=2,track=2,list=5,profile=1")
+    parser.add_argument("--slo", type=str, help="JSON file of per-class budgets (overrides the defaults)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--min-rps", type=float, default=0)
+    parser.add_argument("--preset", type=str, default="medium", help="Dataset preset for the started server")
+    parser.add_argument("--env", type=str, default="production", choices=["development", "production"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.port, args.env)
+        return None
+
+    slos = {kind: dict(budget) for kind, budget in DEFAULT_SLOS.items()}
+    if args.slo:
+        with open(args.slo) as f:
+            for kind, budget in json.load(f).items():
+                slos.setdefault(kind, {}).update(budget)
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        phrases = [case["query"] for case in json.load(f)["cases"]]
+
+    process = None
+    with tempfile.TemporaryDirectory(prefix="babynest_load_") as workdir:
+        try:
+            url = args.url
+            if url is None:
+                process, url = start_server(workdir, args.preset, args.seed, args.env)
+            workload = Workload(args.mix, phrases, args.seed)
+            results = run_load(url, workload, args.duration, args.warmup, args.concurrency)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    if not results:
+        raise RuntimeError("No requests completed in the measured window")
+    by_endpoint = {endpoint: summarize(entry["samples"], entry["errors"], args.duration)
+                   for (_, endpoint), entry in sorted(results.items(), key=lambda item: item[0][1])}
+    by_class = {}
+    for kind in args.mix:
+        entries = [entry for (entry_kind, _), entry in results.items() if entry_kind == kind]
+        if entries:
+            by_class[kind] = summarize([s for e in entries for s in e["samples"]],
+                                       sum(e["errors"] for e in entries), args.duration)
+    overall = summarize([s for e in results.values() for s in e["samples"]],
+                        sum(e["errors"] for e in results.values()), args.duration)
+    violations = check_slos(by_class, overall, slos, args.max_error_rate, args.min_rps)
+
+    report = {
+        "benchmark": "load",
+        "seed": args.seed,
+        "duration_s": args.duration,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "overall": overall,
+        "by_class": by_class,
+        "by_endpoint": by_endpoint,
+        "slo": {"budgets": slos, "passed": not violations, "violations": violations},
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    return report
+
+if __name__ == "__main__":
+    report = main()
+    if report is not None and not report["slo"]["passed"]:
+        sys.exit(1)
@@ -0,0 +1,79 @@
+"""
+Run every benchmark and write one JSON report, stamped with the git commit,
+so runs can be compared across commits.
+
+Usage (from the Backend directory):
+    python benchmarks/run_all.py --output bench-$(git rev-parse --short HEAD).json
+    python benchmarks/run_all.py --quick      # small sizes, for a smoke run
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, os.path.join(backend_dir, "benchmarks"))
+
+# Benchmark module -> (default arguments, --quick arguments)
+BENCHMARKS = {
+    "bench_backend": ([], ["--scales", "100", "1000", "--repeat", "10"]),
+    "bench_intent": ([], ["--repeat", "20"]),
+    "bench_parsing": ([], ["--sizes", "1000", "5000", "--fuzz", "200"]),
+    "bench_quantization": ([], ["--sizes", "1000", "--queries", "50"]),
+}
+# Benchmarks taking --seed (the intent benchmark runs on fixed phrases)
+SEEDED = {"bench_backend", "bench_parsing", "bench_quantization"}
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=backend_dir, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run all backend benchmarks.")
+    parser.add_argument("--quick", action="store_true", help="Small sizes and repeats")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": args.seed,
+        "benchmarks": {},
+    }
+    for name in args.only or BENCHMARKS:
+        default_args, quick_args = BENCHMARKS[name]
+        bench_args = list(quick_args if args.quick else default_args)
+        if name in SEEDED:
+            bench_args += ["--seed", str(args.seed)]
+        module = __import__(name)
+        start = time.perf_counter()
+        # Each benchmark prints its own report; only the combined one is printed here
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = module.main(bench_args)
+        report["benchmarks"][name] = {"seconds": round(time.perf_counter() - start, 2), "report": result}
+        print(f"{name}: {report['benchmarks'][name]['seconds']}s", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,40 @@
 import sqlite3
 import os
 from flask import g
+from monitoring.log import get_logger
+from monitoring import sql_trace
 
-DATABASE = "db/database.db"
+log = get_logger("db")
+
+# Relative paths are resolved from the Backend directory
+DATABASE = os.getenv("BABYNEST_DATABASE", "db/database.db")
 SCHEMA_FILE = "schema.sql"
 
+# Indexes for the lookups and orderings used by routes/ and the agent (see
+# tests/test_query_plans.py). Applied to existing databases by migrate().
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_tasks_starting_week ON tasks (starting_week)",
+    "CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments (appointment_date)",
+    "CREATE INDEX IF NOT EXISTS idx_weekly_weight_week ON weekly_weight (week_number)",
+    "CREATE INDEX IF NOT EXISTS idx_weekly_medicine_week ON weekly_medicine (week_number)",
+    "CREATE INDEX IF NOT EXISTS idx_weekly_symptoms_week_created ON weekly_symptoms (week_number, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_weekly_symptoms_created ON weekly_symptoms (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_blood_pressure_week_created ON blood_pressure_logs (week_number, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_blood_pressure_created ON blood_pressure_logs (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_discharge_week_created ON discharge_logs (week_number, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_discharge_created ON discharge_logs (created_at)",
+)
+
+_migrated = False
+
+def connect(path=None):
+    """sqlite3.connect, with statement timing when SQL tracing is enabled (see monitoring/sql_trace.py)."""
+    return sqlite3.connect(path or DATABASE, factory=sql_trace.connection_factory())
+
 def open_db():
     if "db" not in g:
         first_time_setup()
-        g.db = sqlite3.connect(DATABASE)
+        g.db = connect()
         g.db.row_factory = sqlite3.Row
     return g.db
 
@@ -17,9 +43,23 @@ def close_db(e=None):
     if db is not None:
         db.close()
 
+def migrate(db):
+    """Bring a database created from schema.sql up to date. Safe to run repeatedly."""
+    for statement in INDEXES:
+        db.execute(statement)
+    db.commit()
+
 def first_time_setup():
+    global _migrated
     if not os.path.exists(DATABASE) or os.stat(DATABASE).st_size == 0:
         with sqlite3.connect(DATABASE) as db:
             with open(SCHEMA_FILE,"r") as f:
                 db.executescript(f.read())
             db.commit()
+        log.info("schema_created", database=DATABASE)
+        _migrated = False
+    # Once per process, so databases created before an index was added get it too
+    if not _migrated:
+        with sqlite3.connect(DATABASE) as db:
+            migrate(db)
+        _migrated = True
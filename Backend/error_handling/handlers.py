@@ -2,6 +2,9 @@
 from flask import jsonify, current_app
 from sqlite3 import DatabaseError, OperationalError
 from functools import wraps
+from monitoring.log import get_logger
+
+log = get_logger("routes")
 
 
 def create_error_response(dev_message, prod_message=None, details=None):
@@ -23,9 +26,11 @@ def handle_db_errors(f):
         try:
             return f(*args, **kwargs)
         except OperationalError as e:
+            log.error("db_operational_error", endpoint=f.__name__, error=str(e))
             response = create_error_response("Database Operational Error", "Database Operation could not be performed. Try Again Later!", details=str(e))
             return jsonify(response), 500
         except DatabaseError as e:
+            log.error("db_error", endpoint=f.__name__, error=str(e))
             response = create_error_response("Database Error", details=str(e))
             return jsonify(response), 500
     return wrapper
@@ -0,0 +1,195 @@
+"""
+Structured, asynchronous logging.
+
+Records are JSON lines ({"ts", "level", "logger", "event", ...fields}). Callers
+only put them on a queue; a background thread (logging.handlers.QueueListener)
+formats and writes them, so a slow stdout never adds to request latency.
+
+    log = get_logger("agent.cache")
+    log.info("cache_updated", user_id=user_id, data_types=["weight"])
+    log.debug("context_hit", user_id=user_id)   # sampled and rate limited
+
+Levels are set per subsystem, and a subsystem inherits its parent's level
+("agent.cache" falls back to "agent"). Debug events are sampled and rate
+limited per event name, because hot paths emit them on every request.
+
+Configuration (environment):
+    BABYNEST_LOG_LEVEL         default level (default INFO)
+    BABYNEST_LOG_LEVELS        per-subsystem levels, e.g. "agent.cache=DEBUG,routes=WARNING"
+    BABYNEST_LOG_DEBUG_SAMPLE  fraction of debug events kept (default 1.0)
+    BABYNEST_LOG_DEBUG_RATE    debug events per second per event name (default 20)
+    BABYNEST_LOG_FILE          write to this file instead of stderr
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT_LOGGER = "babynest"
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name[len(ROOT_LOGGER) + 1:] or record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue the record as is. The stock prepare() folds the traceback into the
+    message; here only the traceback is rendered (it can't cross threads) and
+    the listener's JSONFormatter does the rest.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class _RateLimiter:
+    """Token bucket per event name."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.rate, now))
+            tokens = min(self.rate, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            return allowed
+
+class StructuredLogger:
+    """Logger taking an event name and keyword fields."""
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    @property
+    def name(self) -> str:
+        return self._logger.name
+
+    def _log(self, level: int, event: str, exc_info=None, **fields):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event: str, **fields):
+        """Debug event; kept only if it passes sampling and the per-event rate limit."""
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        if _debug_sample < 1.0 and random.random() >= _debug_sample:
+            _dropped["sampled"] += 1
+            return
+        if not _rate_limiter.allow(f"{self._logger.name}:{event}"):
+            _dropped["rate_limited"] += 1
+            return
+        self._log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, exc_info=None, **fields):
+        self._log(logging.ERROR, event, exc_info=exc_info, **fields)
+
+_queue = queue.SimpleQueue()
+_listener = None
+_configure_lock = threading.Lock()
+_debug_sample = 1.0
+_rate_limiter = _RateLimiter(20)
+_dropped = {"sampled": 0, "rate_limited": 0}
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, level = part.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure(stream=None, level: str = None, levels: dict = None, debug_sample: float = None,
+              debug_rate: float = None):
+    """
+    (Re)configure logging; arguments override the environment. Called on first
+    use of get_logger, so calling it is only needed to change the settings.
+    """
+    global _listener, _debug_sample, _rate_limiter
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+
+        if stream is None:
+            log_file = os.getenv("BABYNEST_LOG_FILE")
+            handler = logging.FileHandler(log_file) if log_file else logging.StreamHandler(sys.stderr)
+        else:
+            handler = logging.StreamHandler(stream)
+        handler.setFormatter(JSONFormatter())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.handlers = [_QueueHandler(_queue)]
+        root.propagate = False
+        root.setLevel(level or os.getenv("BABYNEST_LOG_LEVEL", "INFO").upper())
+
+        # Reset levels set by an earlier configure() before applying the new ones
+        for name, logger in logging.root.manager.loggerDict.items():
+            if name.startswith(ROOT_LOGGER + ".") and isinstance(logger, logging.Logger):
+                logger.setLevel(logging.NOTSET)
+        per_subsystem = _parse_levels(os.getenv("BABYNEST_LOG_LEVELS", ""))
+        per_subsystem.update(levels or {})
+        for name, subsystem_level in per_subsystem.items():
+            logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(subsystem_level)
+
+        _debug_sample = debug_sample if debug_sample is not None else float(
+            os.getenv("BABYNEST_LOG_DEBUG_SAMPLE", "1.0"))
+        _rate_limiter = _RateLimiter(debug_rate if debug_rate is not None else float(
+            os.getenv("BABYNEST_LOG_DEBUG_RATE", "20")))
+
+        _listener = logging.handlers.QueueListener(_queue, handler, respect_handler_level=False)
+        _listener.start()
+
+def flush():
+    """Wait until every queued record has been written (stops and restarts the writer)."""
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.start()
+
+def get_dropped() -> dict:
+    """Debug events dropped by sampling and by rate limiting."""
+    return dict(_dropped)
+
+def get_logger(subsystem: str) -> StructuredLogger:
+    """Logger for a subsystem ("agent.cache", "routes", "db", ...)."""
+    if _listener is None:
+        configure()
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{subsystem}"))
+
+def _shutdown():
+    if _listener is not None:
+        _listener.stop()
+
+atexit.register(_shutdown)
@@ -0,0 +1,141 @@
+"""
+Memory accounting for caches and indexes.
+
+Modules register their long-lived structures with `register_structure`. The
+report deep-sizes each one (sys.getsizeof over everything reachable from it,
+numpy buffers included) and, where a capacity is given, projects the size when
+full. This is the number to size limits such as the context cache's
+`max_memory_cache_size` from.
+
+Objects shared between structures are counted in each of them. Allocations
+that are not reachable as Python objects (the Chroma client's caches, its
+SQLite connection) show up in the tracemalloc part of the report instead: the
+top allocation sites and the live bytes per package. That part needs tracing
+from startup, so run the server with PYTHONTRACEMALLOC=1 (or a higher frame
+count); tracing slows allocation-heavy code down noticeably.
+"""
+import os
+import sys
+import threading
+import tracemalloc
+import types
+from collections import deque
+
+import numpy as np
+
+_ATOMIC = (str, bytes, bytearray, int, float, complex, bool, type(None))
+# Code and modules are shared by everything; following them would size the whole process
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType, types.CodeType)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (getter, capacity getter)
+_structures = {}
+_structures_lock = threading.Lock()
+
+def register_structure(name: str, getter, capacity=None):
+    """
+    Report the object returned by `getter` under `name`. `capacity`, if given, returns
+    the maximum number of items the structure holds.
+    """
+    with _structures_lock:
+        _structures[name] = (getter, capacity)
+
+def deep_sizeof(obj) -> int:
+    """Bytes held by obj and everything reachable from it, each object counted once."""
+    seen, total, stack = set(), 0, [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, _ATOMIC):
+            continue
+        if isinstance(current, np.ndarray):
+            # An array owning its data already includes the buffer; a view counts its base
+            if current.base is not None:
+                stack.append(current.base)
+            continue
+        if isinstance(current, dict):
+            for key, value in list(current.items()):
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(list(current))
+        if hasattr(current, "__dict__"):
+            stack.append(vars(current))
+        for slot in getattr(type(current), "__slots__", ()):
+            if hasattr(current, slot):
+                stack.append(getattr(current, slot))
+    return total
+
+def _structure_stats(getter, capacity) -> dict:
+    obj = getter()
+    if obj is None:
+        return {"loaded": False}
+    stats = {"loaded": True, "bytes": deep_sizeof(obj)}
+    try:
+        stats["items"] = len(obj)
+    except TypeError:
+        return stats
+    if capacity is not None:
+        stats["capacity"] = capacity()
+        if stats["items"]:
+            stats["bytes_per_item"] = stats["bytes"] // stats["items"]
+            stats["projected_bytes_at_capacity"] = stats["bytes_per_item"] * stats["capacity"]
+    return stats
+
+def _package(filename: str) -> str:
+    """Top-level package (or Backend directory) a source file belongs to."""
+    parts = filename.replace("\\", "/").split("/")
+    if "site-packages" in parts:
+        return parts[parts.index("site-packages") + 1].split(".")[0]
+    if filename.startswith(BACKEND_DIR + os.sep):
+        return os.path.relpath(filename, BACKEND_DIR).split(os.sep)[0].split(".")[0]
+    if filename.startswith("<"):
+        return filename
+    return "stdlib"
+
+def _allocations(top: int) -> dict:
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "hint": "start the server with PYTHONTRACEMALLOC=1"}
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    sites = [{"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+              "bytes": stat.size, "count": stat.count}
+             for stat in snapshot.statistics("lineno")[:top]]
+    packages = {}
+    for stat in snapshot.statistics("filename"):
+        package = _package(stat.traceback[0].filename)
+        packages[package] = packages.get(package, 0) + stat.size
+    by_package = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "tracing": True,
+        "traced_bytes": current,
+        "peak_traced_bytes": peak,
+        "top_sites": sites,
+        "by_package": [{"package": name, "bytes": size} for name, size in by_package],
+    }
+
+def _max_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def memory_report(top: int = 10) -> dict:
+    """Per-structure sizes, process peak RSS and, when tracing, the top allocation sites."""
+    with _structures_lock:
+        structures = sorted(_structures.items())
+    return {
+        "max_rss_bytes": _max_rss_bytes(),
+        "structures": {name: _structure_stats(getter, capacity) for name, (getter, capacity) in structures},
+        "allocations": _allocations(top),
+    }
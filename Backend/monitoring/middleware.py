@@ -0,0 +1,79 @@
+"""
+Flask request metrics: latency, status codes and payload sizes per blueprint
+and route, recorded in the metrics registry.
+
+Streamed responses (Server-Sent Events) are timed to their first chunk:
+after_request runs before the body is generated, so the latency is recorded
+when the server produces the first chunk (or when the stream closes without one).
+"""
+import time
+
+from flask import g, request
+
+from monitoring.log import get_logger
+from monitoring.metrics import REGISTRY, SIZE_BUCKETS
+
+log = get_logger("routes")
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "babynest_http_requests_total", "HTTP requests by route and status",
+    ("blueprint", "route", "method", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "babynest_http_request_duration_seconds", "HTTP request latency",
+    ("blueprint", "route", "method"))
+HTTP_REQUEST_BYTES = REGISTRY.histogram(
+    "babynest_http_request_bytes", "HTTP request body size",
+    ("blueprint", "route"), buckets=SIZE_BUCKETS)
+HTTP_RESPONSE_BYTES = REGISTRY.histogram(
+    "babynest_http_response_bytes", "HTTP response body size",
+    ("blueprint", "route"), buckets=SIZE_BUCKETS)
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+
+def _timed_to_first_chunk(body, record):
+    """Yield from `body`, calling record() once: at the first chunk, or on close if there was none."""
+    recorded = False
+    try:
+        for chunk in body:
+            if not recorded:
+                recorded = True
+                record()
+            yield chunk
+    finally:
+        if not recorded:
+            record()
+        # Pass the close on, so a client disconnect still stops the generator behind the stream
+        close = getattr(body, "close", None)
+        if close is not None:
+            close()
+
+def _after_request(response):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return response
+
+    # The route template, not the raw path, so /get_task/1 and /get_task/2 share a series
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    blueprint = request.blueprint or "app"
+    method, status = request.method, response.status_code
+    HTTP_REQUESTS.inc(blueprint=blueprint, route=route, method=method, status=status)
+
+    def record_latency():
+        duration = time.perf_counter() - start
+        HTTP_LATENCY.observe(duration, blueprint=blueprint, route=route, method=method)
+        log.debug("request", method=method, route=route, status=status, duration_ms=round(duration * 1000, 3))
+
+    if request.content_length:
+        HTTP_REQUEST_BYTES.observe(request.content_length, blueprint=blueprint, route=route)
+    if response.is_streamed:
+        response.response = _timed_to_first_chunk(response.response, record_latency)
+    else:
+        record_latency()
+        HTTP_RESPONSE_BYTES.observe(response.calculate_content_length() or 0, blueprint=blueprint, route=route)
+    return response
+
+def init_app(app):
+    """Record request metrics for every request served by `app`."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,186 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it sends an X-BabyNest-Profile header (only honoured
+where debug endpoints are, see init_app) or is picked by sampling
+(BABYNEST_PROFILE_SAMPLE). The view function runs under one of two profilers:
+
+    cprofile  deterministic (cProfile); stored as pstats data, which
+              pstats.Stats, snakeviz or gprof2dot can read
+    sample    a thread samples the request thread's stack every
+              BABYNEST_PROFILE_INTERVAL_MS; stored as collapsed stacks
+              ("frame;frame;frame count" lines) for flamegraph.pl or speedscope
+
+Both profile only the request thread; work handed to the agent's stage pool
+shows up as time spent waiting on it. Results are kept in a bounded ring buffer
+and served by the debug endpoints in app.py. The response carries the result id
+in an X-BabyNest-Profile-Id header.
+
+Configuration (environment):
+    BABYNEST_PROFILE_SAMPLE       fraction of requests profiled (default 0)
+    BABYNEST_PROFILE_MODE         profiler for sampled requests (default sample)
+    BABYNEST_PROFILE_INTERVAL_MS  stack sampling interval (default 2)
+    BABYNEST_PROFILE_BUFFER       results kept (default 50)
+"""
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from functools import wraps
+
+from flask import g, request
+
+from monitoring.log import get_logger
+from monitoring.metrics import REGISTRY
+
+log = get_logger("monitoring.profiling")
+
+PROFILE_SAMPLE = float(os.getenv("BABYNEST_PROFILE_SAMPLE", "0"))
+PROFILE_MODE = os.getenv("BABYNEST_PROFILE_MODE", "sample")
+PROFILE_INTERVAL_MS = float(os.getenv("BABYNEST_PROFILE_INTERVAL_MS", "2"))
+PROFILE_BUFFER = int(os.getenv("BABYNEST_PROFILE_BUFFER", "50"))
+
+MODES = ("cprofile", "sample")
+PROFILE_HEADER = "X-BabyNest-Profile"
+
+PROFILED_REQUESTS = REGISTRY.counter("babynest_profiled_requests_total", "Requests run under a profiler", ("mode",))
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="babynest-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class ProfileBuffer:
+    """The last `size` profiles, oldest dropped first."""
+
+    def __init__(self, size: int = PROFILE_BUFFER):
+        self._entries = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, entry: dict) -> int:
+        with self._lock:
+            entry["id"] = next(self._ids)
+            self._entries.append(entry)
+            return entry["id"]
+
+    def get(self, profile_id: int):
+        with self._lock:
+            return next((e for e in self._entries if e["id"] == profile_id), None)
+
+    def list(self) -> list:
+        """Summaries, newest first, without the profile data."""
+        with self._lock:
+            return [{k: v for k, v in e.items() if k != "data"} for e in reversed(self._entries)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+profile_buffer = ProfileBuffer()
+
+def _requested_mode(allow_header) -> str:
+    """Profiler to use for the current request, or None."""
+    wanted = request.headers.get(PROFILE_HEADER)
+    if wanted and allow_header():
+        return wanted if wanted in MODES else PROFILE_MODE
+    if PROFILE_SAMPLE > 0 and random.random() < PROFILE_SAMPLE:
+        return PROFILE_MODE
+    return None
+
+def _top_functions(stats: pstats.Stats, limit: int = 5) -> list:
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{"function": f"{name} ({os.path.basename(path)}:{line})", "calls": calls,
+             "cumulative_ms": round(cumulative * 1000, 3)}
+            for (path, line, name), (_, calls, _, cumulative, _) in rows]
+
+def profile_call(mode: str, fn, *args, **kwargs):
+    """Run fn under the given profiler; returns (result, entry for the buffer)."""
+    start = time.perf_counter()
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            result = profiler.runcall(fn, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+        # Stats takes the profiler's data over (and empties it), so dump from here
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        entry = {"format": "pstats", "data": marshal.dumps(stats.stats), "top": _top_functions(stats)}
+    else:
+        sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+        sampler.start()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - start
+        entry = {"format": "collapsed", "data": sampler.collapsed().encode(), "samples": sampler.samples}
+    entry.update(mode=mode, duration_ms=round(duration * 1000, 3))
+    return result, entry
+
+def _profiled(view, allow_header):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        mode = _requested_mode(allow_header)
+        if mode is None:
+            return view(*args, **kwargs)
+        result, entry = profile_call(mode, view, *args, **kwargs)
+        entry.update(ts=time.time(), method=request.method, path=request.path, endpoint=request.endpoint)
+        g.profile_id = profile_buffer.add(entry)
+        PROFILED_REQUESTS.inc(mode=mode)
+        log.info("request_profiled", profile_id=g.profile_id, mode=mode, path=request.path,
+                 duration_ms=entry["duration_ms"])
+        return result
+    return wrapper
+
+def _add_profile_header(response):
+    profile_id = g.pop("profile_id", None)
+    if profile_id is not None:
+        response.headers["X-BabyNest-Profile-Id"] = str(profile_id)
+    return response
+
+def init_app(app, allow_header=lambda: False):
+    """
+    Make every view of `app` profilable. Call after all routes are registered.
+    `allow_header` decides whether the profile header is honoured for a request.
+    """
+    for endpoint, view in list(app.view_functions.items()):
+        if endpoint != "static":
+            app.view_functions[endpoint] = _profiled(view, allow_header)
+    app.after_request(_add_profile_header)
@@ -0,0 +1,286 @@
+"""
+Opt-in SQLite statement tracing.
+
+Connections opened through db.db.connect() (the request connection, the
+context cache, the week index) use TracedConnection when tracing is enabled.
+Every statement is timed, including the time spent fetching its rows, and
+grouped by its normalised SQL (literals replaced with ?, whitespace collapsed):
+
+- statements slower than the threshold are logged as "slow_query" (subsystem
+  "db") with the normalised SQL, parameter count, row count and plan
+- EXPLAIN QUERY PLAN is captured the first time each distinct statement is seen
+- per-statement totals are kept for GET /db/sql/stats, and counts and
+  latencies by statement kind go to the metrics registry
+
+Configuration (environment):
+    BABYNEST_SQL_TRACE    1 to enable (default 0)
+    BABYNEST_SQL_SLOW_MS  slow statement threshold in ms (default 50)
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from monitoring.log import get_logger
+from monitoring.metrics import REGISTRY
+
+log = get_logger("db")
+
+SQL_STATEMENTS = REGISTRY.counter("babynest_sql_statements_total", "SQL statements executed", ("kind",))
+SQL_DURATION = REGISTRY.histogram("babynest_sql_statement_duration_seconds", "SQL statement time, including fetching rows", ("kind",))
+SQL_SLOW = REGISTRY.counter("babynest_sql_slow_statements_total", "SQL statements over the slow threshold", ("kind",))
+
+SQL_TRACE_ENABLED = os.getenv("BABYNEST_SQL_TRACE", "0") == "1"
+SLOW_THRESHOLD_MS = float(os.getenv("BABYNEST_SQL_SLOW_MS", "50"))
+# Distinct statements tracked; later ones are still timed but not listed
+MAX_STATEMENTS = 1000
+
+# Statements EXPLAIN QUERY PLAN accepts
+_EXPLAINABLE = ("select", "insert", "update", "delete", "replace", "with")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def normalize_sql(sql: str) -> str:
+    """SQL with literals replaced by ? and whitespace collapsed, so executions of one statement group together."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _SPACES.sub(" ", sql).strip().rstrip(";")
+    return _IN_LIST.sub("(?, ...)", sql)
+
+def _kind(sql: str) -> str:
+    words = sql.split(None, 1)
+    return words[0].lower() if words else "unknown"
+
+def _param_count(parameters) -> int:
+    try:
+        return len(parameters)
+    except TypeError:
+        return 0
+
+class StatementStats:
+    """Per-statement totals, keyed by normalised SQL."""
+
+    def __init__(self, max_statements: int = MAX_STATEMENTS):
+        self.max_statements = max_statements
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def claim_plan(self, normalized: str) -> bool:
+        """True the first time a statement is seen, so its plan is captured once."""
+        with self._lock:
+            entry = self._entry(normalized)
+            if entry is None or entry["plan_claimed"]:
+                return False
+            entry["plan_claimed"] = True
+            return True
+
+    def set_plan(self, normalized: str, plan: list):
+        with self._lock:
+            entry = self._statements.get(normalized)
+            if entry is not None:
+                entry["plan"] = plan
+
+    def get_plan(self, normalized: str):
+        with self._lock:
+            entry = self._statements.get(normalized)
+            return entry["plan"] if entry else None
+
+    def record(self, normalized: str, duration_ms: float, params: int, rows: int, slow: bool):
+        with self._lock:
+            entry = self._entry(normalized)
+            if entry is None:
+                return
+            entry["calls"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["rows"] += rows
+            entry["params"] = params
+            if slow:
+                entry["slow_calls"] += 1
+
+    def _entry(self, normalized: str):
+        entry = self._statements.get(normalized)
+        if entry is None and len(self._statements) < self.max_statements:
+            entry = self._statements[normalized] = {
+                "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "params": 0,
+                "slow_calls": 0, "plan": None, "plan_claimed": False,
+            }
+        return entry
+
+    def snapshot(self) -> list:
+        """Statements by total time, slowest first."""
+        with self._lock:
+            items = [(sql, dict(entry)) for sql, entry in self._statements.items()]
+        statements = []
+        for sql, entry in items:
+            if not entry["calls"]:
+                continue
+            statements.append({
+                "sql": sql,
+                "kind": _kind(sql),
+                "calls": entry["calls"],
+                "total_ms": round(entry["total_ms"], 3),
+                "avg_ms": round(entry["total_ms"] / entry["calls"], 3),
+                "max_ms": round(entry["max_ms"], 3),
+                "slow_calls": entry["slow_calls"],
+                "rows": entry["rows"],
+                "params": entry["params"],
+                "plan": entry["plan"],
+            })
+        statements.sort(key=lambda s: s["total_ms"], reverse=True)
+        return statements
+
+    def clear(self):
+        with self._lock:
+            self._statements.clear()
+
+statement_stats = StatementStats()
+
+def _capture_plan(conn: sqlite3.Connection, sql: str, normalized: str, parameters):
+    if _kind(sql) not in _EXPLAINABLE or not statement_stats.claim_plan(normalized):
+        return
+    try:
+        # The base class execute, so the EXPLAIN itself isn't traced
+        rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        statement_stats.set_plan(normalized, [row[-1] for row in rows])
+    except sqlite3.Error as e:
+        log.debug("query_plan_failed", sql=normalized, error=str(e))
+
+def _finish(sql: str, params: int, rows: int, duration: float):
+    normalized = normalize_sql(sql)
+    kind = _kind(normalized)
+    duration_ms = duration * 1000
+    slow = duration_ms >= SLOW_THRESHOLD_MS
+    SQL_STATEMENTS.inc(kind=kind)
+    SQL_DURATION.observe(duration, kind=kind)
+    statement_stats.record(normalized, duration_ms, params, rows, slow)
+    if slow:
+        SQL_SLOW.inc(kind=kind)
+        log.warning("slow_query", sql=normalized, duration_ms=round(duration_ms, 3), params=params,
+                    rows=rows, plan=statement_stats.get_plan(normalized))
+
+class TracedCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement from execute() until its rows are
+    exhausted (or the next execute / close), and counts the rows.
+    """
+
+    _pending = None
+
+    def _start(self, sql: str, params: int, elapsed: float):
+        self._pending = [sql, params, 0, elapsed]
+        if self.description is None:
+            # Not a query: nothing to fetch
+            self._pending[2] = max(self.rowcount, 0)
+            self._flush()
+
+    def _flush(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            _finish(*pending)
+
+    def _fetched(self, rows: int, elapsed: float, done: bool):
+        if self._pending is not None:
+            self._pending[2] += rows
+            self._pending[3] += elapsed
+            if done:
+                self._flush()
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        _capture_plan(self.connection, sql, normalize_sql(sql), parameters)
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except sqlite3.Error:
+            _finish(sql, _param_count(parameters), 0, time.perf_counter() - start)
+            raise
+        self._start(sql, _param_count(parameters), time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters:
+            _capture_plan(self.connection, sql, normalize_sql(sql), seq_of_parameters[0])
+            params = _param_count(seq_of_parameters[0])
+        else:
+            params = 0
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except sqlite3.Error:
+            _finish(sql, params, 0, time.perf_counter() - start)
+            raise
+        self._start(sql, params, time.perf_counter() - start)
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(row is not None, time.perf_counter() - start, done=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(len(rows), time.perf_counter() - start, done=len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), time.perf_counter() - start, done=True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(0, time.perf_counter() - start, done=True)
+            raise
+        self._fetched(1, time.perf_counter() - start, done=False)
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        # A cursor read with fetchone() and then dropped is recorded here
+        self._flush()
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors (including those from execute()) are TracedCursors."""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def connection_factory():
+    """Connection class for sqlite3.connect(factory=...): traced when tracing is enabled."""
+    return TracedConnection if SQL_TRACE_ENABLED else sqlite3.Connection
+
+def enable(enabled: bool = True, slow_threshold_ms: float = None):
+    """Turn tracing on or off for connections opened from now on."""
+    global SQL_TRACE_ENABLED, SLOW_THRESHOLD_MS
+    SQL_TRACE_ENABLED = enabled
+    if slow_threshold_ms is not None:
+        SLOW_THRESHOLD_MS = slow_threshold_ms
+
+def get_sql_stats() -> dict:
+    return {
+        "enabled": SQL_TRACE_ENABLED,
+        "slow_threshold_ms": SLOW_THRESHOLD_MS,
+        "statements": statement_stats.snapshot(),
+    }
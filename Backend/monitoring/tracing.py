@@ -0,0 +1,184 @@
+"""
+Lightweight span tracing for the agent pipeline.
+
+A trace collects the spans of one request: each span has a name, a start
+offset and a duration in milliseconds, its parent span and free-form
+attributes (cache hit/miss, result sizes, ...). Spans opened in worker threads
+join the request's trace when the work is submitted with propagate().
+
+Every finished span also lands in a per-stage latency histogram, whether or not
+a trace is active, so stage latencies can be compared across requests. The
+histograms are exported in /metrics as babynest_stage_duration_seconds.
+
+    with start_trace("agent") as trace:
+        with span("get_context") as s:
+            ...
+            s.set(hit="memory")
+        trace.to_dict()
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from monitoring.metrics import REGISTRY, render_histogram_series
+
+# Upper bounds (ms) of the per-stage latency histogram buckets; the last bucket is unbounded
+STAGE_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_current_trace = contextvars.ContextVar("babynest_trace", default=None)
+_current_span = contextvars.ContextVar("babynest_span", default=None)
+
+class Span:
+    __slots__ = ("name", "parent", "start", "duration_ms", "attrs")
+
+    def __init__(self, name: str, parent: str = None):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.attrs = {}
+
+    def set(self, **attrs):
+        """Attach attributes (e.g. hit=True, results=3) to the span."""
+        self.attrs.update(attrs)
+
+class Trace:
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span_: Span):
+        with self._lock:
+            self.spans.append(span_)
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable trace, spans in start order."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return {
+            "name": self.name,
+            "duration_ms": self.duration_ms,
+            "spans": [
+                {
+                    "name": s.name,
+                    "parent": s.parent,
+                    "start_ms": round((s.start - self.start) * 1000, 3),
+                    "duration_ms": s.duration_ms,
+                    **({"attrs": s.attrs} if s.attrs else {}),
+                }
+                for s in spans
+            ],
+        }
+
+class StageHistograms:
+    """Per-stage latency histograms with fixed buckets."""
+
+    def __init__(self, buckets=STAGE_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, duration_ms: float):
+        i = bisect.bisect_left(self.buckets, duration_ms)
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = {"count": 0, "sum_ms": 0.0, "max_ms": 0.0,
+                                               "counts": [0] * (len(self.buckets) + 1)}
+            stats["count"] += 1
+            stats["sum_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["counts"][i] += 1
+
+    def series(self) -> dict:
+        """Copy of the raw per-stage stats (count, sum_ms, max_ms, per-bucket counts)."""
+        with self._lock:
+            return {name: dict(s, counts=list(s["counts"])) for name, s in self._stages.items()}
+
+    def snapshot(self) -> dict:
+        """Per stage: count, mean, max, estimated p50/p95/p99 and the bucket counts."""
+        stages = self.series()
+        labels = [f"le_{b}" for b in self.buckets] + ["inf"]
+        return {
+            name: {
+                "count": s["count"],
+                "mean_ms": round(s["sum_ms"] / s["count"], 3),
+                "max_ms": round(s["max_ms"], 3),
+                "p50_ms": self._quantile(s, 0.50),
+                "p95_ms": self._quantile(s, 0.95),
+                "p99_ms": self._quantile(s, 0.99),
+                "buckets": dict(zip(labels, s["counts"])),
+            }
+            for name, s in stages.items()
+        }
+
+    def _quantile(self, stats: dict, q: float):
+        """Upper bound of the bucket holding the q-quantile (max for the open bucket)."""
+        rank, seen = q * stats["count"], 0
+        for i, count in enumerate(stats["counts"]):
+            seen += count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else round(stats["max_ms"], 3)
+        return round(stats["max_ms"], 3)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+stage_histograms = StageHistograms()
+
+def _stage_metrics() -> list:
+    """The stage histograms as babynest_stage_duration_seconds, for /metrics."""
+    name = "babynest_stage_duration_seconds"
+    lines = [f"# HELP {name} Agent pipeline stage latency", f"# TYPE {name} histogram"]
+    buckets = tuple(b / 1000 for b in stage_histograms.buckets)
+    for stage, stats in sorted(stage_histograms.series().items()):
+        lines.extend(render_histogram_series(name, ("stage",), (stage,), buckets,
+                                             stats["counts"], stats["sum_ms"] / 1000))
+    return lines
+
+REGISTRY.register_collector(_stage_metrics)
+
+@contextmanager
+def start_trace(name: str):
+    """Collect the spans opened in this context (and propagated workers) into a new trace."""
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        trace.duration_ms = round((time.perf_counter() - trace.start) * 1000, 3)
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a pipeline stage; yields the Span so attributes can be added."""
+    parent = _current_span.get()
+    s = Span(name, parent.name if parent is not None else None)
+    s.attrs.update(attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    finally:
+        _current_span.reset(token)
+        s.duration_ms = round((time.perf_counter() - s.start) * 1000, 3)
+        stage_histograms.observe(name, s.duration_ms)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(s)
+
+def current_trace():
+    """The active trace, or None."""
+    return _current_trace.get()
+
+def propagate(fn):
+    """Wrap `fn` so it runs in a copy of the caller's context (and joins its trace) on another thread."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from monitoring.metrics import REGISTRY
+
+monitoring_bp = Blueprint('monitoring', __name__)
+
+@monitoring_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """All metrics in the Prometheus text exposition format."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
@@ -1,8 +1,10 @@
 import sqlite3
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from db.db import open_db,close_db
 from error_handling.error_classes import MissingFieldError, NotFoundError
 from error_handling.handlers import handle_db_errors
+from agent.week_index import get_week_index
+from utils import validate_week_number
 
 tasks_bp = Blueprint('tasks', __name__)
 
@@ -13,6 +15,15 @@ def get_tasks():
     tasks = db.execute('SELECT * FROM tasks').fetchall()
     return jsonify([dict(task) for task in tasks]), 200
 
+
+@tasks_bp.route('/tasks/week/<int:week>', methods=['GET'])
+def get_tasks_for_week(week):
+    week_result = validate_week_number(week)
+    if not week_result["status"]:
+        return jsonify({"error": week_result["error"]}), 400
+    # Pre-rendered from the week index, rebuilt after task changes
+    return Response(get_week_index().render_tasks_json(week), mimetype="application/json"), 200
+
         
 @tasks_bp.route('/get_task/<int:task_id>', methods=['GET'])
 @handle_db_errors
@@ -40,6 +51,7 @@ def add_task():
          data.get('task_status', 'pending'), data.get('task_priority', 'low'), int(data.get('isOptional', False)), int(data.get('isAppointmentMade', False)))
     )
     db.commit()
+    get_week_index().mark_tasks_changed()
     return jsonify({"status": "success", "message": "Task added"}), 200
 
 
@@ -61,6 +73,7 @@ def update_task(task_id):
          data.get('isAppointmentMade', task['isAppointmentMade']), task_id)
     )
     db.commit()
+    get_week_index().mark_tasks_changed()
     return jsonify({"status": "success", "message": "Task updated"}), 200
     
 
@@ -72,6 +85,7 @@ def delete_task(task_id):
     if task.rowcount == 0:
         raise NotFoundError(resource="Task", resource_id=task_id)
     db.commit()
+    get_week_index().mark_tasks_changed()
     return jsonify({"status": "success", "message": "Task deleted"}), 200
 
 @tasks_bp.route('/move_to_appointment/<int:task_id>', methods=['PUT'])
@@ -102,5 +116,6 @@ def move_to_appointment(task_id):
         (appointment_title, appointment_content, data['appointment_date'], data['appointment_time'], data['appointment_location'], 'pending')
     )
     db.commit()
+    get_week_index().mark_tasks_changed()
     return jsonify({"status": "success", "message": "Task moved to appointment"}), 200
     
\ No newline at end of file
@@ -0,0 +1,12 @@
+"""
+Shared pytest setup for the backend tests.
+
+Runs before any test module imports the agent, so the vector store picks up the
+offline hashing embedding and a throwaway ChromaDB directory.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("BABYNEST_TEST_MODE", "1")
+os.environ.setdefault("BABYNEST_CHROMA_PATH", tempfile.mkdtemp(prefix="babynest_chroma_"))
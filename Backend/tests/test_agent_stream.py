@@ -0,0 +1,112 @@
+"""
+Tests for the /agent/stream Server-Sent Events endpoint, using the fake
+streaming LLM backend.
+"""
+
+import os
+import sys
+import json
+import time
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.answer_cache import get_answer_cache
+from agent.llm import FakeStreamingBackend, LLMBackend, set_llm_backend
+from app import app
+
+QUERY = {"query": "How am I doing this week?"}
+
+def parse_events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def use_fake_backend(backend):
+    """Install the fake backend; clears cached answers so the model actually runs."""
+    get_answer_cache().clear()
+    return set_llm_backend(backend)
+
+def test_stream_sends_tokens_then_done():
+    backend = FakeStreamingBackend(n_tokens=5)
+    previous = use_fake_backend(backend)
+    try:
+        response = app.test_client().post("/agent/stream", json=QUERY)
+    finally:
+        set_llm_backend(previous)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    events = parse_events(response.get_data(as_text=True))
+    tokens = [data["text"] for event, data in events if event == "token"]
+    assert tokens == [f"token{i} " for i in range(5)]
+    assert events[-1][0] == "done"
+    assert events[-1][1]["response"] == "".join(tokens)
+
+def test_first_token_arrives_before_generation_finishes():
+    backend = FakeStreamingBackend(n_tokens=20, delay=0.05)
+    previous = use_fake_backend(backend)
+    try:
+        start = time.perf_counter()
+        response = app.test_client().post("/agent/stream", json=QUERY, buffered=False)
+        first = next(iter(response.response))
+        time_to_first_token = time.perf_counter() - start
+        response.close()
+    finally:
+        set_llm_backend(previous)
+
+    assert b"event: token" in first
+    assert time_to_first_token < 20 * 0.05 / 2, time_to_first_token
+
+def test_client_disconnect_stops_generation():
+    backend = FakeStreamingBackend(n_tokens=50, delay=0.01)
+    previous = use_fake_backend(backend)
+    try:
+        response = app.test_client().post("/agent/stream", json=QUERY, buffered=False)
+        chunks = iter(response.response)
+        for _ in range(3):
+            next(chunks)
+        # Closing the response is what the server does when the client goes away
+        response.close()
+        generated = backend.generated
+        time.sleep(0.1)
+    finally:
+        set_llm_backend(previous)
+
+    assert generated == 3
+    assert backend.generated == 3
+
+def test_handler_commands_are_streamed_as_one_chunk():
+    response = app.test_client().post("/agent/stream", json={"query": "show my appointments"})
+    events = parse_events(response.get_data(as_text=True))
+    assert [event for event, _ in events] == ["token", "done"]
+    assert events[1][1]["results"][0]["intent"] == "appointments"
+
+def test_stream_requires_query():
+    response = app.test_client().post("/agent/stream", json={"user_id": "default"})
+    assert response.status_code == 400
+
+def test_incomplete_backends_fail_when_built():
+    class StreamOnly(LLMBackend):
+        def stream(self, prompt, max_tokens=500, temperature=0.7):
+            yield "partial"
+
+    try:
+        StreamOnly()
+    except TypeError as e:
+        assert "generate" in str(e)
+    else:
+        raise AssertionError("a backend without generate() was built")
+    assert FakeStreamingBackend(n_tokens=3).generate("prompt") == "token0 token1 token2 "
+
+if __name__ == "__main__":
+    test_stream_sends_tokens_then_done()
+    test_first_token_arrives_before_generation_finishes()
+    test_client_disconnect_stops_generation()
+    test_handler_commands_are_streamed_as_one_chunk()
+    test_stream_requires_query()
+    test_incomplete_backends_fail_when_built()
+    print("✅ Agent streaming tests passed")
@@ -0,0 +1,153 @@
+"""
+Tests for the semantic answer cache: exact and paraphrased hits, misses on a
+new context version, other documents or other numbers, TTL, LRU bound and
+hit-rate stats, the agent skipping the model on a hit, and chat writes
+invalidating cached answers.
+"""
+
+import os
+import sys
+import time
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.answer_cache import AnswerCache
+from agent.embeddings import HashingEmbeddingFunction
+from agent.llm import KeywordBackend, set_llm_backend
+
+embed = HashingEmbeddingFunction()
+
+QUERY = "What should I eat during pregnancy?"
+PARAPHRASE = "what should i eat during my pregnancy"
+SCOPE = ("default", 1, ["guideline_3", "guideline_5"])
+
+class CountingBackend(KeywordBackend):
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, max_tokens=500, temperature=0.7):
+        self.calls += 1
+        return super().generate(prompt, max_tokens, temperature)
+
+def make_cache(**kwargs):
+    # The hashing embedding is lexical, so paraphrases score lower than with a sentence model
+    kwargs.setdefault("threshold", 0.8)
+    cache = AnswerCache(**kwargs)
+    cache.put(SCOPE, QUERY, embed([QUERY])[0], "Eat a balanced diet.")
+    return cache
+
+def test_exact_and_paraphrased_hits():
+    cache = make_cache()
+    assert cache.get(SCOPE, "  what should I EAT during pregnancy?", None) == "Eat a balanced diet."
+    assert cache.get(SCOPE, PARAPHRASE, embed([PARAPHRASE])[0]) == "Eat a balanced diet."
+    # Same documents in another order are the same scope
+    reordered = ("default", 1, ["guideline_5", "guideline_3"])
+    assert cache.get(reordered, PARAPHRASE, embed([PARAPHRASE])[0]) == "Eat a balanced diet."
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 3 and stats["semantic_hits"] == 2 and stats["hit_rate"] == 1.0
+
+def test_misses():
+    cache = make_cache()
+    embedding = embed([PARAPHRASE])[0]
+    assert cache.get(("default", 2, SCOPE[2]), PARAPHRASE, embedding) is None
+    assert cache.get(("default", 1, ["guideline_7"]), PARAPHRASE, embedding) is None
+    assert cache.get(("other", 1, SCOPE[2]), PARAPHRASE, embedding) is None
+    assert cache.get(SCOPE, "Is yoga safe?", embed(["Is yoga safe?"])[0]) is None
+
+    # Near-identical text with a different number is not the same question
+    cache.put(SCOPE, "tips for week 20", embed(["tips for week 20"])[0], "Week 20 tips")
+    assert cache.get(SCOPE, "tips for week 21", embed(["tips for week 21"])[0]) is None
+    assert cache.get_stats()["hit_rate"] == 0.0
+
+def test_ttl_and_size_bound():
+    cache = make_cache(ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get(SCOPE, QUERY, embed([QUERY])[0]) is None
+    assert cache.get_stats()["expired"] == 1 and cache.get_stats()["size"] == 0
+
+    cache = AnswerCache(max_entries=2, threshold=0.8)
+    for i in range(3):
+        query = f"question number {i}"
+        cache.put(SCOPE, query, embed([query])[0], f"answer {i}")
+    assert cache.get_stats()["size"] == 2 and cache.get_stats()["evictions"] == 1
+    assert cache.get(SCOPE, "question number 0", None) is None
+    assert cache.get(SCOPE, "question number 2", None) == "answer 2"
+
+def test_agent_skips_the_model_on_repeat_questions():
+    from app import agent
+
+    backend = CountingBackend()
+    previous_backend = set_llm_backend(backend)
+    previous_cache = agent.answer_cache
+    agent.answer_cache = AnswerCache(threshold=0.8)
+    try:
+        first = agent.run(QUERY)
+        assert backend.calls == 1
+        assert agent.run(QUERY.upper()) == first
+        assert backend.calls == 1
+        assert agent.answer_cache.get_stats()["hits"] == 1
+
+        agent.run("Is yoga safe during pregnancy?")
+        assert backend.calls == 2
+    finally:
+        agent.answer_cache = previous_cache
+        set_llm_backend(previous_backend)
+
+def test_chat_writes_invalidate_cached_answers():
+    from app import app, agent, db_path
+    import sqlite3
+
+    backend = CountingBackend()
+    previous_backend = set_llm_backend(backend)
+    previous_cache = agent.answer_cache
+    agent.answer_cache = AnswerCache(threshold=0.8)
+    try:
+        with app.test_request_context():
+            agent.run(QUERY)
+            agent.run(QUERY)
+            assert backend.calls == 1
+
+            # Logging a value through chat gives the user's data a new version
+            assert agent.run("log weight 66kg note answer cache test").startswith("✅")
+            agent.run(QUERY)
+            assert backend.calls == 2
+
+            # So does a write whose data is not part of the cached context
+            assert agent.run("book appointment for answercachetest tomorrow at 10am").startswith("✅")
+            agent.run(QUERY)
+            assert backend.calls == 3
+    finally:
+        agent.answer_cache = previous_cache
+        set_llm_backend(previous_backend)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM weekly_weight WHERE note = 'answer cache test'")
+            conn.execute("DELETE FROM appointments WHERE title = 'answercachetest'")
+            conn.commit()
+        agent.update_cache(data_type="weight", operation="delete")
+
+def test_guidelines_reload_clears_cached_answers():
+    from agent import vector_store
+    from agent.answer_cache import get_answer_cache
+
+    cache = get_answer_cache()
+    cache.put(SCOPE, QUERY, embed([QUERY])[0], "Eat a balanced diet.")
+    assert cache.get(SCOPE, QUERY, embed([QUERY])[0]) is not None
+
+    # A guidelines.json the collection wasn't loaded from
+    with open(vector_store._guidelines_hash_file(), "w") as f:
+        f.write("stale")
+    assert vector_store.update_guidelines_in_vector_store() is True
+    assert cache.get(SCOPE, QUERY, embed([QUERY])[0]) is None
+    assert not vector_store.guidelines_need_update()
+
+if __name__ == "__main__":
+    test_exact_and_paraphrased_hits()
+    test_misses()
+    test_ttl_and_size_bound()
+    test_agent_skips_the_model_on_repeat_questions()
+    test_chat_writes_invalidate_cached_answers()
+    test_guidelines_reload_clears_cached_answers()
+    print("✅ Answer cache tests passed")
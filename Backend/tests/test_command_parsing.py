@@ -0,0 +1,92 @@
+"""
+Tests for the shared command parser used by the appointment, weight and
+symptom handlers, including adversarial long inputs.
+"""
+
+import os
+import sys
+import time
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.handlers.parsing import parse_command, tokenize
+from agent.handlers.appointment import parse_appointment_command, parse_time
+from agent.handlers.weight import parse_weight_command
+from agent.handlers.symptoms import parse_symptom_command
+
+def test_tokenize_kinds():
+    kinds = [(kind, value) for kind, value, _, _ in tokenize("on 10/15 at 10:30 pm log 65.5kg tomorrow's")]
+    assert kinds == [
+        ("word", "on"), ("date", "10/15"), ("word", "at"), ("time", "10:30 pm"),
+        ("word", "log"), ("number", "65.5"), ("word", "kg"), ("word", "tomorrow"),
+    ]
+
+def test_appointment_fields():
+    parsed = parse_appointment_command("Make an appointment for ultrasound tomorrow at 2pm at City Hospital")
+    assert parsed == {"title": "ultrasound", "date": "tomorrow", "time": "2pm", "location": "city hospital"}
+
+    parsed = parse_appointment_command("book appointment for blood test next week at afternoon at medical center")
+    assert parsed == {"title": "blood test", "date": "next week", "time": "afternoon", "location": "medical center"}
+
+    parsed = parse_appointment_command("schedule a checkup today at 10am at delhi hospital")
+    assert parsed["title"] == "checkup" and parsed["location"] == "delhi hospital"
+
+def test_appointment_without_location():
+    parsed = parse_appointment_command("What appointments do I have this week?")
+    assert parsed["location"] is None
+    assert parse_appointment_command("book appointment for 2pm")["title"] == "appointment"
+
+def test_weight_fields():
+    assert parse_weight_command("log weight 65kg for week 12 with note feeling good") == {
+        "weight": 65.0, "week": 12, "note": "feeling good"
+    }
+    assert parse_weight_command("my weight is 65")["weight"] == 65.0
+    assert parse_weight_command("record 70kg weight")["weight"] == 70.0
+    assert parse_weight_command("show weight trend")["weight"] is None
+
+def test_symptom_fields():
+    assert parse_symptom_command("log symptom nausea this morning with note mild discomfort") == {
+        "symptom": "nausea", "week": None, "note": "mild discomfort"
+    }
+    assert parse_symptom_command("I'm feeling nauseous and tired")["symptom"] == "nauseous and tired"
+    assert parse_symptom_command("record symptom back pain for week 20")["week"] == 20
+    assert parse_symptom_command("log symptoms")["symptom"] is None
+
+def test_parse_time():
+    assert [parse_time(t) for t in ["2pm", "10:30 am", "10:30 pm", "12am", "evening", "14:15", None]] == [
+        "14:00", "10:30", "22:30", "00:00", "18:00", "14:15", "09:00"
+    ]
+
+def test_adversarial_inputs_are_linear():
+    # Inputs that made the previous regex parsers backtrack for seconds at 10 KB
+    size = 10_000
+    queries = [
+        "log x" + " " * size + "y",
+        "weight " + "9" * size + "am",
+        "book appointment " + "at today " * (size // 9),
+        "make " + "a " * (size // 2),
+    ]
+    for query in queries:
+        start = time.perf_counter()
+        parse_appointment_command(query)
+        parse_weight_command(query)
+        parse_symptom_command(query)
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.5, f"{elapsed:.2f}s for {query[:30]!r}"
+
+def test_parse_command_handles_empty_input():
+    parsed = parse_command("")
+    assert parsed["tokens"] == [] and parsed["date"] is None and parsed["note"] is None
+
+if __name__ == "__main__":
+    test_tokenize_kinds()
+    test_appointment_fields()
+    test_appointment_without_location()
+    test_weight_fields()
+    test_symptom_fields()
+    test_parse_time()
+    test_adversarial_inputs_are_linear()
+    test_parse_command_handles_empty_input()
+    print("✅ Command parsing tests passed")
@@ -0,0 +1,80 @@
+"""
+Tests for the synthetic dataset generator: requested volumes, reproducibility
+from the seed, plausible values, and user shards with context cache files.
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, os.path.join(backend_dir, "benchmarks"))
+
+from generate_dataset import PRESETS, create_database, create_shards
+
+VOLUMES = {"appointments": 30, "tasks": 20, "weight": 80, "medicine": 120, "symptoms": 150,
+           "blood_pressure": 400, "discharge": 50}
+
+def _dump(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+                for table in ("weekly_weight", "blood_pressure_logs", "weekly_symptoms", "appointments")}
+    finally:
+        conn.close()
+
+def test_volumes_and_reproducibility():
+    with tempfile.TemporaryDirectory() as tmp:
+        first, second, other = (os.path.join(tmp, name) for name in ("a.db", "b.db", "c.db"))
+        assert create_database(first, VOLUMES, seed=7) == VOLUMES
+        create_database(second, VOLUMES, seed=7)
+        create_database(other, VOLUMES, seed=8)
+        assert _dump(first) == _dump(second)
+        assert _dump(first)["blood_pressure_logs"] != _dump(other)["blood_pressure_logs"]
+
+def test_values_are_plausible():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.db")
+        create_database(path, PRESETS["medium"], seed=1, end_date="2025-06-30", hypertension_rate=0.1)
+        conn = sqlite3.connect(path)
+        try:
+            weeks = conn.execute("SELECT MIN(week_number), MAX(week_number) FROM blood_pressure_logs").fetchone()
+            assert weeks == (1, 40)
+            mean_systolic, high = conn.execute(
+                "SELECT AVG(systolic), AVG(systolic >= 140) FROM blood_pressure_logs").fetchone()
+            assert 105 < mean_systolic < 125 and 0.05 < high < 0.2
+            # Logs are in time order and end by the end date
+            created = [row[0] for row in conn.execute("SELECT created_at FROM discharge_logs ORDER BY id")]
+            assert created == sorted(created) and "2025-06" < created[-1] < "2025-07"
+            # Weight gain over a pregnancy
+            early, late = (conn.execute("SELECT AVG(weight) FROM weekly_weight WHERE week_number BETWEEN ? AND ?",
+                                        bounds).fetchone()[0]
+                           for bounds in ((1, 8), (34, 40)))
+            assert late - early > 5
+            statuses = dict(conn.execute(
+                "SELECT appointment_status, MAX(appointment_date) FROM appointments GROUP BY 1").fetchall())
+            assert statuses["completed"] < "2025-06-30" <= statuses["pending"]
+        finally:
+            conn.close()
+
+def test_shards_with_cache_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        shards = create_shards(os.path.join(tmp, "shards"), 3, PRESETS["small"], seed=3,
+                               cache_dir=os.path.join(tmp, "cache"))
+        assert [s["user_id"] for s in shards] == ["user_0000", "user_0001", "user_0002"]
+        assert shards[0]["rows"] != shards[1]["rows"]
+        for shard in shards:
+            assert os.path.exists(shard["path"])
+            with open(os.path.join(tmp, "cache", f"context_{shard['user_id']}.json")) as f:
+                context = json.load(f)
+            assert len(context["tracking_data"]["blood_pressure"]) == 7
+
+if __name__ == "__main__":
+    test_volumes_and_reproducibility()
+    test_values_are_plausible()
+    test_shards_with_cache_files()
+    print("✅ Dataset generator tests passed")
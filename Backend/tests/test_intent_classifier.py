@@ -0,0 +1,86 @@
+"""
+Tests for the compiled, scored intent classifier.
+Accuracy is measured on the labelled phrases in fixtures/intent_phrases.json.
+"""
+
+import os
+import sys
+import json
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.intent import _compile, analyze_query, classify_intent, has_action, matched_phrases
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "intent_phrases.json")
+
+def load_cases():
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        return json.load(f)["cases"]
+
+def test_fixture_accuracy():
+    cases = load_cases()
+    misses = [c for c in cases if classify_intent(c["query"]) != c["intent"]]
+    accuracy = 1 - len(misses) / len(cases)
+    print(f"Intent accuracy: {accuracy:.1%} on {len(cases)} phrases")
+    assert accuracy >= 0.95, misses
+
+def test_health_questions_stay_general():
+    # Symptom words and units are questions unless named or logged explicitly
+    for query in ["I have a headache, is paracetamol safe?", "Is it normal to feel tired in week 10?",
+                  "How do I deal with back pain during pregnancy?", "What should I eat if I feel sick?",
+                  "How many kg should I gain by week 20?"]:
+        assert classify_intent(query) == "general", query
+    assert classify_intent("log headache") == "symptoms"
+    assert classify_intent("record 65 kg") == "weight"
+
+    # So are visit nouns, and questions about booking never become create commands
+    for query in ["when should I book an ultrasound?", "should I schedule a doctor visit for my headache?",
+                  "Should I visit a doctor if I have cramps?", "how can I fix my sleep before the doctor visit?",
+                  "when should I book an appointment?"]:
+        analysis = analyze_query(query)
+        assert analysis["intent"] == "general" and not has_action(analysis, "create"), query
+    assert classify_intent("schedule ultrasound tomorrow") == "appointments"
+    assert classify_intent("can you book a checkup tomorrow?") == "appointments"
+    assert classify_intent("What appointments do I have this week?") == "appointments"
+
+def test_unit_words_are_scored_once():
+    for query in ("kg", "kgs", "65 kg", "pounds"):
+        assert [(r["intent"], r["score"]) for r in analyze_query(query)["ranked"]] == [("weight", 0.5)], query
+
+    # Phrases that normalise to the same tokens share one trie entry, at the highest weight
+    trie, _ = _compile({"weight": [("pound", 0.5), ("pounds", 1.0), ("lb", 0.5)]}, {})
+    assert trie["pound"]["$"] == [("intent", "weight", 1.0, "pounds")]
+
+def test_ambiguous_query_is_ranked():
+    analysis = analyze_query("what symptoms go with weight gain")
+    assert analysis["intent"] == "symptoms"
+    assert [r["intent"] for r in analysis["ranked"]] == ["symptoms", "weight"]
+    assert abs(sum(r["confidence"] for r in analysis["ranked"]) - 1.0) < 0.01
+
+def test_matches_carry_spans():
+    query = "Book an appointment for ultrasound tomorrow"
+    analysis = analyze_query(query)
+    spans = analysis["ranked"][0]["matches"]
+    assert [query[m["start"]:m["end"]].lower() for m in spans] == ["appointment", "ultrasound"]
+    assert has_action(analysis, "create")
+    assert not has_action(analysis, "log")
+
+def test_phrases_match_longest_first():
+    analysis = analyze_query("I have had morning sickness all week")
+    assert matched_phrases(analysis, "symptoms") == ["morning sickness"]
+
+def test_invalid_input():
+    assert classify_intent("") == "general"
+    assert classify_intent(None) == "general"
+
+if __name__ == "__main__":
+    test_fixture_accuracy()
+    test_health_questions_stay_general()
+    test_unit_words_are_scored_once()
+    test_ambiguous_query_is_ranked()
+    test_matches_carry_spans()
+    test_phrases_match_longest_first()
+    test_invalid_input()
+    print("✅ Intent classifier tests passed")
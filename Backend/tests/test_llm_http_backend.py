@@ -0,0 +1,179 @@
+"""
+Tests for the HTTP LLM backend against a stub llama.cpp-style server:
+keep-alive connection reuse, micro-batching of concurrent prompts, queue
+timeouts under the concurrency limit, and streaming.
+"""
+
+import os
+import sys
+import json
+import time
+import http.client
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.llm_http import HTTPBackend, LLMQueueTimeout
+
+# Simulated model step: one forward pass per request, whatever the batch size
+STEP_SECONDS = 0.2
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.requests = []
+        self.client_ports = set()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests.append(body)
+            self.server.client_ports.add(self.client_address[1])
+
+        if body.get("stream"):
+            return self._stream(body)
+
+        time.sleep(STEP_SECONDS)
+        prompts = body["prompt"]
+        if isinstance(prompts, list):
+            data = [{"content": f"echo:{p}"} for p in prompts]
+        else:
+            data = {"content": f"echo:{prompts}"}
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        n = body["n_predict"]
+        for i in range(n):
+            event = {"content": f"t{i} ", "stop": i == n - 1}
+            self._chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+def start_server() -> StubServer:
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_connections_are_kept_alive():
+    server = start_server()
+    try:
+        backend = HTTPBackend(server.url, batch_window_ms=0)
+        assert [backend.generate(f"q{i}") for i in range(3)] == ["echo:q0", "echo:q1", "echo:q2"]
+        assert backend.pool.created == 1
+        assert len(server.client_ports) == 1
+    finally:
+        server.shutdown()
+
+class StaleConnection:
+    """A kept-alive connection the server has already closed."""
+
+    def __init__(self):
+        self.closed = False
+
+    def request(self, *args, **kwargs):
+        raise http.client.RemoteDisconnected("Remote end closed connection without response")
+
+    def close(self):
+        self.closed = True
+
+def test_stale_connections_are_replaced_with_new_ones():
+    server = start_server()
+    try:
+        backend = HTTPBackend(server.url, batch_window_ms=0)
+        stale = [StaleConnection(), StaleConnection()]
+        for conn in stale:
+            backend.pool.release(conn)
+        # The retry must not pick the second stale connection from the pool
+        assert backend.generate("q") == "echo:q"
+        assert backend.pool.created == 1
+        assert stale[1].closed and not stale[0].closed
+    finally:
+        server.shutdown()
+
+def test_concurrent_prompts_are_batched():
+    server = start_server()
+    try:
+        backend = HTTPBackend(server.url, batch_window_ms=50, max_batch=8)
+        results = {}
+
+        def ask(i):
+            results[i] = backend.generate(f"q{i}")
+
+        threads = [threading.Thread(target=ask, args=(i,)) for i in range(8)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        assert results == {i: f"echo:q{i}" for i in range(8)}
+        # Far fewer server requests than prompts, and close to one model step instead of eight
+        assert len(server.requests) <= 2, len(server.requests)
+        assert elapsed < 4 * STEP_SECONDS, elapsed
+    finally:
+        server.shutdown()
+
+def test_queue_timeout_when_server_is_busy():
+    server = start_server()
+    try:
+        backend = HTTPBackend(server.url, max_concurrency=1, batch_window_ms=0, queue_timeout=0.05)
+        busy = threading.Thread(target=backend.generate, args=("slow",))
+        busy.start()
+        time.sleep(0.05)
+        try:
+            # Different sampling parameters, so it can't share the running batch
+            backend.generate("late", max_tokens=10)
+            assert False, "expected LLMQueueTimeout"
+        except LLMQueueTimeout:
+            pass
+        busy.join()
+        assert backend.batcher.stats["queue_timeouts"] == 1
+    finally:
+        server.shutdown()
+
+def test_stream_yields_tokens_and_reuses_connection():
+    server = start_server()
+    try:
+        backend = HTTPBackend(server.url, batch_window_ms=0)
+        assert list(backend.stream("hello", max_tokens=4)) == ["t0 ", "t1 ", "t2 ", "t3 "]
+        assert backend.generate("after") == "echo:after"
+        assert backend.pool.created == 1
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_connections_are_kept_alive()
+    test_stale_connections_are_replaced_with_new_ones()
+    test_concurrent_prompts_are_batched()
+    test_queue_timeout_when_server_is_busy()
+    test_stream_yields_tokens_and_reuses_connection()
+    print("✅ HTTP LLM backend tests passed")
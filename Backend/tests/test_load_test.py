@@ -0,0 +1,62 @@
+"""
+Tests for the load-test harness: the seeded workload mix, latency summaries
+and SLO checks, and a short run against an in-process server.
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, os.path.join(backend_dir, "benchmarks"))
+
+from load_test import Workload, check_slos, run_load, summarize
+
+PHRASES = ["log my weight 65kg", "what should I eat this week?"]
+
+def test_workload_is_seeded_and_follows_the_mix():
+    mix = {"agent": 1, "list": 3}
+    a, b = Workload(mix, PHRASES, seed=1), Workload(mix, PHRASES, seed=1)
+    assert [a.next() for _ in range(50)] == [b.next() for _ in range(50)]
+
+    workload = Workload(mix, PHRASES, seed=2)
+    kinds = Counter(workload.next()[0] for _ in range(4000))
+    assert set(kinds) == {"agent", "list"} and 2.5 < kinds["list"] / kinds["agent"] < 3.5
+
+def test_summary_and_slo_checks():
+    stats = summarize([i / 1000 for i in range(1, 101)], errors=2, seconds=10)
+    assert stats["requests"] == 100 and stats["rps"] == 10
+    assert stats["p50_ms"] == 51 and stats["p95_ms"] == 96 and stats["p99_ms"] == 100
+
+    slos = {"list": {"p95_ms": 90, "p99_ms": 200}, "agent": {"p95_ms": 1}}
+    violations = check_slos({"list": stats}, stats, slos, max_error_rate=0.01, min_rps=20)
+    # No agent requests: its budget is not checked
+    assert violations == ["list p95_ms 96.0 > 90", "error rate 0.0200 > 0.01", "throughput 10.0 rps < 20"]
+    assert check_slos({"list": stats}, stats, {"list": {"p99_ms": 200}}, 0.05, 0) == []
+
+def test_short_run_against_the_app():
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        workload = Workload({"list": 1, "profile": 1}, PHRASES, seed=3)
+        results = run_load(f"http://127.0.0.1:{server.server_port}", workload, duration=0.5, warmup=0.1,
+                           concurrency=2)
+    finally:
+        server.shutdown()
+
+    assert {kind for kind, _ in results} == {"list", "profile"}
+    assert all(entry["errors"] == 0 and entry["samples"] for entry in results.values())
+    assert ("profile", "GET /get_profile") in results
+
+if __name__ == "__main__":
+    test_workload_is_seeded_and_follows_the_mix()
+    test_summary_and_slo_checks()
+    test_short_run_against_the_app()
+    print("✅ Load test harness tests passed")
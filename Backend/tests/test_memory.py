@@ -0,0 +1,88 @@
+"""
+Tests for memory accounting: deep sizes, per-structure capacity projections,
+tracemalloc allocation sites and the debug endpoint.
+"""
+
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from monitoring import memory
+from monitoring.memory import deep_sizeof, memory_report, register_structure
+
+class _Slotted:
+    __slots__ = ("payload",)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+def test_deep_sizeof():
+    text = "x" * 10_000
+    assert deep_sizeof({"a": [text]}) > 10_000
+    # Shared objects are counted once
+    assert deep_sizeof([text, text]) < deep_sizeof([text, "y" * 10_000])
+    assert deep_sizeof(_Slotted(text)) > 10_000
+
+    array = np.zeros(100_000, dtype=np.uint8)
+    assert 100_000 < deep_sizeof(array) < 101_000
+    assert deep_sizeof({"view": array[:10]}) > 100_000
+    # Modules and functions are not followed
+    assert deep_sizeof([np, deep_sizeof]) < 1_000
+
+def test_structures_and_capacity():
+    entries = {f"user_{i}": {"notes": str(i) * 1000} for i in range(4)}
+    register_structure("test_cache", lambda: entries, capacity=lambda: 40)
+    register_structure("test_unloaded", lambda: None)
+    try:
+        structures = memory_report()["structures"]
+    finally:
+        memory._structures.pop("test_cache")
+        memory._structures.pop("test_unloaded")
+    stats = structures["test_cache"]
+    assert stats["items"] == 4 and stats["capacity"] == 40 and stats["bytes"] > 4000
+    assert stats["projected_bytes_at_capacity"] == stats["bytes_per_item"] * 40
+    assert structures["test_unloaded"] == {"loaded": False}
+
+def test_allocation_sites_and_endpoint():
+    was_tracing = tracemalloc.is_tracing()
+    tracemalloc.start()
+    try:
+        held = [bytearray(1024) for _ in range(2000)]
+        allocations = memory_report(top=5)["allocations"]
+        assert allocations["tracing"] and len(allocations["top_sites"]) <= 5
+        assert any("test_memory.py" in site["site"] and site["bytes"] >= 2_000_000
+                   for site in allocations["top_sites"])
+        assert any(entry["package"] == "tests" for entry in allocations["by_package"])
+        del held
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    if not was_tracing:
+        assert memory_report()["allocations"]["tracing"] is False
+
+    from app import app
+    client = app.test_client()
+    previous = os.environ.pop("BABYNEST_DEBUG_ENDPOINTS", None)
+    try:
+        assert client.get("/debug/memory").status_code == 404
+        os.environ["BABYNEST_DEBUG_ENDPOINTS"] = "1"
+        report = client.get("/debug/memory?top=3").get_json()
+        assert {"context_cache", "guidelines", "week_index", "answer_cache"} <= set(report["structures"])
+        assert report["max_rss_bytes"] > 0
+        assert client.get("/debug/memory?top=x").status_code == 400
+    finally:
+        os.environ.pop("BABYNEST_DEBUG_ENDPOINTS", None)
+        if previous is not None:
+            os.environ["BABYNEST_DEBUG_ENDPOINTS"] = previous
+
+if __name__ == "__main__":
+    test_deep_sizeof()
+    test_structures_and_capacity()
+    test_allocation_sites_and_endpoint()
+    print("✅ Memory accounting tests passed")
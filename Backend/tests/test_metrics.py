@@ -0,0 +1,110 @@
+"""
+Tests for the metrics registry and /metrics: counters and histograms render
+in the text exposition format, and requests, the context cache and the vector
+store feed it.
+"""
+
+import os
+import sys
+import re
+import threading
+import time
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from monitoring.metrics import MetricsRegistry
+
+def _value(text: str, series: str) -> float:
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    assert match, series
+    return float(match.group(1))
+
+def test_counter_and_histogram_exposition():
+    registry = MetricsRegistry()
+    requests_total = registry.counter("req_total", "Requests", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    assert registry.counter("req_total", "Requests", ("route",)) is requests_total
+
+    requests_total.inc(route='/a"b')
+    requests_total.inc(2, route="/c")
+    for value in (0.05, 0.5, 5):
+        latency.observe(value)
+
+    text = registry.render()
+    assert "# TYPE req_total counter" in text and "# TYPE latency_seconds histogram" in text
+    assert _value(text, 'req_total{route="/a\\"b"}') == 1
+    assert _value(text, 'req_total{route="/c"}') == 2
+    assert _value(text, 'latency_seconds_bucket{le="0.1"}') == 1
+    assert _value(text, 'latency_seconds_bucket{le="1"}') == 2
+    assert _value(text, 'latency_seconds_bucket{le="+Inf"}') == 3
+    assert _value(text, "latency_seconds_count") == 3
+    assert _value(text, "latency_seconds_sum") == 5.55
+
+def test_concurrent_increments_are_not_lost():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits_total", "Hits")
+
+    def work():
+        for _ in range(10000):
+            counter.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.get() == 40000
+
+def test_metrics_endpoint():
+    from app import app
+
+    client = app.test_client()
+    client.get("/get_task/999999")
+    client.post("/agent", json={"query": "What should I eat this week?"})
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+
+    assert _value(text, 'babynest_http_requests_total{blueprint="tasks",route="/get_task/<int:task_id>",'
+                        'method="GET",status="404"}') >= 1
+    assert _value(text, 'babynest_http_request_duration_seconds_count{blueprint="app",route="/agent",'
+                        'method="POST"}') >= 1
+    assert 'babynest_http_response_bytes_bucket{blueprint="app",route="/agent",le="+Inf"}' in text
+    assert _value(text, 'babynest_context_cache_hits_total{source="memory"}') >= 1
+    assert "babynest_context_cache_build_seconds_count" in text
+    assert _value(text, "babynest_embedded_texts_total") >= 1
+    assert 'babynest_vector_query_seconds_count{index="chroma"}' in text
+    assert 'babynest_stage_duration_seconds_count{stage="get_context"}' in text
+
+def test_streamed_responses_are_timed_to_the_first_chunk():
+    from flask import Flask, Response
+    from monitoring import middleware
+
+    app = Flask(__name__)
+    middleware.init_app(app)
+
+    @app.route("/test_slow_stream")
+    def slow_stream():
+        def events():
+            time.sleep(0.05)
+            yield "data: first\n\n"
+            yield "data: second\n\n"
+        return Response(events(), mimetype="text/event-stream")
+
+    labels = {"blueprint": "app", "route": "/test_slow_stream", "method": "GET"}
+    before = middleware.HTTP_LATENCY.get(**labels)
+    response = app.test_client().get("/test_slow_stream")
+    assert response.get_data(as_text=True) == "data: first\n\ndata: second\n\n"
+    after = middleware.HTTP_LATENCY.get(**labels)
+    # The view returns at once; the time to the first event is what gets recorded
+    assert after["count"] == before["count"] + 1
+    assert after["sum"] - before["sum"] >= 0.05
+
+if __name__ == "__main__":
+    test_counter_and_histogram_exposition()
+    test_concurrent_increments_are_not_lost()
+    test_metrics_endpoint()
+    test_streamed_responses_are_timed_to_the_first_chunk()
+    print("✅ Metrics tests passed")
@@ -0,0 +1,168 @@
+"""
+Tests for multi-command chat messages: splitting a message into commands and
+running them as one batch (one transaction, rolled back as a whole on a failed
+write, and one cache refresh), questions answered after the writes, and the
+per-message command limit.
+"""
+
+import os
+import sys
+import sqlite3
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.intent import split_commands
+from agent.llm import KeywordBackend, set_llm_backend
+from app import app, agent, db_path
+
+NOTE = "multi-command test"
+
+def test_split_commands():
+    commands = split_commands("log weight 65kg and symptom nausea and book ultrasound tomorrow at 10am")
+    assert [(c["text"], c["intent"]) for c in commands] == [
+        ("log weight 65kg", "weight"),
+        ("symptom nausea", "symptoms"),
+        ("book ultrasound tomorrow at 10am", "appointments"),
+    ]
+    # "symptom nausea" has no verb of its own and inherits "log"
+    assert [a["action"] for a in commands[1]["analysis"]["actions"]] == ["log"]
+
+def test_single_commands_are_not_split():
+    for query in ["I'm feeling nauseous and tired", "what vaccines and what tests do I need",
+                  "book appointment for checkup on 20 December, 2026 at 9am"]:
+        assert len(split_commands(query)) == 1, query
+
+def test_questions_after_commands_are_kept():
+    commands = split_commands("log weight 65kg and what should I eat this week?")
+    assert [(c["text"], c["intent"]) for c in commands] == [
+        ("log weight 65kg", "weight"),
+        ("what should I eat this week?", "general"),
+    ]
+    # Questions don't inherit the command verbs before them
+    assert commands[1]["analysis"]["actions"] == []
+    # A leading question stays its own command too
+    assert [c["intent"] for c in split_commands("what should I eat and log weight 65kg")] == ["general", "weight"]
+
+def _count(table, column, value):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {column} = ?", (value,)).fetchone()[0]
+
+def _cleanup():
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DELETE FROM weekly_weight WHERE note = ?", (NOTE,))
+        conn.execute("DELETE FROM weekly_symptoms WHERE note = ?", (NOTE,))
+        conn.execute("DELETE FROM appointments WHERE title = 'multitest'")
+        conn.commit()
+
+def _run_recording_refreshes(query):
+    """Run a message; returns (result, update_cache calls)."""
+    refreshed = []
+    original_update = agent.context_cache.update_cache
+    agent.context_cache.update_cache = lambda *args, **kwargs: refreshed.append(args)
+    try:
+        with app.test_request_context():
+            return agent.run_commands(query), refreshed
+    finally:
+        agent.context_cache.update_cache = original_update
+
+def test_batch_runs_every_command():
+    query = (f"log weight 64.5kg note {NOTE}; log symptom headache note {NOTE} "
+             "and book appointment for multitest tomorrow at 10am")
+    result, refreshed = _run_recording_refreshes(query)
+
+    try:
+        assert [r["intent"] for r in result["results"]] == ["weight", "symptoms", "appointments"]
+        assert all(r["response"].startswith("✅") for r in result["results"]), result
+        assert _count("weekly_weight", "note", NOTE) == 1
+        assert _count("weekly_symptoms", "note", NOTE) == 1
+        assert _count("appointments", "title", "multitest") == 1
+        # One cache refresh for everything written
+        assert refreshed == [("default", ["weight", "symptoms", "appointments"], "create")]
+    finally:
+        _cleanup()
+
+def test_failed_write_rolls_back_the_batch():
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS fail_test_symptom BEFORE INSERT ON weekly_symptoms
+            WHEN NEW.note = '{NOTE}' BEGIN SELECT RAISE(ABORT, 'symptom insert failed'); END
+        """)
+    try:
+        query = (f"log weight 64.5kg note {NOTE}; log symptom headache note {NOTE} "
+                 "and book appointment for multitest tomorrow at 10am")
+        result, refreshed = _run_recording_refreshes(query)
+        assert [r["intent"] for r in result["results"]] == ["weight", "symptoms"]
+        assert result["response"].startswith("❌") and "none of the 3 commands were saved" in result["response"]
+        assert _count("weekly_weight", "note", NOTE) == 0
+        assert _count("weekly_symptoms", "note", NOTE) == 0
+        assert _count("appointments", "title", "multitest") == 0
+        assert refreshed == []
+    finally:
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DROP TRIGGER IF EXISTS fail_test_symptom")
+        _cleanup()
+
+def test_single_write_refreshes_the_cache():
+    try:
+        result, refreshed = _run_recording_refreshes("book appointment for multitest tomorrow at 10am")
+        assert result["response"].startswith("✅")
+        assert refreshed == [("default", ["appointments"], "create")]
+        # Reads do not refresh
+        assert _run_recording_refreshes("show my appointments")[1] == []
+    finally:
+        _cleanup()
+
+class _CommittedWeightBackend(KeywordBackend):
+    """Records whether the batch's weight was already committed when the model ran."""
+
+    def __init__(self):
+        self.committed = []
+
+    def generate(self, prompt, max_tokens=500, temperature=0.7):
+        self.committed.append(_count("weekly_weight", "note", NOTE))
+        return super().generate(prompt, max_tokens, temperature)
+
+def test_question_is_answered_after_the_writes():
+    backend = _CommittedWeightBackend()
+    previous_backend = set_llm_backend(backend)
+    previous_cache = agent.answer_cache
+    agent.answer_cache = None
+    try:
+        with app.test_request_context():
+            result = agent.run_commands(f"log weight 64.5kg note {NOTE} and what should I eat this week?")
+        assert [r["intent"] for r in result["results"]] == ["weight", "general"]
+        assert result["results"][0]["response"].startswith("✅") and result["results"][1]["response"]
+        assert backend.committed == [1]
+    finally:
+        agent.answer_cache = previous_cache
+        set_llm_backend(previous_backend)
+        _cleanup()
+
+def test_too_many_commands_are_refused():
+    try:
+        with app.test_request_context():
+            result = agent.run_commands(f"log weight 65kg note {NOTE} and " * 300)
+        assert result["results"] == [] and f"at most {agent.max_commands} commands" in result["response"]
+        assert _count("weekly_weight", "note", NOTE) == 0
+    finally:
+        _cleanup()
+
+def test_agent_endpoint_returns_results():
+    response = app.test_client().post("/agent", json={"query": "show my appointments"})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data["response"] and len(data["results"]) == 1
+
+if __name__ == "__main__":
+    test_split_commands()
+    test_single_commands_are_not_split()
+    test_questions_after_commands_are_kept()
+    test_batch_runs_every_command()
+    test_failed_write_rolls_back_the_batch()
+    test_single_write_refreshes_the_cache()
+    test_question_is_answered_after_the_writes()
+    test_too_many_commands_are_refused()
+    test_agent_endpoint_returns_results()
+    print("✅ Multi-command tests passed")
@@ -0,0 +1,84 @@
+"""
+Tests for the deterministic offline embedding provider.
+They run without network access or a pre-downloaded embedding model.
+"""
+
+import os
+import sys
+import json
+
+import numpy as np
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.environ.setdefault("BABYNEST_TEST_MODE", "1")
+
+from agent.embeddings import HashingEmbeddingFunction, HASHING_DIMENSION, get_embedding_provider
+
+def test_hashing_embedding_is_deterministic():
+    """Same text, same vector; fixed dimension and unit length."""
+    ef = HashingEmbeddingFunction()
+    first = ef(["Iron and folic acid supplementation"])[0]
+    second = HashingEmbeddingFunction()(["Iron and folic acid supplementation"])[0]
+
+    assert len(first) == HASHING_DIMENSION
+    assert np.allclose(first, second)
+    assert abs(np.linalg.norm(first) - 1.0) < 1e-5
+
+def test_hashing_embedding_similarity():
+    """Texts sharing words are closer than unrelated texts."""
+    ef = HashingEmbeddingFunction()
+    query, related, unrelated = ef([
+        "folic acid tablets",
+        "Iron & Folic Acid Supplementation",
+        "Anomaly scan to check fetal organs",
+    ])
+    assert np.dot(query, related) > np.dot(query, unrelated)
+
+def test_test_mode_uses_hashing_provider():
+    assert get_embedding_provider() == "hashing"
+
+def test_vector_pipeline_end_to_end():
+    """Guidelines are indexed and retrieved through the real vector store module."""
+    from agent import vector_store
+
+    assert vector_store.guidelines_embedding_function.name() == "hashing"
+    vector_store.update_guidelines_in_vector_store()
+
+    with open(vector_store.GUIDELINES_FILE, "r", encoding="utf-8") as f:
+        guidelines = json.load(f)
+    assert vector_store.guidelines_collection.count() == len(guidelines)
+
+    docs = vector_store.query_vector_store("anomaly scan", n_results=1)
+    assert docs and "Anomaly Scan" in docs[0]
+
+    batched = vector_store.query_vector_store_batch(["anomaly scan", "tdap vaccine"], n_results=1)
+    assert batched[0] == docs
+    assert "Tdap" in batched[1][0]
+
+    # Unchanged guidelines.json is not re-indexed
+    assert vector_store.update_guidelines_in_vector_store() is False
+
+def test_embedding_is_deferred_without_a_pack():
+    """Startup only bulk-loads a matching pack; embedding with the model is left for later."""
+    from agent import vector_store
+    from agent.embeddings_pack import PACK_PATH
+
+    assert not os.path.exists(PACK_PATH)
+    hash_file = vector_store._guidelines_hash_file()
+    if os.path.exists(hash_file):
+        os.remove(hash_file)
+
+    assert vector_store.update_guidelines_in_vector_store(precomputed_only=True) is False
+    assert vector_store.guidelines_need_update()
+    assert vector_store.update_guidelines_in_vector_store() is True
+    assert not vector_store.guidelines_need_update()
+
+if __name__ == "__main__":
+    test_hashing_embedding_is_deterministic()
+    test_hashing_embedding_similarity()
+    test_test_mode_uses_hashing_provider()
+    test_vector_pipeline_end_to_end()
+    test_embedding_is_deferred_without_a_pack()
+    print("✅ Offline embedding tests passed")
@@ -0,0 +1,74 @@
+"""
+Tests for the concurrent agent pipeline: the user context fetch and vector
+retrieval overlap, and retrieval that misses its deadline falls back to the
+offline context.
+"""
+
+import os
+import sys
+import time
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+import agent.agent as agent_module
+from agent.context import OFFLINE_CONTEXT
+from app import agent
+
+QUERY = "How am I doing this week?"
+STAGE_DELAY = 0.3
+
+def _run_with_slow_stages(retrieval_delay: float, retrieval_timeout: float):
+    """Run QUERY with both stages slowed down; returns (elapsed, context passed to the prompt)."""
+    original_get_context = agent.context_cache.get_context
+    original_retrieval = agent_module.retrieve_contexts
+    original_build_prompt = agent_module.build_prompt
+    original_timeout = agent.retrieval_timeout
+    prompts = []
+
+    def slow_get_context(*args, **kwargs):
+        time.sleep(STAGE_DELAY)
+        return original_get_context(*args, **kwargs)
+
+    def slow_retrieval(queries):
+        time.sleep(retrieval_delay)
+        return [{"context": "Week Range 1-40: Stay hydrated", "doc_ids": ["guideline_0"], "embedding": None}
+                for _ in queries]
+
+    def capture_prompt(query, context, user_context=None, **kwargs):
+        prompts.append(context)
+        return original_build_prompt(query, context, user_context, **kwargs)
+
+    agent.context_cache.get_context = slow_get_context
+    agent_module.retrieve_contexts = slow_retrieval
+    agent_module.build_prompt = capture_prompt
+    agent.retrieval_timeout = retrieval_timeout
+    try:
+        start = time.perf_counter()
+        result = agent.run_commands(QUERY)
+        elapsed = time.perf_counter() - start
+    finally:
+        agent.context_cache.get_context = original_get_context
+        agent_module.retrieve_contexts = original_retrieval
+        agent_module.build_prompt = original_build_prompt
+        agent.retrieval_timeout = original_timeout
+
+    assert result["results"][0]["intent"] == "general", result
+    return elapsed, prompts[0]
+
+def test_stages_run_concurrently():
+    elapsed, context = _run_with_slow_stages(retrieval_delay=STAGE_DELAY, retrieval_timeout=5)
+    assert context == "Week Range 1-40: Stay hydrated"
+    # Close to the slower stage, well below the sum of both
+    assert elapsed < 2 * STAGE_DELAY * 0.85, elapsed
+
+def test_retrieval_deadline_falls_back_to_offline_context():
+    elapsed, context = _run_with_slow_stages(retrieval_delay=2.0, retrieval_timeout=0.1)
+    assert context == OFFLINE_CONTEXT
+    assert elapsed < 1.0, elapsed
+
+if __name__ == "__main__":
+    test_stages_run_concurrently()
+    test_retrieval_deadline_falls_back_to_offline_context()
+    print("✅ Pipeline concurrency tests passed")
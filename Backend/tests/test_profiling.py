@@ -0,0 +1,90 @@
+"""
+Tests for per-request profiling: both profilers, the ring buffer, the header
+gate and the download endpoints.
+"""
+
+import os
+import sys
+import io
+import time
+import marshal
+import pstats
+import tempfile
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from monitoring.profiling import ProfileBuffer, profile_call, profile_buffer
+
+def _busy(seconds: float) -> str:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return "done"
+
+def test_profilers():
+    result, entry = profile_call("sample", _busy, 0.05)
+    assert result == "done" and entry["format"] == "collapsed" and entry["samples"] > 0
+    lines = entry["data"].decode().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert "_busy (test_profiling.py:" in stack.split(";")[-1] and int(count) > 0
+
+    result, entry = profile_call("cprofile", _busy, 0.01)
+    assert result == "done" and entry["format"] == "pstats" and entry["duration_ms"] >= 10
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profile.pstats")
+        with open(path, "wb") as f:
+            f.write(entry["data"])
+        stats = pstats.Stats(path, stream=io.StringIO())
+    assert any(name == "_busy" for _, _, name in stats.stats)
+    assert any(row["function"].startswith("_busy") for row in entry["top"])
+
+def test_ring_buffer_is_bounded():
+    buffer = ProfileBuffer(size=3)
+    ids = [buffer.add({"format": "collapsed", "data": b""}) for _ in range(5)]
+    assert ids == [1, 2, 3, 4, 5]
+    assert [e["id"] for e in buffer.list()] == [5, 4, 3] and "data" not in buffer.list()[0]
+    assert buffer.get(1) is None and buffer.get(4)["id"] == 4
+
+def test_header_and_download_endpoints():
+    from app import app
+    client = app.test_client()
+    profile_buffer.clear()
+
+    previous = os.environ.pop("BABYNEST_DEBUG_ENDPOINTS", None)
+    try:
+        # The header is ignored and the endpoints hidden unless debug endpoints are enabled,
+        # development mode (the default) included
+        assert app.config["ENV"] == "development"
+        response = client.get("/get_profile", headers={"X-BabyNest-Profile": "cprofile"})
+        assert "X-BabyNest-Profile-Id" not in response.headers and not profile_buffer.list()
+        assert client.get("/debug/profiles").status_code == 404
+
+        os.environ["BABYNEST_DEBUG_ENDPOINTS"] = "1"
+        plain = client.get("/get_profile", headers={"X-BabyNest-Profile": "cprofile"})
+        profile_id = plain.headers["X-BabyNest-Profile-Id"]
+        sampled = client.get("/agent/cache/status", headers={"X-BabyNest-Profile": "sample"})
+        assert sampled.status_code == 200
+
+        profiles = client.get("/debug/profiles").get_json()["profiles"]
+        assert [(p["mode"], p["path"]) for p in profiles] == [("sample", "/agent/cache/status"),
+                                                             ("cprofile", "/get_profile")]
+        download = client.get(f"/debug/profiles/{profile_id}")
+        assert download.status_code == 200 and download.mimetype == "application/octet-stream"
+        assert "profile-" in download.headers["Content-Disposition"]
+        assert marshal.loads(download.data)
+        collapsed = client.get(f"/debug/profiles/{sampled.headers['X-BabyNest-Profile-Id']}")
+        assert collapsed.mimetype == "text/plain"
+        assert client.get("/debug/profiles/999999").status_code == 404
+    finally:
+        os.environ.pop("BABYNEST_DEBUG_ENDPOINTS", None)
+        if previous is not None:
+            os.environ["BABYNEST_DEBUG_ENDPOINTS"] = previous
+        profile_buffer.clear()
+
+if __name__ == "__main__":
+    test_profilers()
+    test_ring_buffer_is_bounded()
+    test_header_and_download_endpoints()
+    print("✅ Profiling tests passed")
@@ -0,0 +1,72 @@
+"""
+Tests for the token-budgeted prompt builder: static prefix first, budget
+respected, least relevant snippets and oldest tracking entries trimmed first.
+"""
+
+import os
+import sys
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.prompt import STATIC_PREFIX, build_prompt, count_tokens, set_tokenizer
+
+USER_CONTEXT = {
+    "current_week": 20,
+    "location": "Delhi",
+    "age": 29,
+    "weight": 62,
+    "due_date": "2026-03-01",
+    "tracking_data": {
+        "weight": [{"week": 20 - i, "weight": 62 - i * 0.5, "note": f"weight note {i}"} for i in range(4)],
+        "symptoms": [{"week": 20 - i, "symptom": f"symptom {i}", "note": f"symptom note {i}"} for i in range(4)],
+        "medicine": [],
+        "blood_pressure": [],
+        "discharge": [],
+    },
+}
+
+SNIPPETS = [f"Week Range {i}-{i + 4}: guideline {i} " + "detail " * 30 for i in range(5)]
+
+def test_static_prefix_is_identical_and_first():
+    a = build_prompt("what should I eat?", "\n\n".join(SNIPPETS), USER_CONTEXT)
+    b = build_prompt("is yoga safe?", SNIPPETS[:1], None)
+    assert a.startswith(STATIC_PREFIX) and b.startswith(STATIC_PREFIX)
+    assert a.rstrip().endswith("Please provide a comprehensive, personalized response:")
+    assert a.index("User Profile") < a.index("Relevant Knowledge Base") < a.index("User Query")
+
+def test_budget_is_respected():
+    for budget in (450, 600, 900, 2000):
+        prompt = build_prompt("how am I doing?", "\n\n".join(SNIPPETS), USER_CONTEXT, token_budget=budget)
+        assert count_tokens(prompt) <= budget, (budget, count_tokens(prompt))
+
+def test_least_relevant_snippets_are_dropped_first():
+    prompt = build_prompt("how am I doing?", "\n\n".join(SNIPPETS), USER_CONTEXT, token_budget=600)
+    kept = [i for i in range(len(SNIPPETS)) if f"guideline {i} " in prompt]
+    assert kept and kept == list(range(len(kept))) and len(kept) < len(SNIPPETS)
+
+def test_newest_tracking_entries_survive_trimming():
+    prompt = build_prompt("how am I doing?", "\n\n".join(SNIPPETS), USER_CONTEXT, token_budget=450)
+    assert "weight note 0" in prompt and "symptom note 0" in prompt
+    assert "weight note 2" not in prompt
+
+def test_pluggable_tokenizer():
+    class CharTokenizer:
+        def encode(self, text):
+            return list(text)
+
+    set_tokenizer(CharTokenizer())
+    try:
+        prompt = build_prompt("how am I doing?", "\n\n".join(SNIPPETS), USER_CONTEXT, token_budget=2500)
+        assert len(prompt) <= 2500
+    finally:
+        set_tokenizer(None)
+
+if __name__ == "__main__":
+    test_static_prefix_is_identical_and_first()
+    test_budget_is_respected()
+    test_least_relevant_snippets_are_dropped_first()
+    test_newest_tracking_entries_survive_trimming()
+    test_pluggable_tokenizer()
+    print("✅ Prompt builder tests passed")
@@ -0,0 +1,109 @@
+"""
+Tests for context versions and the memoized user section of the prompt:
+the version increases on every cache change, and the user section is only
+re-rendered when the (user_id, version) pair changes.
+"""
+
+import os
+import sys
+import copy
+import shutil
+import tempfile
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+import agent.prompt as prompt_module
+from agent.cache import ContextCache
+from agent.prompt import build_prompt, clear_user_sections
+
+DB_PATH = os.path.join(backend_dir, "db", "database.db")
+
+USER_CONTEXT = {
+    "current_week": 20,
+    "location": "Delhi",
+    "age": 29,
+    "weight": 62,
+    "due_date": "2026-03-01",
+    "tracking_data": {
+        "weight": [{"week": 20 - i, "weight": 62 - i * 0.5, "note": f"weight note {i}"} for i in range(4)],
+        "symptoms": [],
+        "medicine": [],
+        "blood_pressure": [],
+        "discharge": [],
+    },
+    "version": 1,
+}
+
+def _count_renders():
+    """Patch render_user_section to count calls; returns (calls, restore)."""
+    original = prompt_module.render_user_section
+    calls = []
+
+    def counting(user_context):
+        calls.append(user_context.get("version"))
+        return original(user_context)
+
+    prompt_module.render_user_section = counting
+    return calls, lambda: setattr(prompt_module, "render_user_section", original)
+
+def test_version_increases_on_every_change():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = ContextCache(DB_PATH, cache_dir=cache_dir)
+        assert cache.get_context_version("memo_user") == 0
+
+        context = cache.get_context("memo_user")
+        assert context is not None
+        first = cache.get_context_version("memo_user")
+        assert first >= 1 and context["version"] == first
+
+        cache.update_cache("memo_user", data_type="weight", operation="create")
+        second = cache.get_context_version("memo_user")
+        assert second > first and context["version"] == second
+
+        # Invalidation never hands out an old version again
+        cache.invalidate_cache("memo_user")
+        rebuilt = cache.get_context("memo_user")
+        assert rebuilt["version"] > second
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def test_user_section_is_rendered_once_per_version():
+    clear_user_sections()
+    calls, restore = _count_renders()
+    try:
+        context = copy.deepcopy(USER_CONTEXT)
+        a = build_prompt("what should I eat?", "Week Range 1-40: Stay hydrated", context, user_id="u1")
+        b = build_prompt("is yoga safe?", "Week Range 1-40: Gentle exercise", context, user_id="u1")
+        assert calls == [1]
+        assert "weight note 0" in a and "weight note 0" in b
+        assert "is yoga safe?" in b and "Gentle exercise" in b
+
+        # A new version (cache update) renders the new data
+        context["tracking_data"]["weight"][0]["note"] = "updated note"
+        context["version"] = 2
+        c = build_prompt("what should I eat?", "Week Range 1-40: Stay hydrated", context, user_id="u1")
+        assert calls == [1, 2]
+        assert "updated note" in c and "weight note 0" not in c
+    finally:
+        restore()
+        clear_user_sections()
+
+def test_memoized_prompt_matches_unmemoized():
+    clear_user_sections()
+    context = copy.deepcopy(USER_CONTEXT)
+    snippets = [f"Week Range {i}-{i + 4}: guideline {i} " + "detail " * 30 for i in range(5)]
+    for budget in (450, 600, 2000):
+        plain = build_prompt("how am I doing?", snippets, context, token_budget=budget)
+        build_prompt("how am I doing?", snippets, context, token_budget=budget, user_id="u2")
+        memoized = build_prompt("how am I doing?", snippets, context, token_budget=budget, user_id="u2")
+        assert memoized == plain, budget
+    clear_user_sections()
+
+if __name__ == "__main__":
+    test_version_increases_on_every_change()
+    test_user_section_is_rendered_once_per_version()
+    test_memoized_prompt_matches_unmemoized()
+    print("✅ Prompt memoization tests passed")
@@ -0,0 +1,62 @@
+"""
+Tests for the int8-quantized vector index.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.quantized_index import QuantizedVectorIndex, quantize
+
+def _unit_vectors(n, dim=64, seed=7):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_quantize_round_trip():
+    vectors = _unit_vectors(10)
+    codes, scales = quantize(vectors)
+    assert codes.dtype == np.int8
+    assert np.abs(codes.astype(np.float32) * scales[:, None] - vectors).max() < scales.max()
+
+def test_search_matches_exact_with_rescoring():
+    vectors = _unit_vectors(500)
+    ids = [f"v{i}" for i in range(len(vectors))]
+    index = QuantizedVectorIndex()
+    index.upsert(ids, vectors)
+
+    fetch = lambda wanted: vectors[[int(i[1:]) for i in wanted]]
+    for query in vectors[:20]:
+        exact = [ids[i] for i in np.argsort(-(vectors @ query))[:3]]
+        result = [vector_id for vector_id, _ in index.search(query, k=3, fetch_embeddings=fetch)]
+        assert result == exact
+
+def test_memory_is_about_a_quarter_of_float32():
+    vectors = _unit_vectors(100, dim=384)
+    index = QuantizedVectorIndex()
+    index.upsert([str(i) for i in range(100)], vectors)
+    assert vectors.nbytes / index.memory_bytes() > 3.5
+
+def test_upsert_and_remove():
+    vectors = _unit_vectors(3)
+    index = QuantizedVectorIndex()
+    index.upsert(["a", "b", "c"], vectors)
+    index.upsert(["a"], [vectors[2]])
+    assert len(index) == 3
+    assert index.search(vectors[2], k=2)[0][0] in ("a", "c")
+
+    index.remove(["c", "missing"])
+    assert index.ids == ["a", "b"]
+    assert index.search(vectors[2], k=1)[0][0] == "a"
+
+if __name__ == "__main__":
+    test_quantize_round_trip()
+    test_search_matches_exact_with_rescoring()
+    test_memory_is_about_a_quarter_of_float32()
+    test_upsert_and_remove()
+    print("✅ Quantized index tests passed")
@@ -0,0 +1,120 @@
+"""
+Query-plan regression tests.
+
+Collects every SQL statement passed to execute()/executemany() in routes/,
+the context cache, the context refresh, the week index and the agent
+handlers, and runs EXPLAIN QUERY PLAN for each against schema.sql plus the
+db.db migrations. A statement fails if its plan scans a table without an
+index or sorts with a temporary B-tree, unless it is listed in FULL_TABLE
+below as reading or writing every row by design.
+"""
+
+import os
+import sys
+import ast
+import glob
+import sqlite3
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from db.db import migrate
+from monitoring.sql_trace import normalize_sql
+
+SOURCES = (
+    glob.glob(os.path.join(backend_dir, "routes", "*.py"))
+    + glob.glob(os.path.join(backend_dir, "agent", "handlers", "*.py"))
+    + [os.path.join(backend_dir, "agent", name) for name in ("cache.py", "context.py", "week_index.py")]
+)
+
+# Statements that touch every row on purpose: list endpoints, the single-row
+# profile table, and the latest profile by rowid
+FULL_TABLE = {
+    "SELECT * FROM appointments",
+    "SELECT * FROM tasks",
+    "SELECT * FROM weekly_medicine",
+    "SELECT * FROM weekly_weight",
+    "SELECT * FROM profile",
+    "UPDATE profile SET dueDate = ?, user_location = ?, lmp = ?, cycleLength = ?, periodLength = ?, age = ?, weight = ?",
+    "SELECT lmp, cycleLength, periodLength, age, weight, user_location, dueDate FROM profile ORDER BY id DESC LIMIT ?",
+}
+
+def collect_statements() -> dict:
+    """Normalised SQL -> (SQL as written, ["file:line", ...]) for every literal passed to execute()/executemany()."""
+    statements = {}
+    for path in sorted(SOURCES):
+        with open(path) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in ("execute", "executemany") and node.args):
+                continue
+            where = f"{os.path.relpath(path, backend_dir)}:{node.lineno}"
+            sql = node.args[0]
+            # SQL built at runtime can't be checked here; keep statements literal
+            assert isinstance(sql, ast.Constant) and isinstance(sql.value, str), f"{where}: SQL is not a string literal"
+            statements.setdefault(normalize_sql(sql.value), (sql.value, []))[1].append(where)
+    return statements
+
+def migrated_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    with open(os.path.join(backend_dir, "schema.sql")) as f:
+        conn.executescript(f.read())
+    migrate(conn)
+    return conn
+
+def plan_problems(plan: list) -> list:
+    problems = []
+    for detail in plan:
+        if detail.startswith("SCAN") and "USING" not in detail:
+            problems.append(detail)
+        elif detail.startswith("USE TEMP B-TREE FOR ORDER BY"):
+            problems.append(detail)
+    return problems
+
+def explain(conn: sqlite3.Connection, sql: str) -> list:
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, [None] * sql.count("?")).fetchall()
+    return [row[-1] for row in rows]
+
+def test_statements_are_collected():
+    statements = collect_statements()
+    sources = {where.split(":")[0] for _, wheres in statements.values() for where in wheres}
+    for expected in ("routes/weight.py", "routes/blood_pressure.py", "agent/cache.py",
+                     "agent/context.py", "agent/handlers/symptoms.py"):
+        assert expected in sources, sources
+    assert len(statements) > 40
+
+def test_no_unindexed_scans_or_sorts():
+    conn = migrated_db()
+    failures = []
+    for normalized, (sql, wheres) in collect_statements().items():
+        problems = plan_problems(explain(conn, sql))
+        if problems and normalized not in FULL_TABLE:
+            failures.append(f"{wheres[0]}: {normalized}\n    {problems}")
+    assert not failures, "Statements that scan or sort without an index:\n" + "\n".join(failures)
+
+def test_full_table_allowlist_is_current():
+    # An entry that no longer exists in the code would silently allow a future scan
+    stale = FULL_TABLE - set(collect_statements())
+    assert not stale, stale
+
+def test_checker_catches_scans_and_sorts():
+    conn = migrated_db()
+    assert plan_problems(explain(conn, "SELECT * FROM weekly_weight WHERE note = ?"))
+    assert plan_problems(explain(conn, "SELECT * FROM weekly_medicine ORDER BY created_at"))
+    assert not plan_problems(explain(conn, "SELECT * FROM weekly_weight WHERE week_number = ?"))
+
+def test_migration_is_idempotent():
+    conn = migrated_db()
+    migrate(conn)
+    indexes = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")]
+    assert len(indexes) == len(set(indexes)) > 0
+
+if __name__ == "__main__":
+    test_statements_are_collected()
+    test_no_unindexed_scans_or_sorts()
+    test_full_table_allowlist_is_current()
+    test_checker_catches_scans_and_sorts()
+    test_migration_is_idempotent()
+    print("✅ Query plan tests passed")
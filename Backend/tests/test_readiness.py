@@ -0,0 +1,61 @@
+"""
+Tests for the embedding warm-up and the /ready endpoint.
+"""
+
+import os
+import sys
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app import app, agent
+
+def test_ready_reports_components():
+    client = app.test_client()
+    response = client.get("/ready")
+    data = response.get_json()
+
+    assert response.status_code in (200, 503)
+    assert set(data["components"]) == {"database", "context_cache", "vector_store"}
+    assert data["components"]["database"]["ready"] is True
+
+def test_warm_up_marks_vector_store_warm():
+    agent.warm_up()
+    readiness = agent.get_readiness()
+    assert readiness["vector_store"]["warm"] is True
+    assert readiness["vector_store"]["warmup_ms"] is not None
+
+    response = app.test_client().get("/ready")
+    assert response.status_code == 200
+    assert response.get_json()["ready"] is True
+
+class _EmptyCollection:
+    name = "empty_guidelines"
+
+    def count(self):
+        return 0
+
+    def query(self, query_embeddings, n_results):
+        return {"documents": [[] for _ in query_embeddings], "ids": [[] for _ in query_embeddings]}
+
+def test_empty_collection_is_not_warm():
+    from agent import vector_store
+
+    collection, state = vector_store.guidelines_collection, dict(vector_store._warm_state)
+    vector_store.guidelines_collection = _EmptyCollection()
+    vector_store._warm_state.update(warm=False, error=None)
+    try:
+        assert vector_store.warm_up_vector_store() is False
+        assert vector_store.query_vector_store("pregnancy checkup") == []
+        status = vector_store.get_vector_store_status()
+        assert status["warm"] is False and status["error"] == "guidelines collection is empty"
+    finally:
+        vector_store.guidelines_collection = collection
+        vector_store._warm_state.update(state)
+
+if __name__ == "__main__":
+    test_ready_reports_components()
+    test_warm_up_marks_vector_store_warm()
+    test_empty_collection_is_not_warm()
+    print("✅ Readiness tests passed")
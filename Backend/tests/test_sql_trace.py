@@ -0,0 +1,112 @@
+"""
+Tests for SQL tracing: statements are grouped by normalised SQL, timed
+through fetching, counted, explained once, and exposed on /db/sql/stats.
+"""
+
+import os
+import sys
+import io
+import json
+import sqlite3
+import tempfile
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from monitoring import log as structured_log
+from monitoring import sql_trace
+
+def _traced_db(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, factory=sql_trace.TracedConnection)
+    conn.execute("CREATE TABLE weekly_weight (id INTEGER PRIMARY KEY, week_number INTEGER, weight REAL)")
+    conn.executemany("INSERT INTO weekly_weight (week_number, weight) VALUES (?, ?)",
+                     [(week, 60 + week / 10) for week in range(1, 41)])
+    conn.commit()
+    return conn
+
+def _statement(sql_fragment: str) -> dict:
+    matches = [s for s in sql_trace.statement_stats.snapshot() if sql_fragment in s["sql"]]
+    assert len(matches) == 1, [s["sql"] for s in sql_trace.statement_stats.snapshot()]
+    return matches[0]
+
+def test_normalize_sql():
+    assert sql_trace.normalize_sql("""
+        SELECT * FROM tasks  WHERE week = 12 AND title = 'it''s'
+    """) == "SELECT * FROM tasks WHERE week = ? AND title = ?"
+    assert sql_trace.normalize_sql("DELETE FROM t2 WHERE id IN (?, ?,?);") == "DELETE FROM t2 WHERE id IN (?, ...)"
+
+def test_statements_are_timed_counted_and_explained_once():
+    sql_trace.statement_stats.clear()
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = _traced_db(os.path.join(tmp, "test.db"))
+        try:
+            for week in (5, 6, 7):
+                conn.execute(f"SELECT weight FROM weekly_weight WHERE week_number > {week}").fetchall()
+            cursor = conn.execute("SELECT * FROM weekly_weight WHERE id = ?", (3,))
+            assert cursor.fetchone() is not None
+            cursor.close()
+            for _ in conn.execute("SELECT id FROM weekly_weight"):
+                pass
+        finally:
+            conn.close()
+
+    scan = _statement("week_number > ?")
+    assert scan["calls"] == 3 and scan["rows"] == 35 + 34 + 33
+    assert scan["plan"] and "SCAN" in scan["plan"][0]
+
+    lookup = _statement("WHERE id = ?")
+    assert lookup["calls"] == 1 and lookup["rows"] == 1 and lookup["params"] == 1
+    assert "SEARCH" in lookup["plan"][0]
+
+    assert _statement("SELECT id FROM weekly_weight")["rows"] == 40
+    insert = _statement("INSERT INTO weekly_weight")
+    assert insert["rows"] == 40 and insert["params"] == 2
+
+def test_slow_statements_are_logged():
+    stream = io.StringIO()
+    structured_log.configure(stream=stream, level="INFO")
+    sql_trace.enable(True, slow_threshold_ms=0)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = _traced_db(os.path.join(tmp, "test.db"))
+            conn.execute("SELECT weight FROM weekly_weight WHERE week_number = 12").fetchall()
+            conn.close()
+        structured_log.flush()
+        slow = [r for r in map(json.loads, stream.getvalue().splitlines()) if r["event"] == "slow_query"]
+        select = [r for r in slow if r["sql"].startswith("SELECT weight")][0]
+        assert select["sql"] == "SELECT weight FROM weekly_weight WHERE week_number = ?"
+        assert select["rows"] == 1 and select["params"] == 0 and select["plan"]
+    finally:
+        sql_trace.enable(False, slow_threshold_ms=50)
+        structured_log.configure()
+
+def test_sql_stats_endpoint_and_metrics():
+    from app import app
+
+    sql_trace.enable(True)
+    previous = os.environ.get("BABYNEST_DEBUG_ENDPOINTS")
+    try:
+        client = app.test_client()
+        client.get("/get_task/999999")
+        os.environ.pop("BABYNEST_DEBUG_ENDPOINTS", None)
+        assert client.get("/db/sql/stats").status_code == 404
+        os.environ["BABYNEST_DEBUG_ENDPOINTS"] = "1"
+        stats = client.get("/db/sql/stats").get_json()
+        assert stats["enabled"]
+        assert any(s["sql"].startswith("SELECT * FROM tasks WHERE id") for s in stats["statements"])
+        text = client.get("/metrics").get_data(as_text=True)
+        assert 'babynest_sql_statements_total{kind="select"}' in text
+        assert 'babynest_sql_statement_duration_seconds_count{kind="select"}' in text
+    finally:
+        sql_trace.enable(False)
+        os.environ.pop("BABYNEST_DEBUG_ENDPOINTS", None)
+        if previous is not None:
+            os.environ["BABYNEST_DEBUG_ENDPOINTS"] = previous
+
+if __name__ == "__main__":
+    test_normalize_sql()
+    test_statements_are_timed_counted_and_explained_once()
+    test_slow_statements_are_logged()
+    test_sql_stats_endpoint_and_metrics()
+    print("✅ SQL trace tests passed")
@@ -0,0 +1,89 @@
+"""
+Tests for structured logging: JSON records written off the calling thread,
+per-subsystem levels, and sampling / rate limiting of debug events.
+"""
+
+import os
+import sys
+import io
+import json
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from monitoring import log as structured_log
+
+def _records(stream: io.StringIO) -> list:
+    structured_log.flush()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_records_are_json_with_fields():
+    stream = io.StringIO()
+    structured_log.configure(stream=stream, level="INFO")
+    try:
+        structured_log.get_logger("agent.cache").info("cache_updated", user_id="u1", data_types=["weight"])
+        try:
+            raise ValueError("boom")
+        except ValueError as e:
+            structured_log.get_logger("db").error("query_failed", exc_info=e, error=str(e))
+
+        first, second = _records(stream)
+        assert first["logger"] == "agent.cache" and first["event"] == "cache_updated"
+        assert first["level"] == "info" and first["user_id"] == "u1" and first["data_types"] == ["weight"]
+        assert second["level"] == "error" and "ValueError: boom" in second["exception"]
+    finally:
+        structured_log.configure()
+
+def test_per_subsystem_levels():
+    stream = io.StringIO()
+    structured_log.configure(stream=stream, level="WARNING", levels={"agent": "DEBUG", "routes": "ERROR"})
+    try:
+        structured_log.get_logger("agent.cache").debug("context_hit")   # inherits DEBUG from "agent"
+        structured_log.get_logger("routes").warning("slow_request")     # below ERROR
+        structured_log.get_logger("db").info("schema_created")          # below the WARNING default
+        structured_log.get_logger("db").warning("locked")
+
+        assert [(r["logger"], r["event"]) for r in _records(stream)] == [
+            ("agent.cache", "context_hit"), ("db", "locked")]
+    finally:
+        structured_log.configure()
+
+def test_debug_events_are_rate_limited_per_event():
+    stream = io.StringIO()
+    structured_log.configure(stream=stream, level="DEBUG", debug_rate=5)
+    try:
+        before = structured_log.get_dropped()["rate_limited"]
+        log = structured_log.get_logger("agent")
+        for _ in range(50):
+            log.debug("hot_path")
+        log.debug("other_event")
+        # Warnings are never rate limited
+        for _ in range(10):
+            log.warning("important")
+
+        events = [r["event"] for r in _records(stream)]
+        assert 5 <= events.count("hot_path") < 10
+        assert events.count("other_event") == 1 and events.count("important") == 10
+        assert structured_log.get_dropped()["rate_limited"] - before == 50 - events.count("hot_path")
+    finally:
+        structured_log.configure()
+
+def test_debug_sampling():
+    stream = io.StringIO()
+    structured_log.configure(stream=stream, level="DEBUG", debug_sample=0.0)
+    try:
+        before = structured_log.get_dropped()["sampled"]
+        for _ in range(10):
+            structured_log.get_logger("agent").debug("sampled_out")
+        assert _records(stream) == []
+        assert structured_log.get_dropped()["sampled"] - before == 10
+    finally:
+        structured_log.configure()
+
+if __name__ == "__main__":
+    test_records_are_json_with_fields()
+    test_per_subsystem_levels()
+    test_debug_events_are_rate_limited_per_event()
+    test_debug_sampling()
+    print("✅ Structured logging tests passed")
@@ -0,0 +1,92 @@
+"""
+Tests for pipeline tracing: span nesting and attributes, propagation to
+worker threads, per-stage histograms, and the trace exported by /agent.
+"""
+
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from monitoring.tracing import StageHistograms, propagate, span, stage_histograms, start_trace
+
+def test_spans_nest_and_carry_attributes():
+    with start_trace("test") as trace:
+        with span("outer") as outer:
+            with span("inner", size=3):
+                time.sleep(0.01)
+            outer.set(hit=True)
+
+    spans = {s["name"]: s for s in trace.to_dict()["spans"]}
+    assert spans["inner"]["parent"] == "outer" and spans["outer"]["parent"] is None
+    assert spans["inner"]["attrs"] == {"size": 3} and spans["outer"]["attrs"] == {"hit": True}
+    assert spans["outer"]["duration_ms"] >= spans["inner"]["duration_ms"] >= 10
+    assert trace.to_dict()["duration_ms"] >= spans["outer"]["duration_ms"]
+
+def test_spans_from_worker_threads_join_the_trace():
+    def work():
+        with span("worker"):
+            pass
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        with start_trace("test") as trace:
+            with span("parent"):
+                pool.submit(propagate(work)).result()
+            # Without propagate the worker has no trace
+            pool.submit(work).result()
+
+    spans = trace.to_dict()["spans"]
+    assert [(s["name"], s["parent"]) for s in spans] == [("parent", None), ("worker", "parent")]
+
+def test_stage_histograms():
+    histograms = StageHistograms(buckets=(1, 10, 100))
+    for ms in (0.5, 5, 5, 50, 500):
+        histograms.observe("stage", ms)
+    stats = histograms.snapshot()["stage"]
+    assert stats["count"] == 5 and stats["max_ms"] == 500
+    assert stats["buckets"] == {"le_1": 1, "le_10": 2, "le_100": 1, "inf": 1}
+    assert stats["p50_ms"] == 10 and stats["p99_ms"] == 500
+
+def test_agent_response_includes_trace():
+    from agent.answer_cache import get_answer_cache
+    from app import app
+
+    # A cached answer would skip prompt building and the model
+    get_answer_cache().clear()
+    client = app.test_client()
+    previous = os.environ.pop("BABYNEST_DEBUG_ENDPOINTS", None)
+    try:
+        # Not even when asked for unless debug endpoints are enabled
+        assert "trace" not in client.post("/agent?trace=1", json={"query": "What should I eat this week?"}).get_json()
+
+        os.environ["BABYNEST_DEBUG_ENDPOINTS"] = "1"
+        get_answer_cache().clear()
+        response = client.post("/agent?trace=1", json={"query": "What should I eat this week?"})
+        body = response.get_json()
+        names = [s["name"] for s in body["trace"]["spans"]]
+        for stage in ("get_context", "split_commands", "query_vector_store", "build_prompt", "run_llm"):
+            assert stage in names, names
+        assert json.loads(response.headers["X-BabyNest-Trace"]) == body["trace"]
+
+        # No trace unless asked for
+        assert "trace" not in client.post("/agent", json={"query": "What should I eat this week?"}).get_json()
+
+        stages = client.get("/agent/trace/stats").get_json()["stages"]
+        assert stages["get_context"]["count"] >= 2
+        assert stage_histograms.snapshot()["split_commands"]["count"] >= 2
+    finally:
+        os.environ.pop("BABYNEST_DEBUG_ENDPOINTS", None)
+        if previous is not None:
+            os.environ["BABYNEST_DEBUG_ENDPOINTS"] = previous
+
+if __name__ == "__main__":
+    test_spans_nest_and_carry_attributes()
+    test_spans_from_worker_threads_join_the_trace()
+    test_stage_histograms()
+    test_agent_response_includes_trace()
+    print("✅ Tracing tests passed")
@@ -0,0 +1,148 @@
+"""
+Tests for the week interval index: per-week lookups match a linear scan,
+guidelines are rebuilt when the file changes, and /tasks/week/<n> follows
+task writes.
+"""
+
+import os
+import sys
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+
+# Add the Backend directory to the path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from agent.guidelines_data import GUIDELINES
+from agent.week_index import WeekBitmapIndex, WeekIndex, parse_week_range
+
+TITLE = "week index test task"
+
+def test_lookup_matches_linear_scan():
+    rng = random.Random(7)
+    intervals = []
+    for i in range(200):
+        start = rng.randint(-2, 50)
+        intervals.append((start, start + rng.randint(0, 20), i))
+    index = WeekBitmapIndex(intervals)
+    for week in range(0, 55):
+        expected = [item for start, end, item in intervals if start <= week <= end and 1 <= week <= 52]
+        assert index.lookup(week) == expected, week
+
+def test_guidelines_for_week():
+    index = WeekIndex(db_path=":memory:")
+    for week in (7, 10, 20, 39):
+        expected = [g["title"] for g in GUIDELINES
+                    if parse_week_range(g["week_range"])[0] <= week <= parse_week_range(g["week_range"])[1]]
+        assert [g["title"] for g in index.guidelines_for_week(week)] == expected
+        rendered = index.render_guidelines(week)
+        assert all(title in rendered for title in expected)
+    assert index.render_guidelines(60) == ""
+    assert index.builds["guidelines"] == 1
+
+def test_guidelines_rebuilt_when_file_changes():
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump([{"title": "First", "week_range": "1-10", "priority": "high",
+                    "organization": ["WHO"], "purpose": "p"}], f)
+        path = f.name
+    try:
+        index = WeekIndex(db_path=":memory:", guidelines_path=path)
+        assert "First" in index.render_guidelines(5)
+
+        with open(path, "w") as f:
+            json.dump([{"title": "Second", "week_range": "1-10", "priority": "low",
+                        "organization": ["WHO"], "purpose": "p"}], f)
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+
+        assert "Second" in index.render_guidelines(5) and "First" not in index.render_guidelines(5)
+        assert index.builds["guidelines"] == 2
+    finally:
+        os.remove(path)
+
+def test_guidelines_handler_uses_the_week():
+    from agent.handlers.guidelines import handle
+
+    response = handle("show guidelines", {"current_week": 20, "location": "Delhi"})
+    assert "(Week 20)" in response and "Weeks: 18-22" in response
+    assert "Weeks: 6-8" not in response
+    assert "Weeks: 6-8" in handle("guidelines for week 7", {"current_week": 20, "location": "Delhi"})
+
+    # The agent's analysis is used as is, not re-derived from the text
+    from agent.intent import analyze_query
+    analysis = analyze_query("guidelines for week 7")
+    assert analysis["week"] == 7
+    assert "Weeks: 6-8" in handle("show guidelines", {"current_week": 20}, analysis=analysis)
+
+class _ChangingTasksIndex(WeekIndex):
+    """Tasks change while the first load runs, the way a concurrent task write would."""
+
+    def __init__(self):
+        super().__init__(db_path=":memory:")
+        self.version = 0
+        self.marker = None
+
+    def _load_task_intervals(self):
+        title = f"v{self.version}"
+        if self.marker is None:
+            def write():
+                self.version += 1
+                self.mark_tasks_changed()
+            self.marker = threading.Thread(target=write)
+            self.marker.start()
+            self.marker.join(timeout=0.2)
+        return [(1, 52, {"title": title})]
+
+def test_tasks_changed_during_render_are_not_memoized_stale():
+    index = _ChangingTasksIndex()
+    first = index.render_tasks_json(10)
+    index.marker.join()
+    # The change waited for the render to be stored, then dropped it
+    assert json.loads(first) == [{"title": "v0"}]
+    assert json.loads(index.render_tasks_json(10)) == [{"title": "v1"}]
+    assert index.builds["tasks"] == 2
+
+def test_default_database_is_read_at_load_time():
+    from db import db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tasks.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, title TEXT, starting_week INT, ending_week INT)")
+            conn.execute("INSERT INTO tasks (title, starting_week, ending_week) VALUES (?, 10, 12)", (TITLE,))
+        index = WeekIndex()
+        previous, db.DATABASE = db.DATABASE, path
+        try:
+            assert [t["title"] for t in index.tasks_for_week(11)] == [TITLE]
+        finally:
+            db.DATABASE = previous
+
+def test_tasks_week_endpoint_follows_writes():
+    from app import app, db_path
+
+    client = app.test_client()
+    try:
+        assert client.get("/tasks/week/51").get_json() == []
+        client.post("/add_task", json={"title": TITLE, "content": "c", "starting_week": 50, "ending_week": 52})
+        tasks = client.get("/tasks/week/51").get_json()
+        assert [t["title"] for t in tasks] == [TITLE]
+        assert client.get("/tasks/week/49").get_json() == []
+        assert client.get("/tasks/week/0").status_code == 400
+    finally:
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM tasks WHERE title = ?", (TITLE,))
+        from agent.week_index import get_week_index
+        get_week_index().mark_tasks_changed()
+
+if __name__ == "__main__":
+    test_lookup_matches_linear_scan()
+    test_guidelines_for_week()
+    test_guidelines_rebuilt_when_file_changes()
+    test_guidelines_handler_uses_the_week()
+    test_tasks_changed_during_render_are_not_memoized_stale()
+    test_default_database_is_read_at_load_time()
+    test_tasks_week_endpoint_follows_writes()
+    print("✅ Week index tests passed")